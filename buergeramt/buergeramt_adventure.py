@@ -1,12 +1,24 @@
 import argparse
+import inspect
 import os
 import sys
-import time
 
 from dotenv import load_dotenv
 
+from buergeramt.characters.cassette import open_cassette
+from buergeramt.characters.http_client import close_http_client
+from buergeramt.characters.model_backend import DEFAULT_MODEL, configured_models, requires_api_key
+from buergeramt.characters.prompt_compiler import get_prompt_compiler
+from buergeramt.characters.response_cache import ResponseCache
 from buergeramt.engine.command_manager import CommandManager
 from buergeramt.engine.game_engine import GameEngine
+from buergeramt.engine.output import SINKS, make_sink
+from buergeramt.engine.pacing import PRESETS, resolve_pacing
+from buergeramt.engine.snapshots import FileSnapshotStore, SessionSnapshot
+from buergeramt.rules.loader import get_config
+from buergeramt.rules.planner import plan
+from buergeramt.utils.async_utils import run_sync
+from buergeramt.utils.telemetry import Telemetry
 
 
 def clear_screen():
@@ -14,7 +26,7 @@ def clear_screen():
     os.system("cls" if os.name == "nt" else "clear")
 
 
-def print_progress(game_engine):
+def print_progress(game_engine, out=print):
     """Print progress bar"""
     progress = game_engine.game_state.progress
     frustration = game_engine.game_state.frustration_level
@@ -27,7 +39,7 @@ def print_progress(game_engine):
     # Frustration indicator
     frustration_bar = "!" * frustration
 
-    print(f"\nFortschritt: [{bar}] {progress}%  Frustration: {frustration_bar}")
+    out(f"\nFortschritt: [{bar}] {progress}%  Frustration: {frustration_bar}")
 
 
 def setup_api_key():
@@ -46,46 +58,108 @@ def setup_api_key():
 
 
 # --- CommandManager setup ---
-def setup_commands(game):
+def setup_commands(game, out=print, quit=None, saves=None, save_key=None):
+    """the slash commands of one game
+
+    out receives every line a command shows and quit ends the game (default: exit the
+    process), so the game server can give each session its own commands. Handlers return
+    True, or an awaitable for commands that walk to another department. With a
+    SnapshotStore as saves there are /speichern and /laden; save_key fixes the name the
+    game is saved under (the server uses the session id), otherwise the player picks one.
+    """
     command_manager = CommandManager()
 
     def cmd_hilfe(arg=None):
-        print("\nVerfügbare Befehle:")
+        out("\nVerfügbare Befehle:")
         for cmd in command_manager.all_commands():
-            print(f"/{cmd.name}{' <argument>' if cmd.takes_argument else ''}: {cmd.description}")
+            out(f"/{cmd.name}{' <argument>' if cmd.takes_argument else ''}: {cmd.description}")
         return True
 
     def cmd_status(arg=None):
-        print_progress(game)
+        print_progress(game, out)
+        return True
+
+    def cmd_hinweis(arg=None):
+        out("")
+        for line in plan(game.game_state).describe(game.game_state):
+            out(line)
+        return True
+
+    def cmd_statistik(arg=None):
+        out("\nAnfragen an die Beamten:")
+        out(game.telemetry.format_report())
+        out("\nSystemprompts:")
+        out(get_prompt_compiler().report())
         return True
 
     def cmd_beenden(arg=None):
-        print("Spiel wird beendet.")
-        sys.exit(0)
+        out("Spiel wird beendet.")
+        if quit is None:
+            sys.exit(0)
+        quit()
+        return True
 
     def agent_suggestions():
         # Suggest agent names from the game engine (use bureaucrat names)
         if hasattr(game, "agent_router"):
-            return [b.name for b in game.agent_router.get_bureaucrats().values()]
+            return game.agent_router.get_bureaucrat_names()
         return []
 
     def cmd_gehe_zu(arg):
         if not arg:
-            print("Bitte geben Sie einen Agentennamen an. Beispiel: /gehe_zu Frau Müller")
+            out("Bitte geben Sie einen Agentennamen an. Beispiel: /gehe_zu Frau Müller")
             return True
         # Try to switch agent in the game engine
-        if hasattr(game, "switch_agent"):
-            if game.switch_agent(arg):
-                print(f"Sie sprechen jetzt mit {arg}.")
+        if not hasattr(game, "switch_agent_async"):
+            out("Agentenwechsel ist in diesem Spielmodus nicht verfügbar.")
+            return True
+
+        async def walk():
+            if await game.switch_agent_async(arg):
+                out(f"Sie sprechen jetzt mit {arg}.")
             else:
-                print(f"Agent oder Abteilung '{arg}' nicht gefunden.")
-        else:
-            print("Agentenwechsel ist in diesem Spielmodus nicht verfügbar.")
+                out(f"Agent oder Abteilung '{arg}' nicht gefunden.")
+            return True
+
+        return walk()
+
+    def save_name(arg):
+        return save_key or (arg.strip() if arg and arg.strip() else "spielstand")
+
+    def cmd_speichern(arg=None):
+        name = save_name(arg)
+        try:
+            saves.save(name, SessionSnapshot.capture(game))
+        except (OSError, ValueError) as e:
+            out(f"Spielstand kann nicht gespeichert werden: {e}")
+            return True
+        out(f"Spielstand '{name}' gespeichert.")
+        return True
+
+    def cmd_laden(arg=None):
+        name = save_name(arg)
+        try:
+            snapshot = saves.load(name)
+        except (OSError, ValueError) as e:
+            out(f"Spielstand kann nicht geladen werden: {e}")
+            return True
+        if snapshot is None:
+            out(f"Kein Spielstand '{name}' gefunden.")
+            return True
+        snapshot.restore(game)
+        bureaucrat = game.agent_router.get_active_bureaucrat()
+        out(f"Spielstand '{name}' geladen. Sie sind wieder bei {bureaucrat.name} ({bureaucrat.department}).")
         return True
 
     # Register commands
     command_manager.register("hilfe", cmd_hilfe, "Zeigt diese Hilfe an.")
     command_manager.register("status", cmd_status, "Zeigt den aktuellen Fortschritt und Frustrationslevel an.")
+    command_manager.register(
+        "hinweis", cmd_hinweis, "Zeigt den nächsten Schritt zum Ziel, ohne einen Beamten zu fragen."
+    )
+    command_manager.register(
+        "statistik", cmd_statistik, "Zeigt Antwortzeiten, Tokens und Tool-Aufrufe der Beamten an."
+    )
     command_manager.register("beenden", cmd_beenden, "Beendet das Spiel.")
     command_manager.register(
         "gehe_zu",
@@ -94,6 +168,20 @@ def setup_commands(game):
         takes_argument=True,
         argument_suggestions=agent_suggestions,
     )
+    if saves is not None:
+        command_manager.register(
+            "speichern",
+            cmd_speichern,
+            "Speichert den Spielstand samt Gesprächen (z.B. /speichern montag)",
+            takes_argument=save_key is None,
+        )
+        command_manager.register(
+            "laden",
+            cmd_laden,
+            "Lädt einen gespeicherten Spielstand (z.B. /laden montag)",
+            takes_argument=save_key is None,
+            argument_suggestions=saves.keys,
+        )
     return command_manager
 
 
@@ -102,21 +190,93 @@ def main():
 
     parser = argparse.ArgumentParser(description="Bürgeramt Adventure: Schenkungssteuer Edition")
     parser.add_argument("--api-key", help="OpenAI API key")
+    parser.add_argument(
+        "--model",
+        help=(
+            f"Sprachmodell aller Beamten, z.B. {DEFAULT_MODEL} oder 'offline' (ohne Netzwerk, ohne API Key); "
+            "ohne Angabe gilt der Abschnitt model in config.yaml"
+        ),
+    )
+    parser.add_argument("--stream", action="store_true", help="Antworten der Beamten Wort für Wort anzeigen")
+    parser.add_argument("--cache", action="store_true", help="Antworten auf wiederholte Eingaben zwischenspeichern")
+    parser.add_argument("--cache-dir", help="Verzeichnis für den dauerhaften Antwort-Cache (impliziert --cache)")
+    parser.add_argument(
+        "--fast-path", action="store_true", help="Eindeutige Nachweise lokal annehmen, ohne das Sprachmodell zu fragen"
+    )
+    parser.add_argument(
+        "--pacing",
+        choices=sorted(PRESETS),
+        default="interactive",
+        help="Pausen der Darstellung: interactive, fast oder headless (keine Pausen, kein Bildschirmlöschen)",
+    )
+    parser.add_argument(
+        "--output",
+        choices=sorted(SINKS),
+        default="ansi",
+        help="Ausgabeformat: ansi (farbig), plain (ohne Farben, pro Zug gepuffert) oder json (ein Ereignis pro Zeile)",
+    )
+    parser.add_argument(
+        "--single-shot",
+        action="store_true",
+        help="Zustandsänderungen in der Antwort deklarieren statt per Tool, eine Modellanfrage pro Zug",
+    )
+    parser.add_argument(
+        "--planner-hints",
+        action="store_true",
+        help="Den Beamten bei jeder Anfrage den nächsten Schritt des Spielers mitgeben",
+    )
+    parser.add_argument(
+        "--prebuild",
+        action="store_true",
+        help="Alle Beamten gleich im Hintergrund vorbereiten statt beim ersten Besuch",
+    )
+    parser.add_argument(
+        "--record", metavar="DATEI", help="Alle Anfragen an das Sprachmodell in einer Kassette aufzeichnen"
+    )
+    parser.add_argument("--replay", metavar="DATEI", help="Eine aufgezeichnete Kassette abspielen, ohne Netzwerk")
+    parser.add_argument(
+        "--save-dir", default=".saves", metavar="VERZEICHNIS", help="Verzeichnis für /speichern und /laden"
+    )
+    parser.add_argument(
+        "--metrics-file", metavar="DATEI", help="Statistik nach jedem Zug im Prometheus-Textformat in DATEI schreiben"
+    )
     args = parser.parse_args()
     if args.api_key:
         os.environ["OPENAI_API_KEY"] = args.api_key
-    if not setup_api_key():
+    try:
+        cassette = open_cassette(record=args.record, replay=args.replay)
+    except (OSError, ValueError) as e:
+        print(f"Kassette kann nicht geöffnet werden: {e}")
         return
-    clear_screen()
+    models = [args.model] if args.model else configured_models(get_config())
+    if any(map(requires_api_key, models)) and not args.replay and not setup_api_key():
+        return
+    pacing = resolve_pacing(args.pacing)
+    if pacing.clear_screen:
+        clear_screen()
     print("Initialisiere das Finanzamt...")
     print("Verbinde mit KI-Beamten...")
-    time.sleep(1)
-    game = GameEngine()
+    response_cache = None
+    if args.cache or args.cache_dir:
+        response_cache = ResponseCache(disk_dir=args.cache_dir)
+    game = GameEngine(
+        stream=args.stream,
+        response_cache=response_cache,
+        fast_path=args.fast_path,
+        prebuild_agents=args.prebuild,
+        model=args.model,
+        cassette=cassette,
+        telemetry=Telemetry(export_path=args.metrics_file),
+        single_shot=args.single_shot,
+        planner_hints=args.planner_hints,
+        pacing=pacing,
+        output=make_sink(args.output),
+    )
     if game.game_over:
         return
     game.start_game()
 
-    command_manager = setup_commands(game)
+    command_manager = setup_commands(game, saves=FileSnapshotStore(args.save_dir))
 
     # Main game loop with slash command support
     while not game.game_over:
@@ -129,7 +289,9 @@ def main():
             arg = parts[1] if len(parts) > 1 else None
             cmd = command_manager.get_command(cmd_name)
             if cmd:
-                cmd.handler(arg)
+                result = cmd.handler(arg)
+                if inspect.isawaitable(result):
+                    run_sync(result)
                 continue
             else:
                 # Suggest closest command
@@ -149,6 +311,7 @@ def main():
         print("*" * 60 + "\n")
     else:
         print("\nVielen Dank für Ihren Besuch im Finanzamt. Kommen Sie bald wieder.")
+    run_sync(close_http_client())
 
 
 # allow running as a module: python -m buergeramt
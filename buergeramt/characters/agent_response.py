@@ -1,5 +1,15 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from buergeramt.rules.actions import Action
 
 
 class AgentResponse(BaseModel):
     response_text: str
+
+
+class ActionResponse(AgentResponse):
+    """single-shot reply: the state changes are declared here instead of made by tool calls"""
+
+    actions: List[Action] = Field(default_factory=list)
@@ -1,75 +1,106 @@
+import asyncio
+import dataclasses
 import os
+import time
+from collections import deque
+from typing import Callable, Optional
 
 from dotenv import load_dotenv
 from pydantic_ai import Agent, Tool
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
 
-from buergeramt.characters.agent_response import AgentResponse
+from buergeramt.characters.agent_response import ActionResponse, AgentResponse
+from buergeramt.characters.history import ConversationHistory, turn_text
+from buergeramt.characters.model_backend import DEFAULT_MODEL, requires_api_key, resolve_model
+from buergeramt.characters.prompt_compiler import (
+    FALLBACK_PROMPT,
+    get_prompt_compiler,
+    strip_volatile_messages,
+    with_volatile,
+)
+from buergeramt.characters.response_cache import CachedResponse, make_key
+from buergeramt.characters.retries import backoff_delay, is_retryable
 from buergeramt.rules.game_state import (
     GameDeps,
     add_document,
+    add_documents,
     add_evidence,
+    add_evidences,
     decrease_frustration,
     increase_frustration,
     switch_department,
 )
+from buergeramt.rules.intents import ANNOTATION_START, IntentMatcher
+from buergeramt.rules.models import HistoryPolicy, ModelConfig, RetryPolicy
+from buergeramt.utils.async_utils import run_sync
 from buergeramt.utils.game_logger import get_logger
+from buergeramt.utils.telemetry import CallTimer
+
+INTRODUCTION_PROMPT = (
+    "The user has just entered your office. Introduce yourself and your role and ask what you can help them with."
+)
+SUMMARY_PROMPT = (
+    "Fasse das Gespräch zwischen Bürger und Beamtem knapp auf Deutsch zusammen. "
+    "Behalte vorgelegte Nachweise, ausgestellte Dokumente und offene Anliegen, lasse Smalltalk weg."
+)
 
 
 class Bureaucrat:
-    def __init__(self, name, title, department, system_prompt=None):
+    def __init__(
+        self,
+        name,
+        title,
+        department,
+        system_prompt=None,
+        history_policy: Optional[HistoryPolicy] = None,
+        model: Optional[str] = None,
+        cassette=None,
+        retry_policy: Optional[RetryPolicy] = None,
+        model_config: Optional[ModelConfig] = None,
+        http_client=None,
+        single_shot: bool = False,
+    ):
         self.name = name
         self.title = title
         self.department = department
         self.last_message = None
+        # without a policy the history grows unbounded, like a plain all_messages() chain
+        self.history = ConversationHistory(history_policy)
+        self._summary_agent = None
+        # optional ResponseCache, shared between bureaucrats (see AgentRouter)
+        self.response_cache = None
+        # optional Telemetry of the game session (see AgentRouter)
+        self.telemetry = None
+        # without a policy a failed turn is rolled back but not retried
+        self.retry_policy = retry_policy
+        # wall times of recent successful turns, for the hedging threshold
+        self._latencies = deque(maxlen=200)
+        # optional callable game_state -> str with context that changes during the game; it is sent
+        # at the end of the request so the system prompt and history stay a byte-stable prefix
+        self.volatile_context: Optional[Callable[[object], Optional[str]]] = None
+        # name, output cap, temperature, timeout and the cheap tier for simple turns
+        self.model_config = model_config or ModelConfig()
+        # single-shot: no state tools, the reply declares its actions and the engine applies them
+        self.single_shot = single_shot
+        self._actions = []
 
-        if system_prompt is None:
-            from buergeramt.rules.loader import get_config
+        from buergeramt.rules.loader import get_config
 
+        if system_prompt is None:
             config = get_config()
-            persona = None
-
-            for p in config.personas.values():
-                if p.name == name and p.role == title and p.department == department:
-                    persona = p
-                    break
-
-            if persona is not None:
-                personality_text = "\n".join(f"- {trait}" for trait in persona.personality)
-                handled_docs = ", ".join(persona.handled_documents)
-                required_evidence = ", ".join(persona.required_evidence)
-                tool_instructions = (
-                    "\n---\n"
-                    "You have access to the following tools for updating the game state. Whenever the user provides a document or evidence, always use the appropriate tool. Do not just mention the action, always call the tool.\n"
-                    "\n"
-                    "Tool usage examples:\n"
-                    "- If the user says 'Hier ist mein Personalausweis', call add_evidence with evidence_name='valid_id', evidence_form='Personalausweis'.\n"
-                    "- If the user says 'Ich reiche die Schenkungsanmeldung ein', call add_document with document_name='Schenkungsanmeldung'.\n"
-                    "- If the user expresses frustration (e.g., 'Das ist doch lächerlich!'), call increase_frustration.\n"
-                    "- If the user calms down, call decrease_frustration.\n"
-                    "\n"
-                    "Tool reference:\n"
-                    "- add_document(document_name: str)\n"
-                    "- add_evidence(evidence_name: str, evidence_form: str)\n"
-                    "- increase_frustration(amount: int = 1)\n"
-                    "- decrease_frustration(amount: int = 1)\n"
-                    "- switch_department(department: str)\n"
-                    "---\n"
-                )
-                self.system_prompt = (
-                    persona.system_prompt_template.format(
-                        name=persona.name,
-                        role=persona.role,
-                        department=persona.department,
-                        personality=personality_text,
-                        handled_documents=handled_docs,
-                        required_evidence=required_evidence,
-                    )
-                    + tool_instructions
-                )
+            persona_id = next(
+                (
+                    pid
+                    for pid, p in config.personas.items()
+                    if p.name == name and p.role == title and p.department == department
+                ),
+                None,
+            )
+            if persona_id is not None:
+                system_prompt = get_prompt_compiler().compile(persona_id, config, single_shot=single_shot).text
             else:
-                self.system_prompt = "You are a helpful bureaucrat. Always use tools to update the game state."
-        else:
-            self.system_prompt = system_prompt
+                system_prompt = FALLBACK_PROMPT
+        self.system_prompt = system_prompt
 
         tools = [
             Tool(
@@ -82,6 +113,16 @@ class Bureaucrat:
                 name="add_evidence",
                 description="Add evidence to the player's collection",
             ),
+            Tool(
+                add_documents,
+                name="add_documents",
+                description="Add several documents at once; returns one result per document",
+            ),
+            Tool(
+                add_evidences,
+                name="add_evidences",
+                description="Add several pieces of evidence at once; returns one result per item",
+            ),
             Tool(
                 increase_frustration,
                 name="increase_frustration",
@@ -101,54 +142,400 @@ class Bureaucrat:
 
         self.logger = get_logger()
 
-        load_dotenv()
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError(
-                "OPENAI_API_KEY is not set in the environment. Please create a .env file or set the variable!"
-            )
+        self.model_name = model or self.model_config.name or DEFAULT_MODEL
+        self.cheap_model_name = self.model_config.cheap_model
+        if self.cheap_model_name == self.model_name:
+            self.cheap_model_name = None
+        # optional Cassette that records or replays every model request
+        self.cassette = cassette
+        # optional shared httpx2.AsyncClient for provider models (see http_client.py)
+        self.http_client = http_client
+        needs_key = requires_api_key(self.model_name) or (
+            self.cheap_model_name is not None and requires_api_key(self.cheap_model_name)
+        )
+        if needs_key and not (cassette is not None and cassette.replaying):
+            load_dotenv()
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError(
+                    "OPENAI_API_KEY is not set in the environment. Please create a .env file or set the variable!"
+                )
 
         self.agent = Agent(
-            "openai:gpt-4o-mini",
+            resolve_model(
+                self.model_name, introduction_prompt=INTRODUCTION_PROMPT, cassette=cassette, http_client=http_client
+            ),
             system_prompt=self.system_prompt,
-            output_type=AgentResponse,
-            tools=tools,
+            output_type=ActionResponse if single_shot else AgentResponse,
+            tools=[] if single_shot else tools,
+            model_settings=self.model_config.settings() or None,
+            # run tool calls that arrive together with the final answer, streamed runs included
+            end_strategy="exhaustive",
         )
+        # simple turns (greetings, pure submissions) go to the cheap model and/or get a smaller output cap
+        self._cheap_model = None
+        if self.cheap_model_name is not None:
+            self._cheap_model = resolve_model(
+                self.cheap_model_name,
+                introduction_prompt=INTRODUCTION_PROMPT,
+                cassette=cassette,
+                http_client=http_client,
+            )
+        self._intents = None
+        if self._cheap_model is not None or self.model_config.cheap_max_tokens is not None:
+            self._intents = IntentMatcher(get_config())
 
         self.logger.logger.info(f"Initialized bureaucrat: {name}, {title} ({department})")
-        print(f"Using {self.agent.model.model_name} for {name}")
+        self.logger.logger.info(f"Using {self.agent.model.model_name} for {name}")
+
+    def _message_history(self):
+        return self.history.for_request()
+
+    def _remember(self, result):
+        self.last_message = result
+        if hasattr(result, "all_messages"):
+            # stale volatile context is dropped, the next request brings a fresh one
+            self.history.record(strip_volatile_messages(result.all_messages()))
+
+    def compact_history(self) -> bool:
+        """fold old turns into the running summary; meant to be called after the reply was shown"""
+        if self.history.policy is not None and self.history.policy.summarizer == "model":
+            return run_sync(self.compact_history_async())
+        return self.history.compact()
+
+    async def compact_history_async(self) -> bool:
+        summarizer = None
+        if self.history.policy is not None and self.history.policy.summarizer == "model":
+            summarizer = self._summarize_with_model
+        try:
+            return await self.history.compact_async(summarizer)
+        except Exception as e:
+            # summarization is best effort, the next request still trims the history
+            self.logger.log_error(e, f"History summarization for {self.name}")
+            return False
+
+    async def _summarize_with_model(self, previous: str, turns) -> str:
+        if self._summary_agent is None:
+            self._summary_agent = Agent(self.agent.model, output_type=str, system_prompt=SUMMARY_PROMPT)
+        transcript = "\n".join(f"Bürger: {user}\n{self.name}: {reply}" for user, reply in map(turn_text, turns))
+        with self._timed("summary") as call:
+            result = await self._summary_agent.run(
+                f"Bisherige Zusammenfassung:\n{previous or '-'}\n\nNeue Gesprächsrunden:\n{transcript}"
+            )
+            call.add_run(result)
+        return result.output[: self.history.policy.summary_max_chars]
 
     def introduce(self, game_state) -> str:
         deps = GameDeps(game_state=game_state)
-        result = self.agent.run_sync(
-            "The user has just entered your office. Introduce yourself and your role and ask what you can help them with.",
-            deps=deps,
-            message_history=self.last_message.all_messages() if self.last_message else None,
-        )
-        self.last_message = result
+        with self._timed("introduce") as call:
+            result = self.agent.run_sync(
+                INTRODUCTION_PROMPT,
+                deps=deps,
+                message_history=self._message_history(),
+            )
+            call.add_run(result)
+        self._remember(result)
+        return result.output.response_text
+
+    async def introduce_async(self, game_state) -> str:
+        """async variant of introduce, for use inside a running event loop"""
+        deps = GameDeps(game_state=game_state)
+        with self._timed("introduce") as call:
+            result = await self.agent.run(
+                INTRODUCTION_PROMPT,
+                deps=deps,
+                message_history=self._message_history(),
+            )
+            call.add_run(result)
+        self._remember(result)
         return result.output.response_text
 
-    def respond(self, query, game_state) -> str:
+    async def generate_introduction_async(self, game_state) -> tuple:
+        """generate a fresh introduction without touching this bureaucrat's history (used for pooling)
+
+        returns the text and the run's messages, which can later seed a bureaucrat's history
+        """
+        with self._timed("introduce") as call:
+            result = await self.agent.run(INTRODUCTION_PROMPT, deps=GameDeps(game_state=game_state))
+            call.add_run(result)
+        return result.output.response_text, result.all_messages()
+
+    def respond(self, query, game_state, on_text: Optional[Callable[[str], None]] = None) -> str:
         """
         respond to user input and return only a text response for the game engine to process.
         all game state changes must be handled by tool calls from the model, not by parsing output.
+        if on_text is given, the reply is streamed and on_text receives each new chunk of response_text.
+        a failed turn leaves game_state as it was before the call.
         """
-        deps = GameDeps(game_state=game_state)
-        try:
-            result = self.agent.run_sync(
+        if on_text is not None or self.retry_policy is not None:
+            # timeouts, retries and hedged requests run on the event loop
+            return run_sync(self.respond_async(query, game_state, on_text=on_text))
+        with self._timed("respond") as call:
+            cache_key = self._cache_key(query, game_state)
+            cached = self._replay_cached(cache_key, query, game_state)
+            if cached is not None:
+                call.record.cached = True
+                return cached
+            deps = GameDeps(game_state=game_state)
+            snapshot = game_state.snapshot()
+            game_state.hold_events()
+            try:
+                result = self.agent.run_sync(
+                    self._model_query(query, game_state),
+                    deps=deps,
+                    message_history=self._message_history(),
+                    **self._run_options(query, call),
+                )
+                call.add_run(result)
+                text = self._handle_result(result, cache_key=cache_key)
+            except Exception as e:
+                game_state.restore(snapshot)
+                game_state.discard_events()
+                raise self._api_error(e, query)
+            game_state.release_events()
+            return text
+
+    async def respond_async(self, query, game_state, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """async variant of respond; does not block the event loop while waiting for the model"""
+        with self._timed("respond") as call:
+            on_text = call.watch(on_text)
+            cache_key = self._cache_key(query, game_state)
+            cached = self._replay_cached(cache_key, query, game_state)
+            if cached is not None:
+                call.record.cached = True
+                if on_text is not None:
+                    on_text(cached)
+                return cached
+            try:
+                return await self._run_turn(query, game_state, on_text, cache_key, call)
+            except Exception as e:
+                raise self._api_error(e, query)
+
+    async def _run_turn(
+        self, query, game_state, on_text: Optional[Callable[[str], None]], cache_key: Optional[str], call: CallTimer
+    ) -> str:
+        """run a turn transactionally: a failed attempt is rolled back and, if the failure is transient, retried"""
+        policy = self.retry_policy
+        attempts = policy.attempts if policy is not None else 1
+        snapshot = game_state.snapshot()
+        options = self._run_options(query, call)
+        query = self._model_query(query, game_state)
+        for attempt in range(1, attempts + 1):
+            shown = []
+            started = time.perf_counter()
+            # state messages of an attempt are shown once it has succeeded, never for a rolled back one
+            game_state.hold_events()
+            try:
+                if on_text is not None:
+
+                    def watched(chunk: str):
+                        shown.append(chunk)
+                        on_text(chunk)
+
+                    deps = GameDeps(game_state=game_state)
+                    text = await self._with_timeout(
+                        self._respond_streamed(query, deps, watched, cache_key, call, options)
+                    )
+                else:
+                    result = await self._run_model(query, game_state, call, options)
+                    call.add_run(result)
+                    text = self._handle_result(result, cache_key=cache_key)
+                self._latencies.append(time.perf_counter() - started)
+                game_state.release_events()
+                return text
+            except asyncio.CancelledError:
+                game_state.discard_events()
+                raise
+            except Exception as e:
+                game_state.restore(snapshot)
+                game_state.discard_events()
+                # streamed text cannot be taken back, so a stream is only retried before its first chunk
+                if attempt >= attempts or shown or not is_retryable(e):
+                    raise
+                call.record.retries += 1
+                delay = backoff_delay(policy, attempt)
+                self.logger.log_error(e, f"{self.name}, attempt {attempt} of {attempts}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _run_model(self, query, game_state, call: CallTimer, options: Optional[dict] = None):
+        options = options or {}
+        hedge_after = self._hedge_after()
+        if hedge_after is not None:
+            return await self._run_hedged(query, game_state, hedge_after, call, options)
+        return await self._with_timeout(
+            self.agent.run(
                 query,
-                deps=deps,
-                message_history=self.last_message.all_messages() if self.last_message else None,
+                deps=GameDeps(game_state=game_state),
+                message_history=self._message_history(),
+                **options,
             )
+        )
 
-            if hasattr(result, "messages"):
-                self.logger.log_ai_prompt(result.messages)
-            if hasattr(result, "response"):
-                self.logger.log_ai_response(result.response)
+    async def _run_hedged(
+        self, query, game_state, hedge_after: float, call: CallTimer, options: Optional[dict] = None
+    ):
+        """send a second request if the first has not answered after hedge_after seconds; the first success wins
 
-            self.last_message = result
-            return getattr(result.output, "response_text", str(result))
-        except Exception as e:
-            error_msg = f"API Error: {e}"
-            self.logger.log_error(e, f"AI response error for '{query}' from {self.name}")
-            raise RuntimeError(error_msg)
+        every request runs against its own fork of the game state, the winner's state is adopted
+        """
+        history = self._message_history()
+
+        async def attempt():
+            scratch = game_state.fork()
+            result = await self._with_timeout(
+                self.agent.run(
+                    query,
+                    deps=GameDeps(game_state=scratch),
+                    message_history=list(history or []) or None,
+                    **(options or {}),
+                )
+            )
+            return result, scratch
+
+        loop = asyncio.get_running_loop()
+        done, pending = await asyncio.wait({loop.create_task(attempt())}, timeout=hedge_after)
+        if not done:
+            call.record.hedged = True
+            self.logger.logger.info(f"Hedging request for {self.name} after {hedge_after:.2f}s")
+            pending.add(loop.create_task(attempt()))
+        try:
+            while True:
+                error = None
+                for task in done:
+                    if task.exception() is None:
+                        result, scratch = task.result()
+                        game_state.restore(scratch.snapshot(), notify=True)
+                        game_state.adopt_events(scratch)
+                        return result
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_after(self) -> Optional[float]:
+        """seconds after which a hedged request is sent, or None for no hedging"""
+        policy = self.retry_policy
+        if policy is None or not policy.hedge:
+            return None
+        if policy.hedge_after is not None:
+            return policy.hedge_after
+        if len(self._latencies) < policy.hedge_min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    async def _with_timeout(self, awaitable):
+        timeout = self.retry_policy.timeout if self.retry_policy is not None else None
+        return await asyncio.wait_for(awaitable, timeout)
+
+    async def _respond_streamed(
+        self,
+        query,
+        deps: GameDeps,
+        on_text: Callable[[str], None],
+        cache_key: Optional[str] = None,
+        call: Optional[CallTimer] = None,
+        options: Optional[dict] = None,
+    ) -> str:
+        """stream the reply, passing every new piece of response_text to on_text as it arrives"""
+        shown = ""
+        async with self.agent.run_stream(
+            query, deps=deps, message_history=self._message_history(), **(options or {})
+        ) as result:
+            async for partial in result.stream_output(debounce_by=None):
+                text = getattr(partial, "response_text", None) or ""
+                if len(text) > len(shown) and text.startswith(shown):
+                    on_text(text[len(shown) :])
+                    shown = text
+            output = await result.get_output()
+        if call is not None:
+            call.add_run(result)
+        text = self._handle_result(result, output, cache_key=cache_key)
+        # the final validated text can differ from the partial stream, e.g. trailing whitespace
+        if text.startswith(shown) and len(text) > len(shown):
+            on_text(text[len(shown) :])
+        return text
+
+    def _handle_result(self, result, output=None, cache_key: Optional[str] = None) -> str:
+        if hasattr(result, "messages"):
+            self.logger.log_ai_prompt(result.messages)
+        if hasattr(result, "response"):
+            self.logger.log_ai_response(result.response)
+
+        self._remember(result)
+        if output is None:
+            output = result.output
+        text = getattr(output, "response_text", str(result))
+        self._actions = list(getattr(output, "actions", []))
+        if cache_key is not None:
+            self.response_cache.put(cache_key, CachedResponse.from_run(text, result.new_messages(), self._actions))
+        return text
+
+    def take_actions(self) -> list:
+        """the actions declared by the last single-shot reply; each reply's actions are handed out once"""
+        actions, self._actions = self._actions, []
+        return actions
+
+    def _timed(self, kind: str) -> CallTimer:
+        return CallTimer(self.telemetry, self.name, kind)
+
+    def _run_options(self, query, call: Optional[CallTimer] = None) -> dict:
+        """model and model settings for a turn; simple turns take the cheap tier"""
+        if self._intents is None or not isinstance(query, str):
+            return {}
+        if not self._intents.match(query.split(ANNOTATION_START)[0]).is_simple:
+            return {}
+        if call is not None:
+            call.record.simple = True
+        options = {"model_settings": self.model_config.settings(simple=True)}
+        if self._cheap_model is not None:
+            options["model"] = self._cheap_model
+        return options
+
+    def _model_query(self, query, game_state):
+        """the user's message as sent to the model, with the volatile context at the end"""
+        if self.volatile_context is None:
+            return query
+        return with_volatile(query, self.volatile_context(game_state))
+
+    def _cache_key(self, query, game_state) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+        return make_key(self.system_prompt, query, game_state)
+
+    def _replay_cached(self, cache_key: Optional[str], query, game_state) -> Optional[str]:
+        """serve a cached turn: replay its tool calls and append its messages to the history"""
+        if cache_key is None:
+            return None
+        entry = self.response_cache.get(cache_key)
+        if entry is None:
+            return None
+        entry.replay(game_state)
+        self._actions = list(entry.actions)
+        self._append_to_history(entry.load_messages())
+        self.logger.logger.info(f"Cache hit for {self.name}: {query}")
+        return entry.response_text
+
+    def record_exchange(self, query: str, response_text: str):
+        """add a turn that was answered without the model, so the conversation stays coherent"""
+        self._append_to_history(
+            [
+                ModelRequest(parts=[UserPromptPart(content=query)]),
+                ModelResponse(parts=[TextPart(content=response_text)]),
+            ]
+        )
+
+    def _append_to_history(self, messages):
+        messages = strip_volatile_messages(messages)
+        if messages and not self.history.messages:
+            # a fresh history has to start with the system prompt
+            first = messages[0]
+            messages[0] = dataclasses.replace(first, parts=[SystemPromptPart(content=self.system_prompt), *first.parts])
+        self.history.record(self.history.messages + messages)
+
+    def _api_error(self, error: Exception, query) -> RuntimeError:
+        self.logger.log_error(error, f"AI response error for '{query}' from {self.name}")
+        return RuntimeError(f"API Error: {error}")
@@ -0,0 +1,206 @@
+"""
+Record/replay cassettes for model conversations.
+
+A recording cassette wraps the real model and appends every model request it answers
+(fingerprint of the request plus the full response, tool calls included) to a JSONL
+file. A replaying cassette answers the same requests from that file, so a session can
+be re-run through Bureaucrat.respond/introduce with identical GameState transitions and
+no network.
+"""
+
+import hashlib
+import json
+import threading
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Literal, Optional, Union
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    RetryPromptPart,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models import Model
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+from pydantic_ai.models.wrapper import WrapperModel
+
+from buergeramt.characters.history import SUMMARY_PREFIX
+from buergeramt.utils.game_logger import get_logger
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(LookupError):
+    """the replayed session sent a request that was not recorded"""
+
+
+def request_fingerprint(messages: List[ModelMessage]) -> str:
+    """hash of the persona's system prompt and the parts of the latest request
+
+    Tool call ids and timestamps are left out, so the fingerprint only changes when the
+    conversation itself does.
+    """
+    system_prompt = ""
+    for message in messages:
+        if isinstance(message, ModelRequest):
+            system_prompt = next(
+                (
+                    p.content
+                    for p in message.parts
+                    if isinstance(p, SystemPromptPart) and not p.content.startswith(SUMMARY_PREFIX)
+                ),
+                "",
+            )
+            break
+    latest = []
+    if messages and isinstance(messages[-1], ModelRequest):
+        for part in messages[-1].parts:
+            if isinstance(part, UserPromptPart):
+                latest.append(["user", str(part.content)])
+            elif isinstance(part, ToolReturnPart):
+                latest.append(["tool", part.tool_name, str(part.content)])
+            elif isinstance(part, RetryPromptPart):
+                latest.append(["retry", part.tool_name, str(part.content)])
+    payload = json.dumps([system_prompt, latest], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _prompt_text(messages: List[ModelMessage]) -> str:
+    """the latest user prompt, stored next to each entry to keep cassettes readable"""
+    for part in messages[-1].parts if messages else ():
+        if isinstance(part, UserPromptPart):
+            return str(part.content)
+    return ""
+
+
+class Cassette:
+    """model requests and responses of one session, shared by all bureaucrats"""
+
+    def __init__(self, path: Union[str, Path], mode: Literal["record", "replay"] = "replay"):
+        self.path = Path(path)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Deque[ModelResponse]] = defaultdict(deque)
+        self.recorded = 0
+        self.replayed = 0
+        if mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({"version": CASSETTE_VERSION}) + "\n", encoding="utf-8")
+        else:
+            self._load()
+
+    @classmethod
+    def record(cls, path: Union[str, Path]) -> "Cassette":
+        return cls(path, mode="record")
+
+    @classmethod
+    def replay(cls, path: Union[str, Path]) -> "Cassette":
+        return cls(path, mode="replay")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def wrap(self, model: Union[str, Model]) -> Model:
+        """the model bureaucrats should use: recording wrapper or replay model"""
+        if self.replaying:
+            return FunctionModel(self._respond, stream_function=self._stream, model_name="cassette")
+        return RecordingModel(model, self)
+
+    def remaining(self) -> int:
+        """recorded responses not replayed yet"""
+        with self._lock:
+            return sum(len(queue) for queue in self._entries.values())
+
+    def add(self, messages: List[ModelMessage], response: ModelResponse):
+        entry = {
+            "key": request_fingerprint(messages),
+            "prompt": _prompt_text(messages),
+            "response": ModelMessagesTypeAdapter.dump_python([response], mode="json")[0],
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            # appended per request, so a crashed session still leaves a usable cassette
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def take(self, messages: List[ModelMessage]) -> ModelResponse:
+        key = request_fingerprint(messages)
+        with self._lock:
+            queue = self._entries.get(key)
+            if not queue:
+                prompt = _prompt_text(messages)
+                raise CassetteMiss(f"No recorded response for request {key} ({prompt!r}) in {self.path}")
+            self.replayed += 1
+            return queue.popleft()
+
+    async def _respond(self, messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        return self.take(messages)
+
+    async def _stream(self, messages: List[ModelMessage], info: AgentInfo) -> AsyncIterator:
+        response = self.take(messages)
+        calls = [p for p in response.parts if isinstance(p, ToolCallPart)]
+        if not calls:
+            for part in response.parts:
+                if isinstance(part, TextPart):
+                    yield part.content
+            return
+        # FunctionModel streams either text or tool calls; bureaucrats answer through tools
+        for index, part in enumerate(calls):
+            yield {index: DeltaToolCall(part.tool_name, part.args_as_json_str(), tool_call_id=part.tool_call_id)}
+
+    def _load(self):
+        with self.path.open(encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version in {self.path}: {header.get('version')}")
+            for number, line in enumerate(f, start=2):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    response = ModelMessagesTypeAdapter.validate_python([entry["response"]])[0]
+                except (ValueError, KeyError) as e:
+                    # e.g. the last line of a session that crashed while writing
+                    get_logger().log_error(e, f"Reading cassette {self.path}, line {number}")
+                    continue
+                self._entries[entry["key"]].append(response)
+
+
+class RecordingModel(WrapperModel):
+    """passes requests to the wrapped model and records the responses"""
+
+    def __init__(self, wrapped: Union[str, Model], cassette: Cassette):
+        super().__init__(wrapped)
+        self.cassette = cassette
+
+    async def request(self, messages, model_settings, model_request_parameters) -> ModelResponse:
+        response = await super().request(messages, model_settings, model_request_parameters)
+        self.cassette.add(messages, response)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, messages, model_settings, model_request_parameters, run_context=None):
+        async with super().request_stream(messages, model_settings, model_request_parameters, run_context) as stream:
+            yield stream
+        self.cassette.add(messages, stream.get())
+
+
+def open_cassette(record: Optional[str] = None, replay: Optional[str] = None) -> Optional[Cassette]:
+    """cassette for the --record/--replay command line options"""
+    if record and replay:
+        raise ValueError("A session can either record or replay a cassette, not both")
+    if record:
+        return Cassette.record(record)
+    if replay:
+        return Cassette.replay(replay)
+    return None
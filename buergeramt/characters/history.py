@@ -0,0 +1,178 @@
+"""
+Bounded conversation history for bureaucrats.
+
+Keeps the last few turns verbatim, folds older turns into a running summary and
+enforces a token budget, so prompts do not grow without limit over a long session.
+"""
+
+import dataclasses
+from typing import Awaitable, Callable, List, Optional
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+
+from buergeramt.rules.models import HistoryPolicy
+
+SUMMARY_PREFIX = "## BISHERIGES GESPRÄCH (ZUSAMMENFASSUNG)\n"
+
+# a turn is the list of messages from one user prompt up to (excluding) the next one
+Turn = List[ModelMessage]
+# async summarizer: (previous summary, turns to fold) -> new summary
+Summarizer = Callable[[str, List[Turn]], Awaitable[str]]
+
+
+def estimate_text_tokens(text: str) -> int:
+    """rough token estimate (~4 characters per token), good enough for budgeting"""
+    return len(text) // 4
+
+
+def estimate_tokens(messages: List[ModelMessage]) -> int:
+    """same estimate for a list of messages"""
+    chars = 0
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, ToolCallPart):
+                chars += len(part.tool_name) + len(part.args_as_json_str())
+            else:
+                content = getattr(part, "content", "")
+                chars += len(content if isinstance(content, str) else str(content))
+    return chars // 4
+
+
+def _is_turn_start(message: ModelMessage) -> bool:
+    return isinstance(message, ModelRequest) and any(isinstance(p, UserPromptPart) for p in message.parts)
+
+
+def _is_summary(part) -> bool:
+    return isinstance(part, SystemPromptPart) and part.content.startswith(SUMMARY_PREFIX)
+
+
+def split_turns(messages: List[ModelMessage]) -> List[Turn]:
+    turns: List[Turn] = []
+    for message in messages:
+        if _is_turn_start(message) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def turn_text(turn: Turn) -> tuple:
+    """return (user text, reply text) of a turn"""
+    user_text, reply_text = "", ""
+    for message in turn:
+        for part in message.parts:
+            if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                user_text = part.content
+            elif isinstance(part, TextPart):
+                reply_text = part.content
+            elif isinstance(part, ToolCallPart):
+                args = part.args_as_dict()
+                if "response_text" in args:
+                    reply_text = args["response_text"]
+    return user_text, reply_text
+
+
+def extractive_summary(previous: str, turns: List[Turn], max_chars: int = 800) -> str:
+    """fold turns into the summary by keeping a shortened line per exchange (no model call)"""
+    lines = previous.splitlines() if previous else []
+    for turn in turns:
+        user_text, reply_text = turn_text(turn)
+        lines.append(f"- Bürger: {_shorten(user_text)} | Beamter: {_shorten(reply_text)}")
+    # drop the oldest lines first when the summary gets too long
+    while lines and len("\n".join(lines)) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def _shorten(text: str, limit: int = 80) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class ConversationHistory:
+    """message history of one bureaucrat, bounded by a HistoryPolicy"""
+
+    def __init__(self, policy: Optional[HistoryPolicy] = None):
+        self.policy = policy
+        self.messages: List[ModelMessage] = []
+        self.summary = ""
+
+    def record(self, messages: List[ModelMessage]):
+        """store the complete message list of the last run"""
+        self.messages = list(messages)
+
+    def clear(self):
+        self.messages = []
+        self.summary = ""
+
+    def overflow(self) -> int:
+        """number of leading turns that do not fit the policy (the latest turn is always kept)"""
+        if self.policy is None:
+            return 0
+        turns = split_turns(self.messages)
+        drop = max(0, len(turns) - self.policy.max_turns)
+        if self.policy.token_budget:
+            while drop < len(turns) - 1 and estimate_tokens(self._flatten(turns[drop:])) > self.policy.token_budget:
+                drop += 1
+        return drop
+
+    def compact(self) -> bool:
+        """fold overflowing turns into an extractive summary; returns True if anything was folded"""
+        drop = self.overflow()
+        if not drop:
+            return False
+        turns = split_turns(self.messages)
+        self._apply(turns, drop, self._extractive(self.summary, turns[:drop]))
+        return True
+
+    async def compact_async(self, summarizer: Optional[Summarizer] = None) -> bool:
+        """like compact, but can use an async (model based) summarizer"""
+        drop = self.overflow()
+        if not drop:
+            return False
+        turns = split_turns(self.messages)
+        if summarizer is None:
+            summary = self._extractive(self.summary, turns[:drop])
+        else:
+            folded = turns[:drop]
+            summary = await summarizer(self.summary, folded)
+            # new turns may have been recorded (or the history compacted) while the summarizer was running
+            turns = split_turns(self.messages)
+            if turns[:drop] != folded:
+                return False
+        self._apply(turns, drop, summary)
+        return True
+
+    def for_request(self) -> Optional[List[ModelMessage]]:
+        """history to send with the next run, within budget even if compaction has not run yet"""
+        if not self.messages:
+            return None
+        if self.overflow():
+            self.compact()
+        return list(self.messages)
+
+    def _extractive(self, previous: str, turns: List[Turn]) -> str:
+        return extractive_summary(previous, turns, self.policy.summary_max_chars if self.policy else 800)
+
+    def _apply(self, turns: List[Turn], drop: int, summary: str):
+        system_parts = [p for p in turns[0][0].parts if isinstance(p, SystemPromptPart) and not _is_summary(p)]
+        kept = self._flatten(turns[drop:])
+        if summary:
+            system_parts.append(SystemPromptPart(content=SUMMARY_PREFIX + summary))
+        # keep the system prompt (and summary) at the start of the history
+        first = kept[0]
+        parts = system_parts + [p for p in first.parts if not isinstance(p, SystemPromptPart)]
+        kept[0] = dataclasses.replace(first, parts=parts)
+        self.messages = kept
+        self.summary = summary
+
+    @staticmethod
+    def _flatten(turns: List[Turn]) -> List[ModelMessage]:
+        return [message for turn in turns for message in turn]
+
@@ -0,0 +1,82 @@
+"""
+Process-wide HTTP client for model providers.
+
+Without it every Bureaucrat's provider opens its own client and connection pool, so a
+department switch often starts on a cold TCP/TLS connection and a multi-session process
+keeps many idle sockets. build_bureaucrat injects this one client into every agent instead.
+Its connections belong to the event loop that opened them, so the client is meant to be
+used from one loop (the game's loop, or the server's).
+"""
+
+import importlib.util
+import os
+import threading
+from typing import Optional
+
+import httpx2
+from pydantic_ai.models import get_user_agent
+
+from buergeramt.rules.models import HttpClientConfig
+from buergeramt.utils.game_logger import get_logger
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+def create_http_client(settings: Optional[HttpClientConfig] = None) -> httpx2.AsyncClient:
+    """a keep-alive client with the configured pool limits; HTTP/2 if h2 is installed"""
+    settings = settings or HttpClientConfig()
+    http2 = settings.http2 and importlib.util.find_spec("h2") is not None
+    if settings.http2 and not http2:
+        get_logger().logger.info("h2 is not installed, the shared HTTP client uses HTTP/1.1")
+    return httpx2.AsyncClient(
+        http2=http2,
+        timeout=httpx2.Timeout(settings.timeout, connect=settings.connect_timeout),
+        limits=httpx2.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        headers={"User-Agent": get_user_agent()},
+    )
+
+
+async def warm_up(client: Optional[httpx2.AsyncClient] = None, base_url: Optional[str] = None) -> bool:
+    """open a connection to the provider ahead of the first model call
+
+    any HTTP response means the TCP/TLS handshake is done and the connection is back in the
+    pool; returns False if the provider could not be reached
+    """
+    client = client or get_http_client()
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or DEFAULT_BASE_URL
+    try:
+        await client.head(base_url)
+    except httpx2.HTTPError as e:
+        get_logger().log_error(e, f"Warming up connection to {base_url}")
+        return False
+    get_logger().logger.info(f"Warmed up connection to {base_url}")
+    return True
+
+
+# Singleton instance
+_http_client: Optional[httpx2.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def get_http_client() -> httpx2.AsyncClient:
+    """Get or create the shared HTTP client, configured by the http section of config.yaml"""
+    global _http_client
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            from buergeramt.rules.loader import get_config
+
+            _http_client = create_http_client(get_config().http)
+        return _http_client
+
+
+async def close_http_client():
+    """close the shared client's connections, e.g. when the process shuts down"""
+    global _http_client
+    with _lock:
+        client, _http_client = _http_client, None
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,61 @@
+"""
+Model backend selection for bureaucrats.
+
+Model names are pydantic_ai model strings (e.g. "openai:gpt-4o-mini"); the special
+name "offline" selects the deterministic scripted model from offline_model.py. A
+Cassette (see cassette.py) wraps whichever model is selected. Provider models can be
+given a shared HTTP client (see http_client.py).
+"""
+
+from typing import List, Optional, Union
+
+from pydantic_ai.models import Model, infer_model
+from pydantic_ai.providers import infer_provider_class
+
+DEFAULT_MODEL = "openai:gpt-4o-mini"
+OFFLINE_MODELS = ("offline", "scripted")
+
+
+def is_offline(model_name: Optional[str]) -> bool:
+    return (model_name or DEFAULT_MODEL) in OFFLINE_MODELS
+
+
+def requires_api_key(model_name: Optional[str]) -> bool:
+    """whether the model needs OPENAI_API_KEY"""
+    return (model_name or DEFAULT_MODEL).startswith("openai:")
+
+
+def configured_models(config) -> List[str]:
+    """every model name the personas of a config use, cheap tiers included"""
+    names = []
+    for persona in config.personas.values():
+        for name in (persona.model.name or DEFAULT_MODEL, persona.model.cheap_model):
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+def resolve_model(
+    model_name: Optional[str], introduction_prompt: Optional[str] = None, cassette=None, http_client=None
+) -> Union[str, Model]:
+    """turn a model name into something pydantic_ai's Agent accepts
+
+    with http_client, the model's provider sends its requests through that client
+    """
+    model_name = model_name or DEFAULT_MODEL
+    if cassette is not None and cassette.replaying:
+        # replayed sessions never reach the named model
+        return cassette.wrap(model_name)
+    if model_name in OFFLINE_MODELS:
+        from buergeramt.characters.offline_model import offline_model
+
+        model = offline_model(introduction_prompt=introduction_prompt)
+    elif http_client is not None:
+        model = infer_model(model_name, provider_factory=lambda provider: _provider(provider, http_client))
+    else:
+        model = model_name
+    return cassette.wrap(model) if cassette is not None else model
+
+
+def _provider(provider: str, http_client):
+    return infer_provider_class(provider)(http_client=http_client)
@@ -0,0 +1,266 @@
+"""
+Deterministic offline model for bureaucrats.
+
+Built on pydantic_ai's FunctionModel: it reads the player's input, emits the tool calls
+the config implies (evidence, documents, department changes, frustration) and answers
+with a canned German reply. No network, no API key, so the engine can be load-tested
+and benchmarked without a provider.
+"""
+
+import hashlib
+import json
+import re
+from typing import AsyncIterator, List, Optional
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+from buergeramt.characters.prompt_compiler import strip_volatile
+from buergeramt.rules.intents import ANNOTATION_START, IntentMatcher, normalize
+from buergeramt.rules.loader import get_config
+
+FRUSTRATION_WORDS = ("lächerlich", "unverschämt", "frechheit", "absurd", "reicht", "wahnsinn", "kafka", "nervt")
+CALM_WORDS = ("entschuldigung", "tut mir leid", "verstehe", "danke")
+MOVE_WORDS = ("zu ", "gehe", "wechsel", "abteilung", "möchte zu", "will zu")
+
+INTRODUCTIONS = [
+    "Guten Tag. {name}, {role}, Abteilung {department}. Nehmen Sie Platz, aber fassen Sie nichts an. Was wollen Sie?",
+    "{name}, {department}. Sie haben hoffentlich eine Wartenummer gezogen. Also, worum geht es?",
+]
+ACCEPTED = [
+    "Soso. {items}. Das lege ich zu den Akten.",
+    "{items}, aha. Ordnungsgemäß erfasst, unter Vorbehalt.",
+]
+ISSUED = [
+    "Na schön. {items} ist hiermit ausgestellt. Stempel drauf, fertig.",
+    "Sie haben Glück, der Stempel ist noch warm. {items} ist ausgestellt.",
+]
+REJECTED = [
+    "So geht das nicht. {reason}",
+    "Da fehlt noch was. {reason}",
+]
+INVALID = [
+    "Das kann ich so nicht annehmen. Bringen Sie etwas Ordentliches.",
+]
+MOVED = [
+    "Dafür bin ich nicht zuständig. Gehen Sie zur Abteilung {department}.",
+]
+SMALLTALK = [
+    "Wie bitte? Formulieren Sie Ihr Anliegen bitte amtlich.",
+    "Dafür gibt es ein Formular. Welches, müssen Sie selbst herausfinden.",
+    "Bringen Sie mir die nötigen Nachweise, dann sehen wir weiter.",
+    "Das steht alles im Merkblatt. Das Merkblatt ist leider vergriffen.",
+]
+FRUSTRATED = [
+    "Nun regen Sie sich mal nicht auf. Hier geht alles seinen geordneten Gang.",
+]
+
+
+def _pick(options: List[str], seed: str) -> str:
+    """deterministic choice, so identical inputs give identical replies"""
+    digest = hashlib.sha256(seed.encode()).digest()
+    return options[digest[0] % len(options)]
+
+
+class ScriptedBureaucrat:
+    """the function behind the offline FunctionModel"""
+
+    def __init__(self, config=None, introduction_prompt: Optional[str] = None):
+        self.config = config or get_config()
+        self.matcher = IntentMatcher(self.config)
+        self.introduction_prompt = introduction_prompt
+
+    def __call__(self, messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        return ModelResponse(parts=self.respond(messages, info))
+
+    async def stream(self, messages: List[ModelMessage], info: AgentInfo) -> AsyncIterator:
+        for index, part in enumerate(self.respond(messages, info)):
+            args = part.args_as_json_str()
+            for start in range(0, len(args), 12):
+                name = part.tool_name if start == 0 else None
+                yield {index: DeltaToolCall(name=name, json_args=args[start : start + 12])}
+
+    def respond(self, messages: List[ModelMessage], info: AgentInfo) -> List[ToolCallPart]:
+        persona = self._persona(messages)
+        request = messages[-1]
+        user_text = next((p.content for p in request.parts if isinstance(p, UserPromptPart)), None)
+        # the output tool's return of the previous run can share a request with the new prompt
+        returns = [p for p in request.parts if isinstance(p, ToolReturnPart)]
+        if returns and user_text is None:
+            # second step of a turn: answer based on what the tools reported
+            return [self._final(info, self._reply_for_tool_results(returns, messages))]
+        if not isinstance(user_text, str):
+            user_text = str(user_text or "")
+        if self.introduction_prompt and user_text == self.introduction_prompt:
+            return [self._final(info, _pick(INTRODUCTIONS, persona["name"]).format(**persona))]
+        calls = self._tool_calls(strip_volatile(user_text).split(ANNOTATION_START)[0], persona)
+        if calls and _single_shot(info):
+            # no tools in single-shot mode: the same changes go into the answer as actions
+            actions = [action for call in calls for action in _as_actions(call)]
+            return [self._final(info, self._reply_for_actions(actions, user_text), actions)]
+        if calls:
+            return calls
+        if ANNOTATION_START in user_text:
+            reply = _pick(ACCEPTED, user_text).format(items="Ihre Unterlagen")
+        else:
+            reply = _pick(SMALLTALK, user_text)
+        return [self._final(info, reply)]
+
+    def _tool_calls(self, user_text: str, persona: dict) -> List[ToolCallPart]:
+        intent = self.matcher.match(user_text)
+        calls = []
+        # several items go into one batched call, like the tool instructions ask for;
+        # items the player only asks about or does not have are not handed over
+        if intent.is_submission and len(intent.evidence) > 1:
+            items = [{"evidence_name": ev_id, "evidence_form": form} for ev_id, form in intent.evidence]
+            calls.append(ToolCallPart("add_evidences", {"items": items}))
+        elif intent.is_submission and intent.evidence:
+            ev_id, form = intent.evidence[0]
+            calls.append(ToolCallPart("add_evidence", {"evidence_name": ev_id, "evidence_form": form}))
+        if intent.is_submission and len(intent.documents) > 1:
+            calls.append(ToolCallPart("add_documents", {"document_names": list(intent.documents)}))
+        elif intent.is_submission and intent.documents:
+            calls.append(ToolCallPart("add_document", {"document_name": intent.documents[0]}))
+        text = user_text.casefold()
+        if any(word in text for word in FRUSTRATION_WORDS) or text.count("!") >= 2:
+            calls.append(ToolCallPart("increase_frustration", {"amount": 1}))
+        elif any(word in text for word in CALM_WORDS):
+            calls.append(ToolCallPart("decrease_frustration", {"amount": 1}))
+        department = self._requested_department(user_text, persona)
+        if department:
+            calls.append(ToolCallPart("switch_department", {"department": department}))
+        return calls
+
+    def _requested_department(self, user_text: str, persona: dict) -> Optional[str]:
+        text = f" {normalize(user_text)} "
+        if not any(word in user_text.casefold() for word in MOVE_WORDS):
+            return None
+        for other in self.config.personas.values():
+            if other.department == persona["department"]:
+                continue
+            surname = normalize(other.name).split()[-1]
+            if f" {surname} " in text or f" {normalize(other.department)} " in text:
+                return other.department
+        return None
+
+    def _reply_for_tool_results(self, returns: List[ToolReturnPart], messages: List[ModelMessage]) -> str:
+        calls = {
+            part.tool_call_id: part
+            for message in messages
+            if isinstance(message, ModelResponse)
+            for part in message.parts
+            if isinstance(part, ToolCallPart)
+        }
+        accepted, issued, rejected, invalid, moved, frustrated = [], [], [], False, None, False
+        for result in returns:
+            call = calls.get(result.tool_call_id)
+            args = call.args_as_dict() if call else {}
+            content = result.content
+            if result.tool_name == "add_evidence":
+                if content is True:
+                    accepted.append(args.get("evidence_form", ""))
+                else:
+                    invalid = True
+            elif result.tool_name == "add_document":
+                text = str(content)
+                if "erfolgreich" in text:
+                    issued.append(args.get("document_name", ""))
+                else:
+                    rejected.append(text)
+            elif result.tool_name == "add_evidences":
+                accepted += [item["evidence_form"] for item in content if item["accepted"]]
+                invalid = invalid or not all(item["accepted"] for item in content)
+            elif result.tool_name == "add_documents":
+                issued += [item["document_name"] for item in content if item["added"]]
+                rejected += [item["message"] for item in content if not item["added"]]
+            elif result.tool_name == "switch_department" and content:
+                moved = args.get("department")
+            elif result.tool_name == "increase_frustration":
+                frustrated = True
+        seed = json.dumps([r.tool_name for r in returns]) + str(len(messages))
+        sentences = []
+        if accepted:
+            sentences.append(_pick(ACCEPTED, seed).format(items=", ".join(accepted)))
+        if issued:
+            sentences.append(_pick(ISSUED, seed).format(items=", ".join(issued)))
+        if rejected:
+            sentences.append(_pick(REJECTED, seed).format(reason=" ".join(rejected)))
+        if invalid:
+            sentences.append(_pick(INVALID, seed))
+        if frustrated:
+            sentences.append(_pick(FRUSTRATED, seed))
+        if moved:
+            sentences.append(_pick(MOVED, seed).format(department=moved))
+        return " ".join(sentences) or _pick(SMALLTALK, seed)
+
+    def _reply_for_actions(self, actions: List[dict], seed: str) -> str:
+        """what the bureaucrat says about the actions it declares; their outcome is rendered by the engine"""
+        accepted = [action["evidence_form"] for action in actions if action["type"] == "add_evidence"]
+        issued = [action["document_name"] for action in actions if action["type"] == "add_document"]
+        moved = next((action["department"] for action in actions if action["type"] == "switch_department"), None)
+        sentences = []
+        if accepted:
+            sentences.append(_pick(ACCEPTED, seed).format(items=", ".join(accepted)))
+        if issued:
+            sentences.append(_pick(ISSUED, seed).format(items=", ".join(issued)))
+        if any(action["type"] == "frustration" and action["delta"] > 0 for action in actions):
+            sentences.append(_pick(FRUSTRATED, seed))
+        if moved:
+            sentences.append(_pick(MOVED, seed).format(department=moved))
+        return " ".join(sentences) or _pick(SMALLTALK, seed)
+
+    def _persona(self, messages: List[ModelMessage]) -> dict:
+        """name, role and department from the '## ROLE:' line of the system prompt"""
+        for message in messages:
+            if not isinstance(message, ModelRequest):
+                continue
+            for part in message.parts:
+                if isinstance(part, SystemPromptPart):
+                    match = re.search(r"## ROLE: (.+?), (.+?), .*\(Abteilung (.+?)\)", part.content)
+                    if match:
+                        return {"name": match.group(1), "role": match.group(2), "department": match.group(3)}
+        return {"name": "Der Sachbearbeiter", "role": "Beamter", "department": "Erstbearbeitung"}
+
+    @staticmethod
+    def _final(info: AgentInfo, text: str, actions: Optional[List[dict]] = None) -> ToolCallPart:
+        args = {"response_text": text}
+        if actions:
+            args["actions"] = actions
+        return ToolCallPart(info.output_tools[0].name, args)
+
+
+def _single_shot(info: AgentInfo) -> bool:
+    """whether the output schema takes actions (ActionResponse) instead of tool calls"""
+    return bool(info.output_tools) and "actions" in info.output_tools[0].parameters_json_schema.get("properties", {})
+
+
+def _as_actions(call: ToolCallPart) -> List[dict]:
+    """the single-shot actions equivalent to a tool call"""
+    args = call.args_as_dict()
+    if call.tool_name == "add_evidence":
+        return [{"type": "add_evidence", **args}]
+    if call.tool_name == "add_evidences":
+        return [{"type": "add_evidence", **item} for item in args["items"]]
+    if call.tool_name == "add_document":
+        return [{"type": "add_document", **args}]
+    if call.tool_name == "add_documents":
+        return [{"type": "add_document", "document_name": name} for name in args["document_names"]]
+    if call.tool_name in ("increase_frustration", "decrease_frustration"):
+        sign = 1 if call.tool_name == "increase_frustration" else -1
+        return [{"type": "frustration", "delta": sign * args.get("amount", 1)}]
+    if call.tool_name == "switch_department":
+        return [{"type": "switch_department", **args}]
+    return []
+
+
+def offline_model(config=None, introduction_prompt: Optional[str] = None) -> FunctionModel:
+    scripted = ScriptedBureaucrat(config, introduction_prompt)
+    return FunctionModel(scripted, stream_function=scripted.stream, model_name="offline")
@@ -0,0 +1,254 @@
+"""
+System prompt compiler for bureaucrats.
+
+Renders each persona's system prompt once per config version and keeps it together with
+its content hash and an estimated token count. The compiled prompt is fully static, so
+it is a byte-stable prefix of every request and provider-side prompt caching can hit.
+Anything that changes during a game (volatile context) is rendered separately and sent
+at the end of the request, after the conversation.
+"""
+
+import dataclasses
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from pydantic_ai.messages import ModelMessage, ModelRequest, UserPromptPart
+
+from buergeramt.characters.history import estimate_text_tokens
+from buergeramt.rules.game_config import GameConfig
+from buergeramt.rules.loader import get_config
+from buergeramt.utils.game_logger import get_logger
+
+TOOL_INSTRUCTIONS = (
+    "\n---\n"
+    "You have access to the following tools for updating the game state. Whenever the user provides a document or evidence, always use the appropriate tool. Do not just mention the action, always call the tool.\n"
+    "\n"
+    "Tool usage examples:\n"
+    "- If the user says 'Hier ist mein Personalausweis', call add_evidence with evidence_name='valid_id', evidence_form='Personalausweis'.\n"
+    "- If the user says 'Ich reiche die Schenkungsanmeldung ein', call add_document with document_name='Schenkungsanmeldung'.\n"
+    "- If the user hands over several items at once (e.g. 'Hier sind mein Personalausweis und die handgeschriebene Widmung'), call add_evidences once with all of them instead of several add_evidence calls; for several documents call add_documents once.\n"
+    "- If the user expresses frustration (e.g., 'Das ist doch lächerlich!'), call increase_frustration.\n"
+    "- If the user calms down, call decrease_frustration.\n"
+    "\n"
+    "Tool reference:\n"
+    "- add_document(document_name: str)\n"
+    "- add_evidence(evidence_name: str, evidence_form: str)\n"
+    "- add_documents(document_names: list[str])\n"
+    "- add_evidences(items: list of {evidence_name: str, evidence_form: str})\n"
+    "- increase_frustration(amount: int = 1)\n"
+    "- decrease_frustration(amount: int = 1)\n"
+    "- switch_department(department: str)\n"
+    "---\n"
+)  # fmt: skip
+
+# replaces TOOL_INSTRUCTIONS in single-shot mode, where the reply declares its state changes
+ACTION_INSTRUCTIONS = (
+    "\n---\n"
+    "You cannot call tools. Instead, list every change to the game state in the 'actions' field of your answer, next to response_text. The game applies them after your answer and tells the user itself if one of them is not possible, so never claim that something failed.\n"
+    "\n"
+    "Action examples:\n"
+    "- If the user says 'Hier ist mein Personalausweis', add {type: 'add_evidence', evidence_name: 'valid_id', evidence_form: 'Personalausweis'}.\n"
+    "- If the user says 'Ich reiche die Schenkungsanmeldung ein', add {type: 'add_document', document_name: 'Schenkungsanmeldung'}.\n"
+    "- If the user hands over several items, add one action per item.\n"
+    "- If the user expresses frustration (e.g., 'Das ist doch lächerlich!'), add {type: 'frustration', delta: 1}; if the user calms down, delta: -1.\n"
+    "- If the user explicitly asks to move to another department, add {type: 'switch_department', department: '<Abteilung>'}.\n"
+    "Leave actions empty if nothing changes.\n"
+    "---\n"
+)  # fmt: skip
+
+REFERRAL_RULES = (
+    "\n"
+    "You are responsible for the documents listed above.\n"
+    "If the user needs a document that you do not handle, refer them to the agent or department responsible for that document.\n"
+    "Do not switch departments yourself or call switch_department unless the user explicitly requests to move.\n"
+    "Always explain which agent or department is responsible for the next required document based on the dependencies.\n"
+    "Never lay out the full workflow or process, only respond to the current request and refer as needed.\n"
+)  # fmt: skip
+
+# header of the volatile context appended to the user's message, never to the system prompt
+VOLATILE_HEADER = "\n\n## AKTUELLER STAND (nur für Sie)\n"
+
+FALLBACK_PROMPT = "You are a helpful bureaucrat. Always use tools to update the game state."
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """a rendered system prompt and its precomputed artifacts"""
+
+    persona_id: str
+    text: str
+    sha256: str
+    tokens: int
+    config_version: str
+
+    @classmethod
+    def from_text(cls, persona_id: str, text: str, config_version: str = "") -> "CompiledPrompt":
+        return cls(
+            persona_id=persona_id,
+            text=text,
+            sha256=hashlib.sha256(text.encode()).hexdigest(),
+            tokens=estimate_text_tokens(text),
+            config_version=config_version,
+        )
+
+
+def with_volatile(query: str, volatile: Optional[str]) -> str:
+    """the user's message with volatile context at the very end of the request"""
+    if not volatile:
+        return query
+    return f"{query}{VOLATILE_HEADER}{volatile}"
+
+
+def strip_volatile(text: str) -> str:
+    return text.split(VOLATILE_HEADER)[0]
+
+
+def strip_volatile_messages(messages: List[ModelMessage]) -> List[ModelMessage]:
+    """messages without the volatile context of earlier requests"""
+    stripped = []
+    for message in messages:
+        if isinstance(message, ModelRequest) and any(_has_volatile(part) for part in message.parts):
+            parts = [
+                dataclasses.replace(part, content=strip_volatile(part.content)) if _has_volatile(part) else part
+                for part in message.parts
+            ]
+            message = dataclasses.replace(message, parts=parts)
+        stripped.append(message)
+    return stripped
+
+
+def _has_volatile(part) -> bool:
+    return isinstance(part, UserPromptPart) and isinstance(part.content, str) and VOLATILE_HEADER in part.content
+
+
+def render_system_prompt(config: GameConfig, persona_id: str, single_shot: bool = False) -> str:
+    """the static system prompt of a persona; depends on nothing but the config and the mode
+
+    single_shot: the bureaucrat declares state changes in its answer instead of calling tools
+    """
+    p = config.personas[persona_id]
+
+    personality_text = "\n".join(f"- {trait}" for trait in p.personality)
+    handled_docs = ", ".join(p.handled_documents)
+    required_evidence = ", ".join(p.required_evidence)
+
+    doc_infos = []
+    for doc_id in p.handled_documents:
+        doc = config.documents.get(doc_id)
+        if doc:
+            reqs = ", ".join(doc.requirements)
+            doc_infos.append(f"- {doc_id}: {doc.description} (benötigte Nachweise: {reqs})")
+    docs_section = "\n".join(doc_infos)
+
+    evidence_infos = []
+    for ev_id in p.required_evidence:
+        ev = config.evidence.get(ev_id)
+        if ev:
+            forms = ", ".join(ev.acceptable_forms)
+            evidence_infos.append(f"- {ev_id}: {ev.description} (akzeptierte Formen: {forms})")
+    evidence_section = "\n".join(evidence_infos)
+
+    other_agents_docs = []
+    for other_id, other_p in config.personas.items():
+        if other_id == persona_id:
+            continue
+        other_docs = [
+            f"- {doc_id}: {config.documents[doc_id].description}"
+            for doc_id in other_p.handled_documents
+            if doc_id in config.documents
+        ]
+        if other_docs:
+            other_agents_docs.append(
+                f"{other_p.name} ({other_p.role}, {other_p.department}):\n" + "\n".join(other_docs)
+            )
+    others_section = "\n\n".join(other_agents_docs)
+    if others_section:
+        others_section = f"\n## DOKUMENTE DER ANDEREN ABTEILUNGEN\n{others_section}\n"
+
+    doc_dependencies = []
+    for doc_id, doc in config.documents.items():
+        if doc_id in p.handled_documents and doc.requirements:
+            doc_dependencies.append(f"- {doc_id} depends on: {', '.join(doc.requirements)}")
+    dependency_section = ""
+    if doc_dependencies:
+        dependency_section = "\n## DOKUMENT-ABHÄNGIGKEITEN\n" + "\n".join(doc_dependencies) + "\n"
+    if config.final_document:
+        dependency_section += f"\n## ENDZIEL\nDas Endziel ist das Dokument: {config.final_document}\n"
+
+    persona_context = (
+        f"\n## DOKUMENTE DIE SIE BEARBEITEN\n{docs_section}\n"
+        f"\n## NACHWEISE DIE SIE PRÜFEN\n{evidence_section}\n"
+        f"{others_section}"
+        f"{dependency_section}"
+    )
+    behavioral_rules_section = "\n## VERHALTENSREGELN\n" + "\n".join(f"- {rule}" for rule in p.behavioral_rules) + "\n"
+
+    return (
+        p.system_prompt_template.format(
+            name=p.name,
+            role=p.role,
+            department=p.department,
+            personality=personality_text,
+            handled_documents=handled_docs,
+            required_evidence=required_evidence,
+        )
+        + behavioral_rules_section
+        + persona_context
+        + (ACTION_INSTRUCTIONS if single_shot else TOOL_INSTRUCTIONS)
+        + REFERRAL_RULES
+    )
+
+
+class PromptCompiler:
+    """compiled system prompts, cached per (config version, persona id, mode)"""
+
+    def __init__(self):
+        self._compiled: Dict[Tuple[str, str, bool], CompiledPrompt] = {}
+        self._lock = threading.Lock()
+
+    def compile(
+        self, persona_id: str, config: Optional[GameConfig] = None, single_shot: bool = False
+    ) -> CompiledPrompt:
+        config = config or get_config()
+        if persona_id not in config.personas:
+            raise KeyError(f"Persona '{persona_id}' not found in config")
+        key = (config.version, persona_id, single_shot)
+        with self._lock:
+            compiled = self._compiled.get(key)
+        if compiled is None:
+            text = render_system_prompt(config, persona_id, single_shot)
+            compiled = CompiledPrompt.from_text(persona_id, text, config.version)
+            with self._lock:
+                compiled = self._compiled.setdefault(key, compiled)
+            get_logger().logger.info(
+                f"Compiled system prompt for {persona_id}: {len(compiled.text)} chars, "
+                f"~{compiled.tokens} tokens, sha256 {compiled.sha256[:12]}"
+            )
+        return compiled
+
+    def compile_all(self, config: Optional[GameConfig] = None) -> List[CompiledPrompt]:
+        config = config or get_config()
+        return [self.compile(persona_id, config) for persona_id in config.personas]
+
+    def report(self, config: Optional[GameConfig] = None) -> str:
+        """prompt size per persona, to keep an eye on input cost"""
+        lines = [f"{'Persona':<16} {'Zeichen':>8} {'~Tokens':>8}  sha256"]
+        for compiled in self.compile_all(config):
+            lines.append(
+                f"{compiled.persona_id:<16} {len(compiled.text):>8} {compiled.tokens:>8}  {compiled.sha256[:12]}"
+            )
+        return "\n".join(lines)
+
+
+# Singleton instance
+_prompt_compiler = None
+
+
+def get_prompt_compiler() -> PromptCompiler:
+    """Get or create the singleton prompt compiler"""
+    global _prompt_compiler
+    if _prompt_compiler is None:
+        _prompt_compiler = PromptCompiler()
+    return _prompt_compiler
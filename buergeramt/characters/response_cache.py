@@ -0,0 +1,157 @@
+"""
+Opt-in cache for bureaucrat turns.
+
+Entries are keyed on the persona's system prompt, the normalized user input and a
+fingerprint of the relevant game state. Each entry records the tool calls of the
+original turn, so a cache hit replays them against the live GameState. Single-shot
+turns record their declared actions instead, which the engine applies as usual.
+"""
+
+import dataclasses
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, SystemPromptPart, ToolCallPart
+
+from buergeramt.rules.actions import Action
+from buergeramt.rules.game_state import TOOL_METHODS
+from buergeramt.utils.game_logger import get_logger
+
+
+class CachedToolCall(BaseModel):
+    tool_name: str
+    args: Dict[str, Any] = Field(default_factory=dict)
+
+
+class CachedResponse(BaseModel):
+    response_text: str
+    tool_calls: List[CachedToolCall] = Field(default_factory=list)
+    messages: str = ""  # the turn's new messages as pydantic_ai JSON, without system prompt parts
+    actions: List[Action] = Field(default_factory=list)  # single-shot turns
+
+    @classmethod
+    def from_run(
+        cls, response_text: str, new_messages: List[ModelMessage], actions: Optional[List[Action]] = None
+    ) -> "CachedResponse":
+        tool_calls = [
+            CachedToolCall(tool_name=part.tool_name, args=part.args_as_dict())
+            for message in new_messages
+            for part in message.parts
+            if isinstance(part, ToolCallPart) and part.tool_name in TOOL_METHODS
+        ]
+        stripped = [_without_system_prompt(message) for message in new_messages]
+        return cls(
+            response_text=response_text,
+            tool_calls=tool_calls,
+            messages=ModelMessagesTypeAdapter.dump_json(stripped).decode(),
+            actions=list(actions or []),
+        )
+
+    def load_messages(self) -> List[ModelMessage]:
+        return ModelMessagesTypeAdapter.validate_json(self.messages) if self.messages else []
+
+    def replay(self, game_state) -> None:
+        """apply the recorded tool calls to the live game state"""
+        for call in self.tool_calls:
+            method = getattr(game_state, TOOL_METHODS[call.tool_name])
+            try:
+                method(**call.args)
+            except (TypeError, ValueError) as e:
+                get_logger().log_error(e, f"Replaying cached tool call {call.tool_name}")
+
+
+def _without_system_prompt(message: ModelMessage) -> ModelMessage:
+    if not any(isinstance(p, SystemPromptPart) for p in message.parts):
+        return message
+    return dataclasses.replace(message, parts=[p for p in message.parts if not isinstance(p, SystemPromptPart)])
+
+
+def normalize_input(text: str) -> str:
+    """casefold, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def state_fingerprint(game_state) -> str:
+    """fingerprint of the state a reply depends on: documents, evidence and department"""
+    state = {
+        "documents": sorted(game_state.collected_documents),
+        "evidence": sorted(game_state.evidence_provided.items()),
+        "department": game_state.current_department,
+    }
+    return hashlib.sha256(json.dumps(state, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+def make_key(system_prompt: str, query: str, game_state) -> str:
+    prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+    input_hash = hashlib.sha256(normalize_input(query).encode()).hexdigest()[:16]
+    return f"{prompt_hash}-{input_hash}-{state_fingerprint(game_state)}"
+
+
+class ResponseCache:
+    """LRU cache of bureaucrat turns with an optional on-disk tier"""
+
+    def __init__(self, max_entries: int = 256, disk_dir: Optional[Union[str, Path]] = None):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        self._remember(key, entry)
+        if self.disk_dir:
+            path = self.disk_dir / f"{key}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(entry.model_dump_json(), encoding="utf-8")
+            tmp.replace(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[CachedResponse]:
+        if not self.disk_dir:
+            return None
+        path = self.disk_dir / f"{key}.json"
+        if not path.exists():
+            return None
+        try:
+            return CachedResponse.model_validate_json(path.read_text(encoding="utf-8"))
+        except ValueError as e:
+            get_logger().log_error(e, f"Reading cache entry {path}")
+            return None
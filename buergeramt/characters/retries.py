@@ -0,0 +1,29 @@
+"""
+Retry helpers for bureaucrat turns.
+
+Which failures are worth another attempt, and how long to wait before it.
+"""
+
+import asyncio
+import random
+from typing import Optional
+
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError, UnexpectedModelBehavior
+
+from buergeramt.rules.models import RetryPolicy
+
+# HTTP status codes of transient provider failures
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """timeouts, connection problems, rate limits, server errors and malformed model output"""
+    if isinstance(error, ModelHTTPError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (asyncio.TimeoutError, ModelAPIError, UnexpectedModelBehavior, ConnectionError))
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int, rng: Optional[random.Random] = None) -> float:
+    """exponential backoff with full jitter before retry number ``attempt`` (1-based)"""
+    ceiling = min(policy.max_backoff, policy.backoff * 2 ** (attempt - 1))
+    return (rng or random).uniform(0, ceiling)
@@ -1,25 +1,155 @@
+import asyncio
+import threading
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, List, Optional
+
 from buergeramt.characters.persona_factory import build_bureaucrat
+from buergeramt.engine.pacing import PacingPolicy, resolve_pacing
 from buergeramt.rules.loader import get_config
+from buergeramt.rules.planner import planner_hint
+from buergeramt.utils.async_utils import get_event_loop, run_sync
+from buergeramt.utils.game_logger import get_logger
+
+
+def _current_loop() -> asyncio.AbstractEventLoop:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        # sync callers: tasks run whenever run_sync drives this thread's loop
+        return get_event_loop()
+
+
+class LazyBureaucrats(Mapping):
+    """department -> Bureaucrat mapping that builds each bureaucrat on first access"""
+
+    def __init__(self, persona_ids: Dict[str, str], factory: Callable[[str], object]):
+        self._persona_ids = persona_ids  # department -> persona id
+        self._factory = factory
+        self._built: Dict[str, object] = {}
+        self._locks = {department: threading.Lock() for department in persona_ids}
+
+    def __getitem__(self, department: str):
+        if department in self._built:
+            return self._built[department]
+        if department not in self._persona_ids:
+            raise KeyError(department)
+        # a background prebuild may be building the same persona, wait for it instead of building twice
+        with self._locks[department]:
+            if department not in self._built:
+                self._built[department] = self._factory(self._persona_ids[department])
+        return self._built[department]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._persona_ids)
+
+    def __len__(self) -> int:
+        return len(self._persona_ids)
+
+    def is_built(self, department: str) -> bool:
+        return department in self._built
+
+    def built(self) -> Dict[str, object]:
+        """the bureaucrats constructed so far, without building the others"""
+        return dict(self._built)
+
+    def prebuild(self, background: bool = True) -> Optional[threading.Thread]:
+        """build all remaining bureaucrats, by default in a daemon thread"""
+
+        def build_all():
+            for department in self._persona_ids:
+                try:
+                    self[department]
+                except Exception as e:
+                    # the error resurfaces when the bureaucrat is actually needed
+                    get_logger().log_error(e, f"Prebuilding bureaucrat for {department}")
+
+        if not background:
+            build_all()
+            return None
+        thread = threading.Thread(target=build_all, name="bureaucrat-prebuild", daemon=True)
+        thread.start()
+        return thread
 
 
 class AgentRouter:
-    def __init__(self, game_state):
-        # dynamically build agents from config
+    def __init__(
+        self,
+        game_state,
+        response_cache=None,
+        prebuild: bool = False,
+        introduction_pool=None,
+        model: Optional[str] = None,
+        cassette=None,
+        telemetry=None,
+        single_shot: bool = False,
+        pacing: Optional[PacingPolicy] = None,
+        planner_hints: bool = False,
+    ):
+        # bureaucrats are built from config on first use
         config = get_config()
-        self.bureaucrats = {}
-        for persona_id, persona in config.personas.items():
-            agent = build_bureaucrat(persona_id)
-            self.bureaucrats[persona.department] = agent
+        self.config = config
+        self.response_cache = response_cache
+        self.model = model
+        # optional Cassette shared by all bureaucrats (record/replay)
+        self.cassette = cassette
+        # optional Telemetry of the game session, attached to every bureaucrat
+        self.telemetry = telemetry
+        # bureaucrats declare state changes in their replies instead of calling tools (see rules.actions)
+        self.single_shot = single_shot
+        # send every request the planner's next step, so the model does not reason about dependencies
+        self.planner_hints = planner_hints
+        # how long the walk to another department takes (see engine.pacing)
+        self.pacing = resolve_pacing(pacing)
+        # optional IntroductionPool with pre-generated introductions
+        self.introduction_pool = introduction_pool
+        self._pending_introductions: Dict[str, asyncio.Future] = {}
+        self.bureaucrats = LazyBureaucrats(
+            {persona.department: persona_id for persona_id, persona in config.personas.items()},
+            self._build_bureaucrat,
+        )
         self.game_state = game_state
-        # always start with the configured starting agent if available
+        # always start with the configured starting agent (persona id or department) if available
         starting_agent = getattr(config, "starting_agent", None)
+        if starting_agent in config.personas:
+            starting_agent = config.personas[starting_agent].department
         if starting_agent and starting_agent in self.bureaucrats:
             self.active_bureaucrat = self.bureaucrats[starting_agent]
+        elif "Erstbearbeitung" in self.bureaucrats:
+            self.active_bureaucrat = self.bureaucrats["Erstbearbeitung"]
         else:
-            self.active_bureaucrat = self.bureaucrats.get("Erstbearbeitung") or next(iter(self.bureaucrats.values()))
+            self.active_bureaucrat = self.bureaucrats[next(iter(self.bureaucrats))]
         self.game_state.current_department = self.active_bureaucrat.department
+        self.game_state.on_department_change(self._on_department_change)
+        if self.introduction_pool:
+            for department in self.bureaucrats:
+                if department != self.active_bureaucrat.department:
+                    self.introduction_pool.refill_in_background(department)
+        if prebuild:
+            self.bureaucrats.prebuild()
+
+    def _build_bureaucrat(self, persona_id: str):
+        agent = build_bureaucrat(persona_id, model=self.model, cassette=self.cassette, single_shot=self.single_shot)
+        agent.response_cache = self.response_cache
+        agent.telemetry = self.telemetry
+        if self.planner_hints:
+            agent.volatile_context = planner_hint
+        return agent
 
     def switch_agent(self, agent_name: str, print_styled=None) -> bool:
+        return run_sync(self.switch_agent_async(agent_name, print_styled))
+
+    async def switch_agent_async(self, agent_name: str, print_styled=None) -> bool:
+        """walk to the bureaucrat or department named by the player; False if there is none"""
+        dept = self._department_for(agent_name)
+        if dept is None:
+            return False
+        if dept == self.game_state.current_department:
+            await self._say(print_styled, "\nSie sind bereits in dieser Abteilung.", "italic")
+            return True
+        await self.transition_to_department_async(dept, print_styled)
+        return True
+
+    def _department_for(self, agent_name: str) -> Optional[str]:
         name = agent_name.strip().lower()
         name_to_dept = {
             "herr schmidt": "Erstbearbeitung",
@@ -35,47 +165,103 @@ class AgentRouter:
         }
         for key, dept in name_to_dept.items():
             if key in name:
-                if dept == self.game_state.current_department:
-                    if print_styled:
-                        print_styled("\nSie sind bereits in dieser Abteilung.", "italic")
-                    return True
-                self.transition_to_department(dept, print_styled)
-                return True
+                return dept
         for dept in self.bureaucrats:
             if dept.lower() in name:
-                if dept == self.game_state.current_department:
-                    if print_styled:
-                        print_styled("\nSie sind bereits in dieser Abteilung.", "italic")
-                    return True
-                self.transition_to_department(dept, print_styled)
-                return True
-        return False
+                return dept
+        return None
 
     def transition_to_department(self, department: str, print_styled=None):
-        if department == self.game_state.current_department:
-            if print_styled:
-                print_styled("\nSie sind bereits in dieser Abteilung.", "italic")
+        run_sync(self.transition_to_department_async(department, print_styled))
+
+    async def transition_to_department_async(self, department: str, print_styled=None):
+        """walk to another department; the next bureaucrat's introduction is generated during the walk
+
+        print_styled(text, style) must not pause itself: the lines are paced here, on the event loop
+        """
+        if not await self._leave_department(department, print_styled):
             return
+        introduction = self.prefetch_introduction(department) if print_styled else None
+        await self.pacing.pause_async(self.pacing.scene_delay)
+        await self._say(print_styled, f"Sie gehen zum Büro der Abteilung {department}...", "italic")
+        await self.pacing.pause_async(self.pacing.scene_delay)
+        self._enter_department(department)
         if print_styled:
-            print_styled(f"\nSie verlassen das Büro von {self.active_bureaucrat.name}...", "italic")
-        import time
+            await self._greet(await introduction, print_styled)
+
+    def prefetch_introduction(self, department: str) -> "asyncio.Future":
+        """start (or reuse) the introduction of the department's bureaucrat without waiting for it"""
+        pending = self._pending_introductions.get(department)
+        if pending is not None and not pending.cancelled():
+            return pending
+        loop = _current_loop()
+        bureaucrat = self.bureaucrats[department]
+        pooled = self.introduction_pool.take(department, bureaucrat) if self.introduction_pool else None
+        if pooled is not None:
+            future = loop.create_future()
+            future.set_result(pooled)
+        else:
+            future = loop.create_task(bureaucrat.introduce_async(game_state=self.game_state))
+        if self.introduction_pool:
+            self.introduction_pool.refill_in_background(department)
+        self._pending_introductions[department] = future
+        return future
+
+    def prefetch_greeting(self) -> "asyncio.Future":
+        """start the active bureaucrat's introduction, e.g. the first greeting of a game"""
+        department = self.active_bureaucrat.department
+        future = self.prefetch_introduction(department)
+        future.add_done_callback(lambda _: self._pending_introductions.pop(department, None))
+        return future
 
-        time.sleep(1)
+    def _on_department_change(self, department: str):
+        # called from the switch_department tool: start the introduction while the model is still answering
+        if department in self.bureaucrats and department != self.active_bureaucrat.department:
+            self.prefetch_introduction(department)
+
+    async def _say(self, print_styled, text: str, style: str):
+        """print one line, then pause without blocking the event loop"""
         if print_styled:
-            print_styled(f"Sie gehen zum Büro der Abteilung {department}...", "italic")
-        time.sleep(1)
+            print_styled(text, style)
+            await self.pacing.pause_async(self.pacing.line_delay)
+
+    async def _leave_department(self, department: str, print_styled=None) -> bool:
+        """print the departure message; returns False if the player stays in the current department"""
+        if department not in self.bureaucrats:
+            # e.g. the model invented a department; stay where we are
+            get_logger().log_error(ValueError(f"Unknown department '{department}'"), "transition_to_department")
+            self.game_state.current_department = self.active_bureaucrat.department
+            return False
+        # the switch_department tool has already updated game_state, so compare with the active bureaucrat
+        if department == self.active_bureaucrat.department:
+            await self._say(print_styled, "\nSie sind bereits in dieser Abteilung.", "italic")
+            return False
+        await self._say(print_styled, f"\nSie verlassen das Büro von {self.active_bureaucrat.name}...", "italic")
+        return True
+
+    def _enter_department(self, department: str):
         self.game_state.current_department = department
         self.active_bureaucrat = self.bureaucrats[department]
-        if print_styled:
-            print_styled(f"\n{self.active_bureaucrat.introduce(game_state=self.game_state)}", "bureaucrat")
-            if len(self.game_state.collected_documents) > 0:
-                doc_list = ", ".join(list(self.game_state.collected_documents.keys()))
-                print_styled(f"Ich sehe, Sie haben bereits folgende Dokumente: {doc_list}.", "bureaucrat")
-            else:
-                print_styled("Was kann ich für Sie tun?", "bureaucrat")
+        self._pending_introductions.pop(department, None)
+        # introductions prefetched for departments we did not go to are stale now
+        for future in self._pending_introductions.values():
+            future.cancel()
+        self._pending_introductions.clear()
+
+    async def _greet(self, introduction: str, print_styled):
+        await self._say(print_styled, f"\n{introduction}", "bureaucrat")
+        if len(self.game_state.collected_documents) > 0:
+            doc_list = ", ".join(list(self.game_state.collected_documents.keys()))
+            await self._say(print_styled, f"Ich sehe, Sie haben bereits folgende Dokumente: {doc_list}.", "bureaucrat")
+        else:
+            await self._say(print_styled, "Was kann ich für Sie tun?", "bureaucrat")
 
     def get_active_bureaucrat(self):
         return self.active_bureaucrat
 
     def get_bureaucrats(self):
         return self.bureaucrats
+
+    def get_bureaucrat_names(self) -> List[str]:
+        """names of all bureaucrats, without building them"""
+        return [persona.name for persona in self.config.personas.values()]
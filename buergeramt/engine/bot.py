@@ -0,0 +1,182 @@
+"""
+Bot players that play whole games on their own.
+
+A Strategy picks the next input from the GameState, and play_game feeds it to
+GameEngine.process_input until the win screen or max_turns, like a player in the
+terminal would. Together with the offline model this measures the engine itself:
+turns to win, wall time per turn and how often each kind of state change happens.
+
+- optimal: follows the planner (rules.planner), so it wins in the fewest turns
+- random: hands over random evidence, asks for random documents, walks around
+- adversarial: a frustrated player who complains and demands the wrong documents
+  between the steps of the optimal plan
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from buergeramt.engine.output import MemorySink
+from buergeramt.engine.sessions import headless_engine
+from buergeramt.rules.planner import plan
+
+SMALLTALK = [
+    "Guten Tag.",
+    "Wie lange dauert das denn noch?",
+    "Ich warte schon seit Stunden.",
+    "Schönes Wetter heute, nicht wahr?",
+]
+COMPLAINTS = [
+    "Das ist doch lächerlich!!",
+    "Eine Frechheit ist das hier!",
+    "Kafka hätte seine helle Freude an Ihnen!",
+    "Mir reicht es langsam!!",
+    "Dieser Wahnsinn nervt!",
+]
+THANKS = "Vielen Dank, das wäre alles."
+
+
+class Strategy:
+    """chooses the player's next input; rng is the game's own random source"""
+
+    name = ""
+
+    def next_input(self, game_state, rng: random.Random) -> str:
+        raise NotImplementedError
+
+
+class OptimalStrategy(Strategy):
+    """one step of the planner per turn: walk there, hand over the missing evidence, ask for the document"""
+
+    name = "optimal"
+
+    def next_input(self, game_state, rng: random.Random) -> str:
+        step = plan(game_state)
+        if step.done:
+            # the win screen comes with the next input
+            return THANKS
+        if step.department != game_state.current_department:
+            return f"Ich möchte zu {step.bureaucrat}."
+        if step.missing_evidence:
+            evidence = game_state.config.evidence
+            forms = [evidence[ev_id].acceptable_forms[0] for ev_id in step.missing_evidence]
+            return "Hier ist mein " + " und ".join(forms) + "."
+        return f"Ich beantrage {step.next_document}."
+
+
+class RandomStrategy(Strategy):
+    """a player without a plan"""
+
+    name = "random"
+
+    def next_input(self, game_state, rng: random.Random) -> str:
+        config = game_state.config
+        move = rng.randrange(4)
+        if move == 0:
+            evidence = rng.choice(list(config.evidence.values()))
+            return f"Hier ist mein {rng.choice(evidence.acceptable_forms)}."
+        if move == 1:
+            return f"Ich beantrage {rng.choice(list(config.documents))}."
+        if move == 2:
+            return f"Ich möchte zu {rng.choice(list(config.personas.values())).name}."
+        return rng.choice(SMALLTALK)
+
+
+class AdversarialStrategy(Strategy):
+    """a frustrated player: complains or asks for the wrong document, otherwise plays the optimal step"""
+
+    name = "adversarial"
+
+    def __init__(self, patience: float = 0.5):
+        # chance to play the optimal step instead of acting up
+        self.patience = patience
+        self._optimal = OptimalStrategy()
+
+    def next_input(self, game_state, rng: random.Random) -> str:
+        if plan(game_state).done or rng.random() < self.patience:
+            return self._optimal.next_input(game_state, rng)
+        if rng.random() < 0.5:
+            return rng.choice(COMPLAINTS)
+        return f"Ich beantrage sofort {rng.choice(list(game_state.config.documents))}!!"
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (OptimalStrategy, RandomStrategy, AdversarialStrategy)}
+
+
+def make_strategy(name: str) -> Strategy:
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{name}', expected one of: {', '.join(STRATEGIES)}")
+    return STRATEGIES[name]()
+
+
+@dataclass
+class GameResult:
+    """one game played by a bot"""
+
+    strategy: str
+    seed: int
+    won: bool = False
+    turns: int = 0  # inputs played, without the one that shows the win screen
+    wall_time: float = 0.0  # whole game, engine start included
+    turn_times: List[float] = field(default_factory=list)
+    transitions: Dict[str, int] = field(default_factory=dict)  # evidence, document, department, frustration
+    frustration: int = 0
+
+
+def _observe(game_state) -> tuple:
+    return (
+        len(game_state.evidence_provided),
+        len(game_state.collected_documents),
+        game_state.current_department,
+        game_state.frustration_level,
+    )
+
+
+def _count_transitions(transitions: Dict[str, int], before: tuple, after: tuple):
+    for kind, old, new in zip(("evidence", "document", "department", "frustration"), before, after):
+        if kind in ("evidence", "document"):
+            changes = new - old
+        else:
+            changes = int(new != old)
+        if changes:
+            transitions[kind] = transitions.get(kind, 0) + changes
+
+
+def play_game(strategy: Strategy, seed: int = 0, max_turns: int = 200, **options) -> GameResult:
+    """play one game through GameEngine.process_input; options are passed on to GameEngine
+
+    raises RuntimeError if the engine cannot start, e.g. without an API key for a real model
+    """
+    rng = random.Random(seed)
+    result = GameResult(strategy=strategy.name, seed=seed)
+    started = time.perf_counter()
+    output = MemorySink()
+    engine = headless_engine(output, **options)
+    if engine.game_over:
+        raise RuntimeError(f"The game could not start: {output.text()}")
+    engine.start_game()
+    game_state = engine.game_state
+    while not engine.game_over:
+        output.clear()
+        text = strategy.next_input(game_state, rng)
+        before = _observe(game_state)
+        turn_started = time.perf_counter()
+        if not engine.process_input(text):
+            # the win screen was shown instead of a turn
+            break
+        result.turn_times.append(time.perf_counter() - turn_started)
+        result.turns += 1
+        _count_transitions(result.transitions, before, _observe(game_state))
+        # a won game still gets the input that shows the win screen
+        if result.turns >= max_turns and not engine.check_win_condition():
+            break
+    result.won = engine.win_condition
+    result.frustration = game_state.frustration_level
+    result.wall_time = time.perf_counter() - started
+    return result
+
+
+def play(strategy: str, seed: int = 0, max_turns: int = 200, model: Optional[str] = "offline", **options):
+    """play_game by strategy name, against the offline model unless another model is given"""
+    return play_game(make_strategy(strategy), seed, max_turns, model=model, **options)
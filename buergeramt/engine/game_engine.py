@@ -1,32 +1,98 @@
+import asyncio
+import contextlib
 import time
+from typing import List, Optional, Tuple, Union
 
+from buergeramt.characters.http_client import warm_up
 from buergeramt.engine.agent_router import AgentRouter
+from buergeramt.engine.output import AnsiSink, OutputSink
+from buergeramt.engine.pacing import PacingPolicy, resolve_pacing
 from buergeramt.rules import *
+from buergeramt.rules.actions import apply_actions
+from buergeramt.rules.intents import IntentMatcher, apply_submission
+from buergeramt.utils.async_utils import run_sync
 from buergeramt.utils.game_logger import get_logger
+from buergeramt.utils.telemetry import Telemetry
+
+# welcome screen shown by start_game; the first greeting is generated while it is on screen
+WELCOME_SCREEN = [
+    ("=== WILLKOMMEN ZUM SCHENKUNGSSTEUERABENTEUER ===", "title"),
+    ("Sie versuchen eine Schenkungssteuer beim Finanzamt anzumelden.", "normal"),
+    ("Viel Glück... Sie werden es brauchen!", "normal"),
+    ("\nTipps zum Spielen:", "hint"),
+    ("• Sprechen Sie mit den Beamten über 'Formulare', 'Anträge', 'Dokumente'", "hint"),
+    ("• Zeigen Sie Ausweise und Unterlagen durch Angabe von 'Personalausweis', 'Urkunde', etc.", "hint"),
+    ("• Wechseln Sie zwischen Abteilungen mit Befehlen wie 'Ich möchte zu Herrn Weber'", "hint"),
+    ("• Drücken Sie Ihre Frustration aus - manchmal führt Chaos zu überraschenden Ergebnissen", "hint"),
+    ("• Fragen Sie nach konkreten Dokumenten wie 'Schenkungsanmeldung' oder 'Wertermittlung'", "hint"),
+    ("• Nutzen Sie Slash-Befehle wie /hilfe, /status, /beenden oder /gehe_zu <Name> für wichtige Aktionen", "hint"),
+    ("\nBeispiel: 'Ich möchte eine Schenkungssteuer anmelden und habe meinen Personalausweis dabei.'", "italic"),
+]
 
 
 class GameEngine:
     """Main game engine class handling the game loop and state"""
 
-    def __init__(self, use_ai_characters: bool = True):
+    def __init__(
+        self,
+        use_ai_characters: bool = True,
+        stream: bool = False,
+        response_cache=None,
+        fast_path: bool = False,
+        prebuild_agents: bool = False,
+        introduction_pool=None,
+        model: Optional[str] = None,
+        cassette=None,
+        telemetry: Optional[Telemetry] = None,
+        single_shot: bool = False,
+        pacing: Optional[Union[str, PacingPolicy]] = None,
+        output: Optional[OutputSink] = None,
+        planner_hints: bool = False,
+    ):
         # Initialize logger
         self.logger = get_logger()
         self.logger.logger.info("=== Starting new game session ===")
+        # where everything the game shows goes; colored terminal output by default (see engine.output)
+        self.output = output or AnsiSink()
 
         # initialize game state
         self.game_state = GameState()
+        self.game_state.set_output(self.output)
+        # stream bureaucrat replies to the terminal while they are generated
+        self.stream = stream
+        self._background_tasks = set()
+        # pauses for atmosphere: "interactive" (default), "fast" or "headless" (see engine.pacing)
+        self.pacing = resolve_pacing(pacing)
+        # latency, tokens and tool calls of every bureaucrat call (see /statistik)
+        self.telemetry = telemetry or Telemetry()
+        # replies declare their state changes as actions, applied here after one model request
+        self.single_shot = single_shot
+        # apply obvious evidence/document submissions locally before asking the model
+        self.intent_matcher = IntentMatcher(self.game_state.config) if fast_path else None
         # decide whether to enable AI characters
         self.use_ai_characters = use_ai_characters
         if self.use_ai_characters:
             try:
-                self.agent_router = AgentRouter(self.game_state)
+                self.agent_router = AgentRouter(
+                    self.game_state,
+                    response_cache=response_cache,
+                    prebuild=prebuild_agents,
+                    introduction_pool=introduction_pool,
+                    model=model,
+                    cassette=cassette,
+                    telemetry=self.telemetry,
+                    single_shot=single_shot,
+                    pacing=self.pacing,
+                    planner_hints=planner_hints,
+                )
                 message = "Bürokratensimulation mit KI-Charakteren gestartet. Viel Erfolg!"
-                print(message)
+                self.output.line(message)
                 self.logger.logger.info(message)
             except Exception as e:
                 error_msg = f"Fehler beim Initialisieren der KI-Charaktere: {e}"
-                print(error_msg)
-                print("Das Spiel kann nicht gestartet werden.")
+                self.output.line(error_msg)
+                self.output.line("Das Spiel kann nicht gestartet werden.")
+                self.output.flush()
                 self.logger.log_error(e, "Game initialization")
                 self.game_over = True
                 return
@@ -39,153 +105,256 @@ class GameEngine:
 
     def start_game(self):
         """Start the game with an introduction"""
-        self._print_styled("=== WILLKOMMEN ZUM SCHENKUNGSSTEUERABENTEUER ===", "title")
-        self._print_styled("Sie versuchen eine Schenkungssteuer beim Finanzamt anzumelden.", "normal")
-        self._print_styled("Viel Glück... Sie werden es brauchen!", "normal")
-
-        # Show more helpful instructions
-        self._print_styled("\nTipps zum Spielen:", "hint")
-        self._print_styled("• Sprechen Sie mit den Beamten über 'Formulare', 'Anträge', 'Dokumente'", "hint")
-        self._print_styled(
-            "• Zeigen Sie Ausweise und Unterlagen durch Angabe von 'Personalausweis', 'Urkunde', etc.", "hint"
-        )
+        run_sync(self.start_game_async())
 
-        self._print_styled("• Wechseln Sie zwischen Abteilungen mit Befehlen wie 'Ich möchte zu Herrn Weber'", "hint")
-        self._print_styled(
-            "• Drücken Sie Ihre Frustration aus - manchmal führt Chaos zu überraschenden Ergebnissen", "hint"
-        )
-        self._print_styled(
-            "• Fragen Sie nach konkreten Dokumenten wie 'Schenkungsanmeldung' oder 'Wertermittlung'", "hint"
-        )
-        self._print_styled(
-            "• Nutzen Sie Slash-Befehle wie /hilfe, /status, /beenden oder /gehe_zu <Name> für wichtige Aktionen",
-            "hint",
-        )
+    async def start_game_async(self):
+        """show the welcome screen while the first bureaucrat prepares the greeting
 
-        # Show an example
-        self._print_styled(
-            "\nBeispiel: 'Ich möchte eine Schenkungssteuer anmelden und habe meinen Personalausweis dabei.'", "italic"
-        )
+        the greeting is requested first, so its model call (connection setup included) runs
+        during the pauses of the welcome screen; the other bureaucrats are built on first use,
+        or meanwhile in the prebuild thread with prebuild_agents (--prebuild)
+        """
+        started = time.perf_counter()
+        greeting = self.agent_router.prefetch_greeting()
+        if greeting.done():
+            # a pooled greeting sends no request; open the connection for the first reply instead
+            self._warm_up(self.agent_router.get_active_bureaucrat())
+        # let the greeting send its request before the screen is drawn
+        await asyncio.sleep(0)
 
-        time.sleep(1)
-        self._print_styled("\nSie betreten das Finanzamt...", "italic")
-        time.sleep(1)
+        for text, style in WELCOME_SCREEN:
+            self._print_styled(text, style, delay=0)
+            await self.pacing.pause_async(self.pacing.line_delay)
+        await self.pacing.pause_async(self.pacing.scene_delay)
+        self._print_styled("\nSie betreten das Finanzamt...", "italic", delay=0)
+        await self.pacing.pause_async(self.pacing.scene_delay)
 
         # First bureaucrat introduces themselves
-        self._print_styled(
-            f"\n{self.agent_router.get_active_bureaucrat().introduce(game_state=self.game_state)}", "bureaucrat"
+        waiting = time.perf_counter()
+        introduction = await greeting
+        self.logger.logger.info(
+            f"Greeting ready {waiting - started:.2f}s into the welcome screen, "
+            f"waited another {time.perf_counter() - waiting:.2f}s"
         )
+        await self._print_lines_async([(f"\n{introduction}", "bureaucrat")])
+        self.output.flush()
+
+    def _warm_up(self, bureaucrat):
+        base_url = getattr(bureaucrat.agent.model, "base_url", None)
+        if bureaucrat.http_client is None or base_url is None:
+            # offline and replayed models do not connect anywhere
+            return
+        task = asyncio.get_running_loop().create_task(warm_up(bureaucrat.http_client, base_url))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
     def switch_agent(self, agent_name: str) -> bool:
-        return self.agent_router.switch_agent(agent_name, print_styled=self._print_styled)
+        return run_sync(self.switch_agent_async(agent_name))
+
+    async def switch_agent_async(self, agent_name: str) -> bool:
+        switched = await self.agent_router.switch_agent_async(agent_name, print_styled=self._print_unpaced)
+        self.output.flush()
+        return switched
 
     def process_input(self, user_input: str) -> bool:
-        if getattr(self, "game_over", True):
+        play, lines = self._begin_turn(user_input)
+        self._print_lines(lines)
+        if not play:
+            self.output.flush()
+            return False
+        # Use dependency injection for agent call
+        bureaucrat = self.agent_router.get_active_bureaucrat()
+        query, response_text = self._fast_path(user_input, bureaucrat)
+        with self._events_after_stream():
+            if response_text is None:
+                response_text = bureaucrat.respond(query, self.game_state, **self._stream_kwargs())
+            lines = self._response_lines(response_text, self._apply_actions(bureaucrat))
+        self._print_lines(lines)
+        if self._moved():
+            self.agent_router.transition_to_department(
+                self.game_state.current_department, print_styled=self._print_unpaced
+            )
+        self._print_lines(self._tip_lines())
+        self._end_turn()
+        # the reply is on screen, now there is time to shrink the history
+        bureaucrat.compact_history()
+        return True
+
+    async def process_input_async(self, user_input: str) -> bool:
+        """async variant of process_input, so one event loop can drive many game sessions
+
+        the pauses between lines are awaited, so they do not block the other sessions or background tasks
+        """
+        play, lines = self._begin_turn(user_input)
+        await self._print_lines_async(lines)
+        if not play:
+            self.output.flush()
             return False
+        bureaucrat = self.agent_router.get_active_bureaucrat()
+        query, response_text = self._fast_path(user_input, bureaucrat)
+        with self._events_after_stream():
+            if response_text is None:
+                response_text = await bureaucrat.respond_async(query, self.game_state, **self._stream_kwargs())
+            lines = self._response_lines(response_text, self._apply_actions(bureaucrat))
+        await self._print_lines_async(lines)
+        if self._moved():
+            await self.agent_router.transition_to_department_async(
+                self.game_state.current_department, print_styled=self._print_unpaced
+            )
+        await self._print_lines_async(self._tip_lines())
+        self._end_turn()
+        # summarize in the background instead of delaying the next prompt
+        task = asyncio.get_running_loop().create_task(bureaucrat.compact_history_async())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return True
+
+    def _begin_turn(self, user_input: str) -> Tuple[bool, List[Tuple[str, str]]]:
+        """log the input and handle the win screen
+
+        returns whether the turn should be played and the (text, style) lines to show first
+        """
+        if getattr(self, "game_over", True):
+            return False, []
         self.logger.log_user_input(user_input)
         if self.check_win_condition():
             win_message = "\n=== HERZLICHEN GLÜCKWUNSCH! ==="
-            self._print_styled(win_message, "title")
             self.logger.logger.info(win_message)
             success_msg = "Sie haben es tatsächlich geschafft! Die Schenkungssteuer wurde bewilligt."
-            self._print_styled(success_msg, "success")
             stats_msg = f"Sie haben {self.game_state.attempts} Versuche gebraucht und Ihre Frustration erreichte maximal Level {self.game_state.frustration_level}."
-            self._print_styled(stats_msg, "italic")
             self.logger.logger.info(
                 f"GAME COMPLETED - Attempts: {self.game_state.attempts}, Max Frustration: {self.game_state.frustration_level}"
             )
             final_msg = "Sie dürfen jetzt den Brief mit dem Steuerbescheid in 4-6 Wochen erwarten."
-            self._print_styled(final_msg, "bureaucrat")
             self.game_over = True
             self.win_condition = True
             self.logger.logger.info("=== Game session completed successfully ===")
-            return False
+            return False, [
+                (win_message, "title"),
+                (success_msg, "success"),
+                (stats_msg, "italic"),
+                (final_msg, "bureaucrat"),
+            ]
         self.game_state.attempts += 1
         self.logger.logger.debug(f"Processing input (attempt #{self.game_state.attempts}): {user_input}")
-        # Use dependency injection for agent call
-        response_text = self.agent_router.get_active_bureaucrat().respond(user_input, self.game_state)
-        self._print_styled(response_text, "bureaucrat")
+        return True, []
 
-        # if the active department has changed due to a tool call, transition
-        if self.game_state.current_department != self.agent_router.active_bureaucrat.department:
-            self.agent_router.transition_to_department(
-                self.game_state.current_department, print_styled=self._print_styled
-            )
+    def _fast_path(self, user_input: str, bureaucrat) -> tuple:
+        """apply submissions locally; returns (query for the model, local reply or None)"""
+        if self.intent_matcher is None:
+            return user_input, None
+        intent = self.intent_matcher.match(user_input)
+        if not intent.matched:
+            return user_input, None
+        replies = self.game_state.config.persona_defaults.fast_path_replies
+        outcome = apply_submission(intent, self.game_state, replies)
+        if outcome.reply is not None:
+            self.logger.logger.info(f"Fast path answered without model call: {user_input}")
+            bureaucrat.record_exchange(user_input, outcome.reply)
+            return user_input, outcome.reply
+        if outcome.applied:
+            return outcome.annotate(user_input), None
+        return user_input, None
+
+    def _apply_actions(self, bureaucrat) -> List[str]:
+        """apply the actions of a single-shot reply; returns the notes about rejected ones"""
+        actions = bureaucrat.take_actions() if self.single_shot else []
+        if not actions:
+            return []
+        outcome = apply_actions(actions, self.game_state, self.game_state.config.persona_defaults.action_replies)
+        self.logger.logger.info(f"Applied {len(outcome.applied)} actions, rejected {len(outcome.rejected)}")
+        return outcome.notes
+
+    def _stream_kwargs(self) -> dict:
+        return {"on_text": self._print_stream_chunk} if self.stream else {}
+
+    @contextlib.contextmanager
+    def _events_after_stream(self):
+        """hold the state messages of a streamed reply until its line is finished, so they are not written into it"""
+        if not self.stream:
+            yield
+            return
+        self.game_state.hold_events()
+        try:
+            yield
+        finally:
+            self.game_state.release_events()
+
+    def _response_lines(self, response_text: str, notes: List[str] = ()) -> List[Tuple[str, str]]:
+        """the bureaucrat's reply and notes about rejected actions; a streamed reply is finished right away"""
+        lines = []
+        if self.stream:
+            self._finish_stream(response_text, "bureaucrat")
+        else:
+            lines.append((response_text, "bureaucrat"))
+        return lines + [(note, "bureaucrat") for note in notes]
+
+    def _moved(self) -> bool:
+        """a tool call or action moved the player to another department"""
+        return self.game_state.current_department != self.agent_router.active_bureaucrat.department
+
+    def _tip_lines(self) -> List[Tuple[str, str]]:
         if self.game_state.attempts % 5 == 0:
-            self._print_styled(
-                "\nTipp: Tippen Sie 'hilfe' für Spieltipps oder 'status' für Ihren aktuellen Stand.", "hint"
-            )
+            return [("\nTipp: Tippen Sie 'hilfe' für Spieltipps oder 'status' für Ihren aktuellen Stand.", "hint")]
+        return []
+
+    def _end_turn(self):
         self.game_state.update_progress()
-        return True
+        # the whole turn reaches buffered sinks in one write
+        self.output.flush()
+        if self.telemetry.export_path is not None:
+            try:
+                self.telemetry.export()
+            except OSError as e:
+                self.logger.log_error(e, "Exporting telemetry")
 
     def check_win_condition(self) -> bool:
-        """Check if the player has won the game"""
-        # Player wins if they have acquired ALL configured documents (or at least Zahlungsaufforderung), regardless of procedure
-        has_final_doc = "Zahlungsaufforderung" in self.game_state.collected_documents
-        all_docs_collected = all(doc in self.game_state.collected_documents for doc in self.game_state.config.documents)
-        is_frustrated = self.game_state.frustration_level > 8
+        """Check if the player has won the game
 
-        regular_win = has_final_doc
-        frustration_win = all_docs_collected and is_frustrated
+        the player wins with the config's final_document (every document if none is configured); the
+        game state keeps both flags up to date, so this runs in constant time on every input
+        """
+        state = self.game_state
+        regular_win = state.final_document_collected
+        frustration_win = state.all_documents_collected and state.frustration_level > 8
 
-        # Log
         if regular_win:
-            self.logger.log_win_condition(True, "All main documents acquired: Win!")
+            final = state.config.final_document or "all documents"
+            self.logger.log_win_condition(True, f"Final document acquired ({final}): Win!")
         elif frustration_win:
             self.logger.log_win_condition(
-                True, f"Frustration win: All docs & high frustration ({self.game_state.frustration_level})"
+                True, f"Frustration win: All docs & high frustration ({state.frustration_level})"
             )
-        else:
-            missing = []
-            if not has_final_doc:
-                missing.append("Missing final document 'Zahlungsaufforderung'")
-            not_collected = [
-                doc for doc in self.game_state.config.documents if doc not in self.game_state.collected_documents
-            ]
-            if not_collected:
-                missing.append("Still missing: " + ", ".join(not_collected))
-            self.logger.log_win_condition(False, f"Not met: {', '.join(missing)}")
-
         return regular_win or frustration_win
 
-    def _print_styled(self, text: str, style: str):
-        """Print text with styling based on the style parameter"""
+    def _print_styled(self, text: str, style: str, delay: Optional[float] = None):
+        """Print text with styling based on the style parameter; async callers pass delay=0 and pause themselves"""
         # Log UI message
         self.logger.log_ui_message(text, style)
-
-        # ANSI color codes
-        COLORS = {
-            "red": "\033[91m",
-            "green": "\033[92m",
-            "yellow": "\033[93m",
-            "blue": "\033[94m",
-            "magenta": "\033[95m",
-            "cyan": "\033[96m",
-            "white": "\033[97m",
-            "reset": "\033[0m",
-            "bold": "\033[1m",
-            "italic": "\033[3m",
-        }
-
-        # Apply styling based on style parameter
-        if style == "bureaucrat":
-            print(f"{COLORS['cyan']}{COLORS['bold']}{text}{COLORS['reset']}")
-        elif style == "success":
-            print(f"{COLORS['green']}{text}{COLORS['reset']}")
-        elif style == "failure":
-            print(f"{COLORS['red']}{text}{COLORS['reset']}")
-        elif style == "hint":
-            print(f"{COLORS['yellow']}{text}{COLORS['reset']}")
-        elif style == "italic":
-            print(f"{COLORS['italic']}{text}{COLORS['reset']}")
-        elif style == "title":
-            print(f"{COLORS['magenta']}{COLORS['bold']}{text}{COLORS['reset']}")
-        elif style == "info":
-            print(f"{COLORS['blue']}{text}{COLORS['reset']}")
-        elif style == "procedure":
-            print(f"{COLORS['magenta']}{COLORS['bold']}{COLORS['italic']}{text}{COLORS['reset']}")
-        else:  # normal
-            print(text)
+        self.output.line(text, style)
 
         # Small delay for better readability
-        time.sleep(0.1)
+        self.pacing.pause(self.pacing.line_delay if delay is None else delay)
+
+    def _print_unpaced(self, text: str, style: str):
+        """_print_styled without the pause, for callers that pause on the event loop (e.g. the AgentRouter)"""
+        self._print_styled(text, style, delay=0)
+
+    def _print_lines(self, lines: List[Tuple[str, str]]):
+        for text, style in lines:
+            self._print_styled(text, style)
+
+    async def _print_lines_async(self, lines: List[Tuple[str, str]]):
+        """print with the usual pause after every line, awaited instead of blocking the event loop"""
+        for text, style in lines:
+            self._print_styled(text, style, delay=0)
+            await self.pacing.pause_async(self.pacing.line_delay)
+
+    def _print_stream_chunk(self, chunk: str, style: str = "bureaucrat"):
+        """Print a partial reply without a line break while it is being streamed"""
+        self.output.chunk(chunk, style)
+
+    def _finish_stream(self, text: str, style: str = "bureaucrat"):
+        """Terminate a streamed reply and log it like a regular styled message"""
+        self.logger.log_ui_message(text, style)
+        self.output.end_stream(text, style)
@@ -0,0 +1,91 @@
+"""
+Pool of pre-generated bureaucrat introductions.
+
+Introductions do not depend on the conversation, so they can be generated ahead of
+time and handed to a bureaucrat on its first visit. The pool can be shared by many
+game sessions; it refills itself in the background when it runs low.
+"""
+
+import asyncio
+import functools
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from buergeramt.characters.persona_factory import build_bureaucrat
+from buergeramt.rules.loader import get_config
+from buergeramt.utils.async_utils import get_event_loop
+from buergeramt.utils.game_logger import get_logger
+
+
+class IntroductionPool:
+    """pre-generated introductions per department
+
+    Refills are asyncio tasks; in the synchronous game loop they make progress whenever
+    the loop runs, i.e. while another model call is being awaited.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        low_watermark: int = 1,
+        model: Optional[str] = None,
+        cassette=None,
+        factory: Optional[Callable[[str], object]] = None,
+        single_shot: bool = False,
+    ):
+        self.size = size
+        self.low_watermark = low_watermark
+        # pooled introductions seed a bureaucrat's history, system prompt included, so the mode has to match
+        self._factory = factory or functools.partial(
+            build_bureaucrat, model=model, cassette=cassette, single_shot=single_shot
+        )
+        self._entries: Dict[str, Deque[Tuple[str, List]]] = {}
+        self._generators: Dict[str, object] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+
+    def available(self, department: str) -> int:
+        return len(self._entries.get(department, ()))
+
+    def take(self, department: str, bureaucrat) -> Optional[str]:
+        """hand a pooled introduction to a bureaucrat that has not talked to the player yet"""
+        entries = self._entries.get(department)
+        if not entries or bureaucrat.history.messages:
+            return None
+        text, messages = entries.popleft()
+        bureaucrat.history.record(messages)
+        return text
+
+    def refill_in_background(self, department: str) -> Optional[asyncio.Task]:
+        if self.available(department) > self.low_watermark:
+            return None
+        running = self._refills.get(department)
+        if running is not None and not running.done():
+            return running
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = get_event_loop()
+        task = loop.create_task(self.refill(department))
+        self._refills[department] = task
+        return task
+
+    async def refill(self, department: str):
+        from buergeramt.rules.game_state import GameState
+
+        entries = self._entries.setdefault(department, deque())
+        generator = self._generator(department)
+        while len(entries) < self.size:
+            # a scratch state, so tool calls during an introduction cannot touch a real game
+            scratch = GameState(current_department=department)
+            try:
+                entries.append(await generator.generate_introduction_async(scratch))
+            except Exception as e:
+                get_logger().log_error(e, f"Pre-generating introduction for {department}")
+                return
+
+    def _generator(self, department: str):
+        if department not in self._generators:
+            config = get_config()
+            persona_id = next(pid for pid, persona in config.personas.items() if persona.department == department)
+            self._generators[department] = self._factory(persona_id)
+        return self._generators[department]
@@ -0,0 +1,180 @@
+"""
+Output sinks for the game engine.
+
+Everything the engine shows, and the state changes GameState reports, goes through an
+OutputSink instead of print(), so the game is not tied to a terminal. Buffered sinks
+collect a whole turn and write it at once when the engine calls flush() at the end of
+the turn.
+"""
+
+import json
+import sys
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+# ANSI color codes
+COLORS = {
+    "red": "\033[91m",
+    "green": "\033[92m",
+    "yellow": "\033[93m",
+    "blue": "\033[94m",
+    "magenta": "\033[95m",
+    "cyan": "\033[96m",
+    "white": "\033[97m",
+    "reset": "\033[0m",
+    "bold": "\033[1m",
+    "italic": "\033[3m",
+}
+
+# style name -> ANSI prefix; styles not listed here are printed plain
+STYLE_CODES = {
+    "bureaucrat": COLORS["cyan"] + COLORS["bold"],
+    "success": COLORS["green"],
+    "failure": COLORS["red"],
+    "hint": COLORS["yellow"],
+    "italic": COLORS["italic"],
+    "title": COLORS["magenta"] + COLORS["bold"],
+    "info": COLORS["blue"],
+    "procedure": COLORS["magenta"] + COLORS["bold"] + COLORS["italic"],
+}
+
+
+class OutputSink:
+    """receives styled lines, streamed reply chunks and state events
+
+    Subclasses implement line(); the defaults turn a stream into one line and drop events.
+    """
+
+    def line(self, text: str, style: str = "normal"):
+        raise NotImplementedError
+
+    def chunk(self, text: str, style: str = "bureaucrat"):
+        """a piece of a reply that is still being generated"""
+
+    def end_stream(self, text: str, style: str = "bureaucrat"):
+        """the streamed reply is complete; text is the whole reply"""
+        self.line(text, style)
+
+    def event(self, kind: str, text: str, **data: Any):
+        """a state change such as document_added; text is a human readable form"""
+
+    def flush(self):
+        """write what has been buffered, e.g. at the end of a turn"""
+
+
+class AnsiSink(OutputSink):
+    """colored terminal output, written immediately (the classic game)"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self._stream = stream
+        self._streaming = False
+
+    @property
+    def stream(self) -> TextIO:
+        # looked up on every write, so a replaced sys.stdout is honoured
+        return self._stream or sys.stdout
+
+    def line(self, text: str, style: str = "normal"):
+        prefix = STYLE_CODES.get(style)
+        self.stream.write(f"{prefix}{text}{COLORS['reset']}\n" if prefix else f"{text}\n")
+        self.stream.flush()
+
+    def chunk(self, text: str, style: str = "bureaucrat"):
+        if not self._streaming:
+            self.stream.write(STYLE_CODES.get(style, ""))
+            self._streaming = True
+        self.stream.write(text)
+        self.stream.flush()
+
+    def end_stream(self, text: str, style: str = "bureaucrat"):
+        if self._streaming:
+            self.stream.write(f"{COLORS['reset']}\n")
+            self.stream.flush()
+            self._streaming = False
+        else:
+            # nothing was streamed (e.g. empty reply), fall back to regular output
+            self.line(text, style)
+
+    def event(self, kind: str, text: str, **data: Any):
+        self.line(text)
+
+
+class PlainSink(OutputSink):
+    """plain text without escape codes, buffered until flush()"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self._stream = stream
+        self._buffer: List[str] = []
+
+    def line(self, text: str, style: str = "normal"):
+        self._buffer.append(f"{text}\n")
+
+    def event(self, kind: str, text: str, **data: Any):
+        self._buffer.append(f"{text}\n")
+
+    def flush(self):
+        if self._buffer:
+            stream = self._stream or sys.stdout
+            stream.write("".join(self._buffer))
+            stream.flush()
+            self._buffer.clear()
+
+
+class MemorySink(OutputSink):
+    """keeps everything in lists, for tests and frontends that render themselves"""
+
+    def __init__(self):
+        self.lines: List[Tuple[str, str]] = []  # (style, text)
+        self.events: List[Dict[str, Any]] = []
+
+    def line(self, text: str, style: str = "normal"):
+        self.lines.append((style, text))
+
+    def event(self, kind: str, text: str, **data: Any):
+        self.events.append({"kind": kind, "text": text, **data})
+
+    def text(self) -> str:
+        return "\n".join(text for _, text in self.lines)
+
+    def clear(self):
+        self.lines.clear()
+        self.events.clear()
+
+
+class JsonSink(OutputSink):
+    """one JSON object per line and event (JSON Lines), buffered per turn"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self._stream = stream
+        self._buffer: List[str] = []
+
+    def line(self, text: str, style: str = "normal"):
+        self._add({"type": "line", "style": style, "text": text})
+
+    def chunk(self, text: str, style: str = "bureaucrat"):
+        self._add({"type": "chunk", "style": style, "text": text})
+
+    def end_stream(self, text: str, style: str = "bureaucrat"):
+        self.line(text, style)
+
+    def event(self, kind: str, text: str, **data: Any):
+        self._add({"type": "event", "kind": kind, "text": text, **data})
+
+    def flush(self):
+        if self._buffer:
+            stream = self._stream or sys.stdout
+            stream.write("".join(self._buffer))
+            stream.flush()
+            self._buffer.clear()
+
+    def _add(self, record: Dict[str, Any]):
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+SINKS = {"ansi": AnsiSink, "plain": PlainSink, "json": JsonSink}
+
+
+def make_sink(name: str, stream: Optional[TextIO] = None) -> OutputSink:
+    """a sink by name (ansi, plain or json)"""
+    if name not in SINKS:
+        raise ValueError(f"Unknown output '{name}', expected one of {', '.join(SINKS)}")
+    return SINKS[name](stream)
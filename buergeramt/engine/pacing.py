@@ -0,0 +1,47 @@
+"""
+Pacing of the terminal presentation.
+
+The pauses between printed lines, on the welcome screen and while walking between
+departments are there for atmosphere only. Automated play, tests and servers pick the
+headless preset, where nothing sleeps and the screen is never cleared.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Union
+
+from pydantic import BaseModel
+
+
+class PacingPolicy(BaseModel):
+    """delays in seconds; 0 means no pause at all"""
+
+    line_delay: float = 0.1  # after every printed line
+    scene_delay: float = 1.0  # welcome screen, entering the office, walking to another department
+    clear_screen: bool = True
+
+    def pause(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def pause_async(self, seconds: float):
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+
+PRESETS: Dict[str, PacingPolicy] = {
+    "interactive": PacingPolicy(),
+    "fast": PacingPolicy(line_delay=0.0, scene_delay=0.2),
+    "headless": PacingPolicy(line_delay=0.0, scene_delay=0.0, clear_screen=False),
+}
+
+
+def resolve_pacing(pacing: Optional[Union[str, PacingPolicy]]) -> PacingPolicy:
+    """a policy from a preset name, a policy or None (interactive)"""
+    if pacing is None:
+        return PRESETS["interactive"]
+    if isinstance(pacing, PacingPolicy):
+        return pacing
+    if pacing not in PRESETS:
+        raise ValueError(f"Unknown pacing '{pacing}', expected one of {', '.join(PRESETS)}")
+    return PRESETS[pacing]
@@ -0,0 +1,278 @@
+"""
+Many games in one process.
+
+The SessionManager owns one GameEngine (with its GameState, AgentRouter and output sink)
+per session and drives all of them from one event loop, so the bureaucrats of every
+session share the process-wide HTTP client. A session's turns and slash commands run
+under its own lock, one at a time; different sessions run concurrently. Sessions without
+input for idle_timeout seconds are closed, and at most max_sessions are open at once.
+With a SnapshotStore, idle sessions are swapped out instead: saved and dropped from
+memory, then resumed from the snapshot on their next request.
+"""
+
+import asyncio
+import inspect
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from buergeramt.engine.command_manager import CommandManager
+from buergeramt.engine.game_engine import GameEngine
+from buergeramt.engine.output import MemorySink, OutputSink
+from buergeramt.engine.snapshots import SessionSnapshot, SnapshotStore
+from buergeramt.rules.models import ServerConfig
+from buergeramt.utils.game_logger import current_session, get_logger
+from buergeramt.utils.telemetry import Telemetry
+
+
+class SessionLimitError(RuntimeError):
+    """raised by SessionManager.create when max_sessions are open"""
+
+
+@dataclass
+class Session:
+    id: str
+    engine: GameEngine
+    output: MemorySink
+    last_active: float
+    commands: Optional[CommandManager] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # called with the session when it is closed for being idle, e.g. to drop the player's connection
+    on_evict: List[Callable[["Session"], None]] = field(default_factory=list)
+
+    @property
+    def game_over(self) -> bool:
+        return self.engine.game_over
+
+
+@dataclass
+class Reply:
+    """what a session showed in answer to one request"""
+
+    session_id: str
+    lines: List[Tuple[str, str]]  # (style, text)
+    events: List[Dict[str, Any]]
+    game_over: bool
+
+    def text(self) -> str:
+        return "\n".join(text for _, text in self.lines)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "session": self.session_id,
+            "output": [{"style": style, "text": text} for style, text in self.lines],
+            "events": self.events,
+            "game_over": self.game_over,
+        }
+
+
+def headless_engine(output: OutputSink, **options) -> GameEngine:
+    """a game without pauses that writes to output; options are passed on to GameEngine"""
+    return GameEngine(pacing="headless", output=output, telemetry=Telemetry(), **options)
+
+
+class SessionManager:
+    def __init__(
+        self,
+        settings: Optional[ServerConfig] = None,
+        engine_factory: Callable[[OutputSink], GameEngine] = headless_engine,
+        commands_factory: Optional[Callable[..., CommandManager]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        store: Optional[SnapshotStore] = None,
+    ):
+        self.settings = settings or ServerConfig()
+        self.engine_factory = engine_factory
+        # builds a session's slash commands: commands_factory(engine, out=..., quit=..., saves=..., save_key=...)
+        self.commands_factory = commands_factory
+        # where idle sessions are swapped out to; without one they are closed
+        self.store = store
+        self.clock = clock
+        self.sessions: Dict[str, Session] = {}
+        self.logger = get_logger()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    def get(self, session_id: str) -> Session:
+        """the open session, resumed from the store if it was swapped out
+
+        raises KeyError if it does not exist or was closed, SessionLimitError if it cannot be resumed now
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self._resume(session_id)
+        return session
+
+    def _new_session(self, session_id: str) -> Session:
+        output = MemorySink()
+        engine = self.engine_factory(output)
+        session = Session(id=session_id, engine=engine, output=output, last_active=self.clock())
+        if self.commands_factory is not None and not engine.game_over:
+            session.commands = self.commands_factory(
+                engine, out=output.line, quit=self._quitter(session), saves=self.store, save_key=session_id
+            )
+        return session
+
+    def _make_room(self):
+        if len(self.sessions) >= self.settings.max_sessions:
+            self.evict_idle()
+        if len(self.sessions) >= self.settings.max_sessions:
+            raise SessionLimitError(f"All {self.settings.max_sessions} sessions are in use")
+
+    def _resume(self, session_id: str) -> Session:
+        snapshot = self.store.load(session_id) if self.store is not None else None
+        if snapshot is None:
+            raise KeyError(session_id)
+        self._make_room()
+        token = current_session.set(session_id)
+        try:
+            started = time.perf_counter()
+            session = self._new_session(session_id)
+            if session.game_over:
+                raise KeyError(session_id)
+            snapshot.restore(session.engine)
+            # nothing was played yet, the output of building the engine is not shown again
+            session.output.clear()
+            self.sessions[session_id] = session
+            self.logger.logger.info(f"Session resumed in {time.perf_counter() - started:.3f}s")
+            return session
+        finally:
+            current_session.reset(token)
+
+    async def create(self) -> Reply:
+        """open a session and play its welcome screen and greeting
+
+        raises SessionLimitError if max_sessions are open even after closing idle ones
+        """
+        self._make_room()
+        session_id = uuid.uuid4().hex[:12]
+        token = current_session.set(session_id)
+        try:
+            session = self._new_session(session_id)
+            if session.game_over:
+                # the engine could not start; its output says why
+                return self._reply(session)
+            self.sessions[session_id] = session
+            async with session.lock:
+                await session.engine.start_game_async()
+            self.logger.logger.info(f"Session opened ({len(self.sessions)} open)")
+            return self._reply(session)
+        finally:
+            current_session.reset(token)
+
+    async def handle(self, session_id: str, text: str) -> Reply:
+        """play one input (a turn or a slash command) in the session
+
+        raises KeyError if the session does not exist or was closed meanwhile
+        """
+        session = self.get(session_id)
+        token = current_session.set(session_id)
+        try:
+            async with session.lock:
+                if session_id not in self.sessions:
+                    raise KeyError(session_id)
+                session.last_active = self.clock()
+                text = text.strip()
+                if text.startswith("/"):
+                    await self._run_command(session, text[1:])
+                elif text:
+                    await session.engine.process_input_async(text)
+                session.last_active = self.clock()
+                reply = self._reply(session)
+            if session.game_over:
+                self.close(session_id)
+            return reply
+        finally:
+            current_session.reset(token)
+
+    async def _run_command(self, session: Session, command_line: str):
+        parts = command_line.split(maxsplit=1)
+        name = parts[0] if parts else ""
+        arg = parts[1] if len(parts) > 1 else None
+        command = session.commands.get_command(name) if session.commands else None
+        if command is None:
+            suggestions = session.commands.get_suggestions(name) if session.commands and name else []
+            if suggestions:
+                session.output.line(f"Unbekannter Befehl. Meinten Sie: {', '.join('/' + s for s in suggestions)}?")
+            else:
+                session.output.line("Unbekannter Befehl. Geben Sie /hilfe für eine Liste aller Befehle ein.")
+            return
+        result = command.handler(arg)
+        if inspect.isawaitable(result):
+            await result
+
+    def _quitter(self, session: Session) -> Callable[[], None]:
+        def quit():
+            # /beenden ends the game; handle() closes the session after the reply
+            session.engine.game_over = True
+
+        return quit
+
+    def _reply(self, session: Session) -> Reply:
+        reply = Reply(session.id, list(session.output.lines), list(session.output.events), session.game_over)
+        session.output.clear()
+        return reply
+
+    def close(self, session_id: str) -> bool:
+        """end the session for good, swapped out or not; False if there was none"""
+        session = self.sessions.pop(session_id, None)
+        deleted = self.store.delete(session_id) if self.store is not None else False
+        if session is None and not deleted:
+            return False
+        token = current_session.set(session_id)
+        self.logger.logger.info(f"Session closed ({len(self.sessions)} open)")
+        current_session.reset(token)
+        return True
+
+    def swap_out(self, session_id: str) -> bool:
+        """save the session to the store and drop it from memory; False without a store or session"""
+        if self.store is None or session_id not in self.sessions:
+            return False
+        session = self.sessions[session_id]
+        token = current_session.set(session_id)
+        try:
+            self.store.save(session_id, SessionSnapshot.capture(session.engine))
+        except (OSError, ValueError) as e:
+            self.logger.log_error(e, "Swapping out session")
+            return False
+        finally:
+            current_session.reset(token)
+        del self.sessions[session_id]
+        return True
+
+    def evict_idle(self) -> List[str]:
+        """close sessions without input for idle_timeout seconds; sessions in the middle of a turn are kept"""
+        now = self.clock()
+        idle = [
+            session_id
+            for session_id, session in self.sessions.items()
+            if now - session.last_active >= self.settings.idle_timeout and not session.lock.locked()
+        ]
+        for session_id in idle:
+            session = self.sessions[session_id]
+            if not self.swap_out(session_id):
+                self.close(session_id)
+            for callback in session.on_evict:
+                try:
+                    callback(session)
+                except Exception as e:
+                    self.logger.log_error(e, "Evicting session")
+        if idle:
+            self.logger.logger.info(f"Evicted {len(idle)} idle sessions")
+        return idle
+
+    async def run_eviction(self):
+        """evict idle sessions every eviction_interval seconds, until cancelled"""
+        while True:
+            await asyncio.sleep(self.settings.eviction_interval)
+            self.evict_idle()
+
+    def close_all(self):
+        """at shutdown: swap every session out if there is a store, otherwise close them"""
+        for session_id in list(self.sessions):
+            if not self.swap_out(session_id):
+                self.close(session_id)
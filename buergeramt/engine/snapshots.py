@@ -0,0 +1,199 @@
+"""
+Saving and resuming game sessions.
+
+A SessionSnapshot holds everything needed to continue a game without a single model
+call: the GameState (documents by name, the config itself is not stored) and the
+conversation history of every bureaucrat met so far. It is written as one versioned,
+compressed blob to a SnapshotStore: FileSnapshotStore for /speichern and /laden in the
+terminal, SqliteSnapshotStore (WAL mode) for the server, which swaps idle sessions out
+of memory and resumes them on their next request.
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_ai.messages import ModelMessagesTypeAdapter
+
+from buergeramt.utils.game_logger import get_logger
+
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(ValueError):
+    """the blob is damaged or was written by an incompatible version"""
+
+
+class HistorySnapshot(BaseModel):
+    """one bureaucrat's conversation history"""
+
+    messages: str = "[]"  # JSON of the pydantic_ai messages
+    summary: str = ""
+
+
+class SessionSnapshot(BaseModel):
+    version: int = SNAPSHOT_VERSION
+    config_version: str  # GameConfig.version the game was played with
+    saved_at: float = Field(default_factory=time.time)
+    state: Dict[str, Any]  # GameState.snapshot() with document names instead of documents
+    histories: Dict[str, HistorySnapshot] = Field(default_factory=dict)  # department -> history
+
+    @classmethod
+    def capture(cls, engine) -> "SessionSnapshot":
+        game_state = engine.game_state
+        state = game_state.snapshot()
+        state["collected_documents"] = list(state["collected_documents"])
+        histories = {}
+        if engine.agent_router is not None:
+            for department, bureaucrat in engine.agent_router.bureaucrats.built().items():
+                if bureaucrat.history.messages:
+                    histories[department] = HistorySnapshot(
+                        messages=ModelMessagesTypeAdapter.dump_json(bureaucrat.history.messages).decode(),
+                        summary=bureaucrat.history.summary,
+                    )
+        return cls(config_version=game_state.config.version, state=state, histories=histories)
+
+    def restore(self, engine):
+        """put the engine back into the saved game; bureaucrats with a history are built right away"""
+        game_state = engine.game_state
+        config = game_state.config
+        if self.config_version != config.version:
+            get_logger().logger.warning(
+                f"Snapshot was saved with config {self.config_version}, restoring into {config.version}"
+            )
+        state = dict(self.state)
+        state["collected_documents"] = {
+            name: config.documents[name] for name in state["collected_documents"] if name in config.documents
+        }
+        game_state.restore(state)
+        router = engine.agent_router
+        if router is None:
+            return
+        for department, bureaucrat in router.bureaucrats.built().items():
+            if department not in self.histories:
+                bureaucrat.history.clear()
+        for department, saved in self.histories.items():
+            if department in router.bureaucrats:
+                history = router.bureaucrats[department].history
+                history.record(ModelMessagesTypeAdapter.validate_json(saved.messages))
+                history.summary = saved.summary
+        if game_state.current_department in router.bureaucrats:
+            router.active_bureaucrat = router.bureaucrats[game_state.current_department]
+        else:
+            game_state.current_department = router.active_bureaucrat.department
+
+    def to_blob(self) -> bytes:
+        return zlib.compress(self.model_dump_json().encode("utf-8"))
+
+    @classmethod
+    def from_blob(cls, blob: bytes) -> "SessionSnapshot":
+        try:
+            snapshot = cls.model_validate_json(zlib.decompress(blob))
+        except (zlib.error, ValidationError) as e:
+            raise SnapshotError(f"Unreadable snapshot: {e}") from e
+        if snapshot.version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Snapshot version {snapshot.version} is not supported (expected {SNAPSHOT_VERSION})")
+        return snapshot
+
+
+class SnapshotStore:
+    """key -> SessionSnapshot; load returns None for unknown keys"""
+
+    def save(self, key: str, snapshot: SessionSnapshot):
+        raise NotImplementedError
+
+    def load(self, key: str) -> Optional[SessionSnapshot]:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileSnapshotStore(SnapshotStore):
+    """one file per snapshot in a directory"""
+
+    SUFFIX = ".snapshot"
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        if not key or Path(key).name != key or key.startswith("."):
+            raise ValueError(f"Invalid snapshot name '{key}'")
+        return self.directory / f"{key}{self.SUFFIX}"
+
+    def save(self, key: str, snapshot: SessionSnapshot):
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(snapshot.to_blob())
+        tmp.replace(path)
+
+    def load(self, key: str) -> Optional[SessionSnapshot]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return SessionSnapshot.from_blob(path.read_bytes())
+
+    def delete(self, key: str) -> bool:
+        path = self._path(key)
+        if not path.exists():
+            return False
+        path.unlink()
+        return True
+
+    def keys(self) -> List[str]:
+        return sorted(path.stem for path in self.directory.glob(f"*{self.SUFFIX}"))
+
+
+class SqliteSnapshotStore(SnapshotStore):
+    """snapshots in one SQLite database in WAL mode, so saves do not block readers"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps committed transactions durable enough for game saves without a sync per write
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots "
+            "(key TEXT PRIMARY KEY, version INTEGER NOT NULL, saved_at REAL NOT NULL, blob BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def save(self, key: str, snapshot: SessionSnapshot):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots (key, version, saved_at, blob) VALUES (?, ?, ?, ?)",
+                (key, snapshot.version, snapshot.saved_at, snapshot.to_blob()),
+            )
+
+    def load(self, key: str) -> Optional[SessionSnapshot]:
+        with self._lock:
+            row = self._db.execute("SELECT blob FROM snapshots WHERE key = ?", (key,)).fetchone()
+        return SessionSnapshot.from_blob(row[0]) if row else None
+
+    def delete(self, key: str) -> bool:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM snapshots WHERE key = ?", (key,)).rowcount > 0
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT key FROM snapshots ORDER BY key")]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,97 @@
+"""
+Typed state changes for single-shot replies.
+
+In single-shot mode a bureaucrat does not call tools; its AgentResponse lists the state
+changes it wants next to the reply text, so a turn needs one model request. The engine
+validates and applies them with apply_actions; rejections are rendered locally from
+ActionReplies, because the model never sees the result of its actions.
+"""
+
+from dataclasses import dataclass, field
+from typing import Annotated, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from buergeramt.rules.models import ActionReplies
+from buergeramt.utils.game_logger import get_logger
+
+
+class AddEvidenceAction(BaseModel):
+    type: Literal["add_evidence"] = "add_evidence"
+    evidence_name: str
+    evidence_form: str
+
+
+class AddDocumentAction(BaseModel):
+    type: Literal["add_document"] = "add_document"
+    document_name: str
+
+
+class FrustrationAction(BaseModel):
+    type: Literal["frustration"] = "frustration"
+    delta: int = Field(ge=-3, le=3)  # positive raises, negative lowers the player's frustration
+
+
+class SwitchDepartmentAction(BaseModel):
+    type: Literal["switch_department"] = "switch_department"
+    department: str
+
+
+Action = Annotated[
+    Union[AddEvidenceAction, AddDocumentAction, FrustrationAction, SwitchDepartmentAction],
+    Field(discriminator="type"),
+]
+
+
+@dataclass
+class ActionOutcome:
+    """what apply_actions did with a reply's actions"""
+
+    applied: List[Action] = field(default_factory=list)
+    rejected: List[Action] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)  # locally rendered rejections, shown after the reply
+
+
+def apply_actions(actions: List[Action], game_state, replies: Optional[ActionReplies] = None) -> ActionOutcome:
+    """validate and apply a reply's actions in order; a department switch always comes last
+
+    Documents are only issued by the department that handles them, like on the fast path.
+    """
+    replies = replies or ActionReplies()
+    config = game_state.config
+    outcome = ActionOutcome()
+    switches = [action for action in actions if isinstance(action, SwitchDepartmentAction)]
+    for action in [action for action in actions if not isinstance(action, SwitchDepartmentAction)] + switches[-1:]:
+        note = None
+        if isinstance(action, AddEvidenceAction):
+            if game_state.evidence_provided.get(action.evidence_name) == action.evidence_form:
+                continue
+            if not game_state.add_evidence(action.evidence_name, action.evidence_form):
+                note = replies.invalid_evidence.format(form=action.evidence_form, evidence=action.evidence_name)
+        elif isinstance(action, AddDocumentAction):
+            doc = config.documents.get(action.document_name)
+            if action.document_name in game_state.collected_documents:
+                continue
+            if doc is not None and doc.department != game_state.current_department:
+                note = replies.wrong_department.format(document=action.document_name, department=doc.department)
+            else:
+                reason = game_state.add_document(action.document_name)
+                if action.document_name not in game_state.collected_documents:
+                    note = replies.rejected_document.format(document=action.document_name, reason=reason)
+        elif isinstance(action, FrustrationAction):
+            if action.delta > 0:
+                game_state.increase_frustration(action.delta)
+            elif action.delta < 0:
+                game_state.decrease_frustration(-action.delta)
+        elif isinstance(action, SwitchDepartmentAction):
+            if action.department not in {persona.department for persona in config.personas.values()}:
+                get_logger().log_error(ValueError(f"Unknown department '{action.department}'"), "apply_actions")
+                outcome.rejected.append(action)
+                continue
+            game_state.switch_department(action.department)
+        if note is None:
+            outcome.applied.append(action)
+        else:
+            outcome.rejected.append(action)
+            outcome.notes.append(note)
+    return outcome
@@ -1,9 +1,11 @@
+import hashlib
 from typing import Dict, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
-from buergeramt.rules.models import Document, Evidence, PersonaDefaults
+from buergeramt.rules.models import Document, Evidence, HttpClientConfig, PersonaDefaults, ProgressWeights, ServerConfig
 from buergeramt.rules.persona import Persona
+from buergeramt.rules.requirement_graph import RequirementGraph
 
 
 class GameConfig(BaseModel):
@@ -13,3 +15,33 @@ class GameConfig(BaseModel):
     persona_defaults: PersonaDefaults = Field(default_factory=PersonaDefaults)
     final_document: Optional[str] = None  # id of the end goal document
     starting_agent: Optional[str] = None  # persona_id or department name
+    progress_weights: ProgressWeights = Field(default_factory=ProgressWeights)
+    http: HttpClientConfig = Field(default_factory=HttpClientConfig)
+    server: ServerConfig = Field(default_factory=ServerConfig)
+
+    # compiled from documents, evidence, personas and final_document; see graph
+    _graph: Optional[RequirementGraph] = PrivateAttr(default=None)
+    _graph_key: Optional[tuple] = PrivateAttr(default=None)
+
+    @property
+    def graph(self) -> RequirementGraph:
+        """the document dependency graph, compiled on first use (load_config does that right away)
+
+        a model_copy keeps the graph as long as the fields it was compiled from are the same objects
+        """
+        key = (id(self.documents), id(self.evidence), id(self.personas), self.final_document)
+        if self._graph is None or self._graph_key != key:
+            self._graph = RequirementGraph.compile(
+                self.documents,
+                self.evidence,
+                {persona.department for persona in self.personas.values()},
+                self.final_document,
+            )
+            self._graph_key = key
+        return self._graph
+
+    @property
+    def version(self) -> str:
+        """content hash of the config; artifacts compiled from it are cached per version"""
+        # not memoized: model_copy(update=...) would carry a stale value over
+        return hashlib.sha256(self.model_dump_json().encode()).hexdigest()[:16]
@@ -1,12 +1,13 @@
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field, PrivateAttr
 from pydantic_ai import RunContext
 
 from buergeramt.rules.game_config import GameConfig
 from buergeramt.rules.loader import get_config
-from buergeramt.rules.models import Document
+from buergeramt.rules.models import Document, EvidenceItem
+from buergeramt.rules.progress import ProgressTracker
 from buergeramt.utils.game_logger import get_logger
 
 
@@ -25,9 +26,19 @@ class GameState(BaseModel):
 
     # _logger is not part of the model serialization
     _logger: any = PrivateAttr(default_factory=get_logger)
+    _department_listeners: List[Callable[[str], None]] = PrivateAttr(default_factory=list)
+    # optional engine OutputSink for state messages; without one they are printed
+    _output: Any = PrivateAttr(default=None)
+    # (kind, text, data) of state messages held back until the turn is committed (see hold_events)
+    _held_events: Optional[List[Tuple[str, str, Dict[str, Any]]]] = PrivateAttr(default=None)
+    # where each open hold_events started in _held_events; holds nest, the outermost one shows the messages
+    _hold_marks: List[int] = PrivateAttr(default_factory=list)
+    # remaining requirements, ready documents, progress points and win flag (see rules.progress)
+    _tracker: ProgressTracker = PrivateAttr(default=None)
 
     def __init__(self, **data):
         super().__init__(**data)
+        self._tracker = ProgressTracker(self.config, self.collected_documents, self.evidence_provided)
         self._logger.log_game_state("Initializing new game state")
         self._logger.log_game_state(self)
 
@@ -38,20 +49,20 @@ class GameState(BaseModel):
             self._logger.log_error(ValueError(f"Document '{document_name}' not found in config"), "add_document")
             return f"Dokument '{document_name}' ist nicht bekannt."
         doc = docs[document_name]
-        # determine missing requirements: evidence and prerequisite documents
-        missing_evidence = [
-            req for req in doc.requirements if req in self.config.evidence and req not in self.evidence_provided
-        ]
-        missing_documents = [
-            req for req in doc.requirements if req in self.config.documents and req not in self.collected_documents
-        ]
-        missing_reqs = missing_evidence + missing_documents
-        if missing_reqs:
+        missing = self._tracker.missing(document_name)
+        if missing:
+            # name missing evidence first, then prerequisite documents
+            missing_evidence = [req for req in doc.requirements if req in missing and req in self.config.evidence]
+            missing_documents = [req for req in doc.requirements if req in missing and req in self.config.documents]
+            missing_reqs = missing_evidence + missing_documents
             missing_str = ", ".join(missing_reqs)
             return f"Sie müssen zuerst folgende Nachweise/Dokumente vorlegen: {missing_str}."
         self.collected_documents[document_name] = doc
+        self._tracker.document_added(document_name)
 
-        print(f"Document '{document_name}' added to collected documents.")
+        self._notify(
+            "document_added", f"Document '{document_name}' added to collected documents.", document=document_name
+        )
 
         self._logger.log_document_acquired(document_name)
         return f"Dokument '{document_name}' wurde erfolgreich hinzugefügt."
@@ -61,8 +72,14 @@ class GameState(BaseModel):
         evs = self.config.evidence
         if evidence_name in evs and evidence_form in evs[evidence_name].acceptable_forms:
             self.evidence_provided[evidence_name] = evidence_form
+            self._tracker.evidence_added(evidence_name)
 
-            print(f"Evidence '{evidence_name}' with form '{evidence_form}' added to evidence provided.")
+            self._notify(
+                "evidence_added",
+                f"Evidence '{evidence_name}' with form '{evidence_form}' added to evidence provided.",
+                evidence=evidence_name,
+                form=evidence_form,
+            )
 
             self._logger.log_evidence_provided(evidence_name, evidence_form)
             return True
@@ -71,6 +88,40 @@ class GameState(BaseModel):
         )
         return False
 
+    def add_evidences(self, items: List[EvidenceItem]) -> List[Dict[str, Any]]:
+        """batched add_evidence, so one model step can hand over several items; one result per item"""
+        results = []
+        for item in items:
+            item = EvidenceItem.model_validate(item)
+            results.append(
+                {
+                    "evidence_name": item.evidence_name,
+                    "evidence_form": item.evidence_form,
+                    "accepted": self.add_evidence(item.evidence_name, item.evidence_form),
+                }
+            )
+        return results
+
+    def add_documents(self, document_names: List[str]) -> List[Dict[str, Any]]:
+        """batched add_document; one result per name, in the given order
+
+        a document whose prerequisite comes later in the same batch is tried again once that one was added
+        """
+        messages = {name: self.add_document(name) for name in document_names}
+        pending = [name for name in document_names if name not in self.collected_documents]
+        while pending:
+            retried = [name for name in pending if name in self.config.documents]
+            for name in retried:
+                messages[name] = self.add_document(name)
+            still_pending = [name for name in pending if name not in self.collected_documents]
+            if len(still_pending) == len(pending):
+                break
+            pending = still_pending
+        return [
+            {"document_name": name, "added": name in self.collected_documents, "message": messages[name]}
+            for name in document_names
+        ]
+
     def increase_frustration(self, amount: int = 1):
         self._debug_log_tool_call("increase_frustration", amount=amount)
         old_level = self.frustration_level
@@ -85,9 +136,8 @@ class GameState(BaseModel):
 
     def update_progress(self):
         old_progress = self.progress
-        document_progress = len(self.collected_documents) * 20
-        evidence_progress = len(self.evidence_provided) * 10
-        self.progress = min(100, document_progress + evidence_progress)
+        # weighted in config.progress_weights, counted as documents and evidence come in
+        self.progress = self._tracker.progress
         if self.progress != old_progress:
             self._logger.log_state_change("progress", old_progress, self.progress)
         return self.progress
@@ -100,8 +150,98 @@ class GameState(BaseModel):
         old = self.current_department
         self.current_department = department
         self._logger.log_state_change("current_department", old, department)
+        for listener in self._department_listeners:
+            listener(department)
         return True
 
+    def set_output(self, output):
+        """route state messages to an OutputSink (see engine.output) instead of print"""
+        self._output = output
+
+    def _notify(self, kind: str, text: str, **data):
+        if self._held_events is not None:
+            self._held_events.append((kind, text, data))
+        elif self._output is None:
+            print(text)
+        else:
+            self._output.event(kind, text, **data)
+
+    def hold_events(self):
+        """keep state messages back, e.g. while a model attempt may still be rolled back
+
+        holds nest: messages are shown when the outermost hold is released
+        """
+        if self._held_events is None:
+            self._held_events = []
+        self._hold_marks.append(len(self._held_events))
+
+    def release_events(self):
+        """end the innermost hold; the messages are shown once no hold is left"""
+        if self._hold_marks:
+            self._hold_marks.pop()
+        if self._hold_marks:
+            return
+        events, self._held_events = self._held_events or [], None
+        for kind, text, data in events:
+            self._notify(kind, text, **data)
+
+    def discard_events(self):
+        """drop the messages held since the innermost hold, e.g. of a rolled back attempt, and end that hold"""
+        mark = self._hold_marks.pop() if self._hold_marks else 0
+        if self._held_events is not None:
+            del self._held_events[mark:]
+        if not self._hold_marks:
+            self._held_events = None
+
+    def adopt_events(self, other: "GameState"):
+        """take over the held messages of a fork whose state was adopted"""
+        for kind, text, data in other._held_events or []:
+            self._notify(kind, text, **data)
+
+    def on_department_change(self, listener: Callable[[str], None]):
+        """register a callback for switch_department, e.g. to prefetch the next introduction"""
+        self._department_listeners.append(listener)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """copy of everything a turn can change, for rolling back a failed turn"""
+        return {
+            "collected_documents": dict(self.collected_documents),
+            "evidence_provided": dict(self.evidence_provided),
+            "current_department": self.current_department,
+            "attempts": self.attempts,
+            "frustration_level": self.frustration_level,
+            "progress": self.progress,
+        }
+
+    def restore(self, snapshot: Dict[str, Any], notify: bool = False):
+        """go back to a snapshot; with notify, department listeners hear about a changed department"""
+        old_department = self.current_department
+        self.collected_documents = dict(snapshot["collected_documents"])
+        self.evidence_provided = dict(snapshot["evidence_provided"])
+        self.current_department = snapshot["current_department"]
+        self.attempts = snapshot["attempts"]
+        self.frustration_level = snapshot["frustration_level"]
+        self.progress = snapshot["progress"]
+        self._tracker = ProgressTracker(self.config, self.collected_documents, self.evidence_provided)
+        self._logger.logger.info(f"Game state restored (department {old_department} -> {self.current_department})")
+        if notify and self.current_department != old_department:
+            for listener in self._department_listeners:
+                listener(self.current_department)
+
+    def fork(self) -> "GameState":
+        """independent scratch copy without listeners or output, e.g. for a hedged request
+
+        its state messages are held back; adopt_events passes them on if the fork wins
+        """
+        scratch = self.model_copy()
+        scratch.restore(self.snapshot())
+        scratch._department_listeners = []
+        scratch._output = None
+        scratch._held_events = None
+        scratch._hold_marks = []
+        scratch.hold_events()
+        return scratch
+
     # -----------------------------------------------------------------
     # transition_procedure removed – concept dropped to simplify game.
     # The following stub is left to avoid runtime errors if an outdated
@@ -117,18 +257,33 @@ class GameState(BaseModel):
         return list(self.evidence_provided.keys())
 
     def get_department_documents(self) -> List[str]:
-        return [doc_id for doc_id, doc in self.config.documents.items() if doc.department == self.current_department]
+        return list(self.config.graph.documents_of(self.current_department))
 
     def get_missing_evidence(self) -> Dict[str, List[str]]:
+        """open documents -> their unmet requirements (evidence and prerequisite documents)"""
         missing: Dict[str, List[str]] = {}
-        for doc_id, doc in self.config.documents.items():
-            if doc_id in self.collected_documents:
-                continue
-            missing_reqs = [r for r in doc.requirements if r not in self.evidence_provided]
-            if missing_reqs:
-                missing[doc_id] = missing_reqs
+        for doc_id in self._tracker.open_documents():
+            unmet = self._tracker.missing(doc_id)
+            if unmet:
+                missing[doc_id] = [req for req in self.config.documents[doc_id].requirements if req in unmet]
         return missing
 
+    def get_ready_documents(self) -> List[str]:
+        """documents that are not collected yet and have all their requirements, in config order"""
+        return [doc_id for doc_id in self.config.documents if doc_id in self._tracker.ready]
+
+    def remaining_requirements(self, document_name: str) -> int:
+        return self._tracker.remaining(document_name)
+
+    @property
+    def all_documents_collected(self) -> bool:
+        return self._tracker.complete
+
+    @property
+    def final_document_collected(self) -> bool:
+        """the config's final_document is collected, which wins the game"""
+        return self._tracker.final_collected
+
     def get_bureaucrat_for_department(self, department: str) -> str:
         department_to_bureaucrat = {
             "Erstbearbeitung": "HerrSchmidt",
@@ -167,6 +322,18 @@ class GameDeps:
     game_state: "GameState"
 
 
+# tool name -> GameState method, used to replay recorded tool calls
+TOOL_METHODS = {
+    "add_document": "add_document",
+    "add_evidence": "add_evidence",
+    "add_documents": "add_documents",
+    "add_evidences": "add_evidences",
+    "increase_frustration": "increase_frustration",
+    "decrease_frustration": "decrease_frustration",
+    "switch_department": "switch_department",
+}
+
+
 # Tool registration will be done via @agent.tool in the agent setup, not here.
 # Example tool function signatures for use with @agent.tool:
 def add_document(ctx: RunContext[GameDeps], document_name: str):
@@ -177,6 +344,14 @@ def add_evidence(ctx: RunContext[GameDeps], evidence_name: str, evidence_form: s
     return ctx.deps.game_state.add_evidence(evidence_name, evidence_form)
 
 
+def add_documents(ctx: RunContext[GameDeps], document_names: List[str]):
+    return ctx.deps.game_state.add_documents(document_names)
+
+
+def add_evidences(ctx: RunContext[GameDeps], items: List[EvidenceItem]):
+    return ctx.deps.game_state.add_evidences(items)
+
+
 def increase_frustration(ctx: RunContext[GameDeps], amount: int = 1):
     return ctx.deps.game_state.increase_frustration(amount)
 
@@ -185,5 +360,6 @@ def decrease_frustration(ctx: RunContext[GameDeps], amount: int = 1):
     return ctx.deps.game_state.decrease_frustration(amount)
 
 
-def switch_department(ctx: RunContext[GameDeps], department: str):
+async def switch_department(ctx: RunContext[GameDeps], department: str):
+    # async so listeners run on the event loop and can start tasks there
     return ctx.deps.game_state.switch_department(department)
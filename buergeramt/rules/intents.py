@@ -0,0 +1,158 @@
+"""
+Local intent matching for evidence and document submissions.
+
+Builds an index from config.evidence and config.documents, so submissions like
+"Hier ist mein Reisepass" can be applied to the GameState without a model call.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from buergeramt.rules.game_config import GameConfig
+
+# words that may surround a submission without changing its meaning
+FILLER_WORDS = {
+    "hier", "ist", "sind", "das", "der", "die", "den", "dem", "ein", "eine", "einen", "einem", "mein", "meine",
+    "meinen", "meinem", "ich", "habe", "hab", "dabei", "und", "bitte", "sehr", "gerne", "gern", "also", "so", "nun",
+    "ihnen", "reiche", "lege", "vor", "zeige", "gebe", "ab", "mit", "auch", "noch", "als", "nachweis", "schön",
+    "guten", "tag", "hallo", "danke", "okay", "ok", "ja", "bringe", "hätte", "haette", "möchte", "moechte",
+}  # fmt: skip
+# start of the note FastPathOutcome.annotate adds to the player's input
+ANNOTATION_START = "\n\n[Bereits vom System erledigt"
+QUESTION_WORDS = {"was", "wie", "wo", "wer", "wann", "warum", "wieso", "welche", "welcher", "welches", "brauche"}
+# "Ich habe keinen Reisepass" names a form without handing it over
+NEGATION_WORDS = {"nicht", "nichts", "kein", "keine", "keinen", "keinem", "keiner", "keines", "ohne"}
+
+
+def normalize(text: str) -> str:
+    """casefold, fold umlauts and drop punctuation for matching"""
+    text = text.casefold()
+    for src, dst in (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss")):
+        text = text.replace(src, dst)
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+@dataclass
+class SubmissionIntent:
+    """what a player's input submits, as far as the config can tell"""
+
+    evidence: List[Tuple[str, str]] = field(default_factory=list)  # (evidence id, form)
+    documents: List[str] = field(default_factory=list)
+    leftover: List[str] = field(default_factory=list)  # words not explained by a submission
+    is_question: bool = False
+    is_negated: bool = False
+
+    @property
+    def matched(self) -> bool:
+        return bool(self.evidence or self.documents)
+
+    @property
+    def is_submission(self) -> bool:
+        """the input hands the matched items over, instead of asking about them or denying them"""
+        return self.matched and not self.is_question and not self.is_negated
+
+    @property
+    def is_pure_submission(self) -> bool:
+        """the input does nothing but hand over the matched items"""
+        return self.is_submission and not self.leftover
+
+    @property
+    def is_simple(self) -> bool:
+        """greeting, small talk made of filler words or a pure submission; cheap to answer"""
+        return not self.is_question and not self.leftover
+
+
+class IntentMatcher:
+    """index of every acceptable evidence form and document id from the config"""
+
+    def __init__(self, config: GameConfig):
+        self.config = config
+        entries = []
+        for ev_id, ev in config.evidence.items():
+            for form in ev.acceptable_forms:
+                entries.append((normalize(form), "evidence", (ev_id, form)))
+        for doc_id, doc in config.documents.items():
+            entries.append((normalize(doc_id), "document", doc_id))
+            entries.append((normalize(doc.code), "document", doc_id))
+        # longest phrases first, so "Foto vom gemeinsamen Urlaub" wins over shorter overlaps
+        self._entries = sorted(entries, key=lambda entry: len(entry[0]), reverse=True)
+
+    def match(self, text: str) -> SubmissionIntent:
+        intent = SubmissionIntent()
+        normalized = f" {normalize(text)} "
+        for phrase, kind, target in self._entries:
+            needle = f" {phrase} "
+            if not phrase or needle not in normalized:
+                continue
+            normalized = normalized.replace(needle, " ", 1)
+            if kind == "evidence" and target[0] not in dict(intent.evidence):
+                intent.evidence.append(target)
+            elif kind == "document" and target not in intent.documents:
+                intent.documents.append(target)
+        words = normalized.split()
+        intent.is_question = "?" in text or bool(words and words[0] in QUESTION_WORDS)
+        # after the matched phrases are removed, so a form's own wording cannot count as a negation
+        intent.is_negated = any(word in NEGATION_WORDS for word in words)
+        intent.leftover = [word for word in words if word not in FILLER_WORDS]
+        return intent
+
+
+@dataclass
+class FastPathOutcome:
+    """result of applying a submission locally"""
+
+    accepted_evidence: List[Tuple[str, str]] = field(default_factory=list)
+    issued_documents: List[str] = field(default_factory=list)
+    rejected_documents: List[Tuple[str, str]] = field(default_factory=list)  # (document id, reason)
+    reply: Optional[str] = None  # templated reply; None means the model still has to answer
+
+    @property
+    def applied(self) -> bool:
+        return bool(self.accepted_evidence or self.issued_documents or self.rejected_documents)
+
+    def annotate(self, user_input: str) -> str:
+        """the user input plus a note about what has already been applied"""
+        notes = [f"Nachweis {ev_id} ({form}) angenommen" for ev_id, form in self.accepted_evidence]
+        notes += [f"Dokument {doc_id} ausgestellt" for doc_id in self.issued_documents]
+        notes += [f"Dokument {doc_id} abgelehnt: {reason}" for doc_id, reason in self.rejected_documents]
+        return (
+            f"{user_input}{ANNOTATION_START}, rufen Sie dafür KEINE Tools mehr auf: "
+            f"{'; '.join(notes)}. Reagieren Sie nur noch darauf.]"
+        )
+
+
+def apply_submission(intent: SubmissionIntent, game_state, replies=None) -> FastPathOutcome:
+    """apply matched evidence and documents to the game state
+
+    Questions and negated inputs ("Brauche ich einen Reisepass?", "Ich habe keinen
+    Reisepass") apply nothing. Documents are only issued by the department that handles
+    them; everything else is left to the model. If the input was a pure submission and nothing was rejected, a
+    templated reply from ``replies`` (FastPathReplies) is filled in.
+    """
+    outcome = FastPathOutcome()
+    if not intent.is_submission:
+        return outcome
+    for ev_id, form in intent.evidence:
+        if game_state.evidence_provided.get(ev_id) == form:
+            continue
+        if game_state.add_evidence(ev_id, form):
+            outcome.accepted_evidence.append((ev_id, form))
+    for doc_id in intent.documents:
+        doc = game_state.config.documents[doc_id]
+        if doc_id in game_state.collected_documents or doc.department != game_state.current_department:
+            continue
+        result = game_state.add_document(doc_id)
+        if doc_id in game_state.collected_documents:
+            outcome.issued_documents.append(doc_id)
+        else:
+            outcome.rejected_documents.append((doc_id, result))
+    if replies is not None and intent.is_pure_submission and outcome.applied and not outcome.rejected_documents:
+        if intent.documents and len(outcome.issued_documents) != len(intent.documents):
+            # some documents were left for the model (other department or already issued)
+            return outcome
+        if outcome.issued_documents:
+            outcome.reply = replies.document.format(items=", ".join(outcome.issued_documents))
+        else:
+            outcome.reply = replies.evidence.format(items=", ".join(form for _, form in outcome.accepted_evidence))
+    return outcome
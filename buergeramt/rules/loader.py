@@ -4,8 +4,20 @@ from typing import Dict
 import yaml
 
 from buergeramt.rules.game_config import GameConfig
-from buergeramt.rules.models import Document, Evidence, PersonaConfig, PersonaDefaults
+from buergeramt.rules.models import (
+    Document,
+    Evidence,
+    HistoryPolicy,
+    HttpClientConfig,
+    ModelConfig,
+    PersonaConfig,
+    PersonaDefaults,
+    ProgressWeights,
+    RetryPolicy,
+    ServerConfig,
+)
 from buergeramt.rules.persona import Persona
+from buergeramt.utils.game_logger import get_logger
 
 CONFIG_PATH = Path(__file__).parent / "config.yaml"
 
@@ -51,18 +63,18 @@ def load_config() -> GameConfig:
         persona_defaults=persona_defaults,
         final_document=final_document,
         starting_agent=starting_agent,
+        progress_weights=ProgressWeights(**game_section.get("progress_weights", {})),
+        http=HttpClientConfig(**raw.get("http", {})),
+        server=ServerConfig(**raw.get("server", {})),
     )
 
-    # check that all document requirements that refer to documents are defined
-    all_doc_ids = set(docs.keys())
-    all_evidence_ids = set(evs.keys())
-    for doc in docs.values():
-        for req in doc.requirements:
-            # if requirement is not evidence, it must be a document
-            if req not in all_evidence_ids and req not in all_doc_ids:
-                raise ValueError(
-                    f"Document '{doc.id}' requires '{req}', which is not defined as a document or evidence."
-                )
+    # compile the document dependency graph now: undefined requirements, cycles and an unreachable
+    # final document are config errors, and every session shares the compiled graph
+    graph = config.graph
+    if graph.unreachable:
+        get_logger().logger.warning(f"No department can issue: {', '.join(sorted(graph.unreachable))}")
+    if graph.unused:
+        get_logger().logger.warning(f"Not needed for {final_document}: {', '.join(sorted(graph.unused))}")
 
     return config
 
@@ -77,6 +89,16 @@ def create_persona_from_config(persona_id: str, config: PersonaConfig, defaults:
     else:
         behavioral_rules = defaults.behavioral_rules
     system_prompt_template = defaults.system_prompt_template
+    # persona-specific history settings override single fields of the defaults
+    history = defaults.history
+    if config.history:
+        history = HistoryPolicy(**{**defaults.history.model_dump(), **config.history})
+    retry = defaults.retry
+    if config.retry:
+        retry = RetryPolicy(**{**defaults.retry.model_dump(), **config.retry})
+    model = defaults.model
+    if config.model:
+        model = ModelConfig(**{**defaults.model.model_dump(), **config.model})
 
     return Persona(
         id=persona_id,
@@ -88,6 +110,9 @@ def create_persona_from_config(persona_id: str, config: PersonaConfig, defaults:
         required_evidence=config.required_evidence,
         behavioral_rules=behavioral_rules,
         system_prompt_template=system_prompt_template,
+        history=history,
+        retry=retry,
+        model=model,
     )
 
 
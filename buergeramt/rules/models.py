@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # model for a document definition
@@ -19,6 +19,104 @@ class Evidence(BaseModel):
     acceptable_forms: List[str]
 
 
+# one item of a batched add_evidences tool call
+class EvidenceItem(BaseModel):
+    evidence_name: str
+    evidence_form: str
+
+
+class ProgressWeights(BaseModel):
+    """Points per collected document and provided evidence; progress is capped at 100"""
+
+    document: int = 20
+    evidence: int = 10
+    overrides: Dict[str, int] = Field(default_factory=dict)  # document or evidence id -> points
+
+    def points(self, item_id: str, is_document: bool) -> int:
+        return self.overrides.get(item_id, self.document if is_document else self.evidence)
+
+
+class HistoryPolicy(BaseModel):
+    """Bounds for a bureaucrat's conversation history"""
+
+    max_turns: int = 6  # turns kept verbatim
+    token_budget: Optional[int] = 3000  # estimated tokens of the verbatim history
+    summary_max_chars: int = 800
+    summarizer: Literal["extractive", "model"] = "extractive"
+
+
+class ModelConfig(BaseModel):
+    """Model and generation settings for a persona's bureaucrat"""
+
+    name: Optional[str] = None  # pydantic_ai model name; None uses the built-in default
+    max_tokens: Optional[int] = None  # output cap per model response
+    temperature: Optional[float] = None
+    timeout: Optional[float] = None  # seconds per HTTP request to the provider
+    cheap_model: Optional[str] = None  # model for simple turns (greetings, pure submissions)
+    cheap_max_tokens: Optional[int] = None  # output cap for simple turns; None uses max_tokens
+
+    def settings(self, simple: bool = False) -> Dict[str, Any]:
+        """pydantic_ai ModelSettings for a turn"""
+        settings: Dict[str, Any] = {}
+        max_tokens = self.cheap_max_tokens if simple and self.cheap_max_tokens else self.max_tokens
+        if max_tokens is not None:
+            settings["max_tokens"] = max_tokens
+        if self.temperature is not None:
+            settings["temperature"] = self.temperature
+        if self.timeout is not None:
+            settings["timeout"] = self.timeout
+        return settings
+
+
+class HttpClientConfig(BaseModel):
+    """Connection pool of the process-wide HTTP client shared by all bureaucrats"""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 90.0  # seconds an idle connection is kept open
+    http2: bool = True  # used if the h2 package is installed
+    connect_timeout: float = 5.0
+    timeout: float = 60.0  # read/write/pool timeout; ModelSettings.timeout can only shorten it
+
+
+class ServerConfig(BaseModel):
+    """Limits of the multi-session game server (python -m buergeramt.server)"""
+
+    host: str = "127.0.0.1"
+    port: int = 8765
+    max_sessions: int = 50
+    idle_timeout: float = 900.0  # seconds without input before a session is closed
+    eviction_interval: float = 30.0  # seconds between checks for idle sessions
+    snapshot_db: Optional[str] = None  # SQLite file to swap idle sessions out to; None closes them instead
+
+
+class RetryPolicy(BaseModel):
+    """Retries, timeouts and hedged requests for a bureaucrat's turns"""
+
+    attempts: int = 3  # tries per turn, including the first one
+    timeout: Optional[float] = 30.0  # seconds per model call
+    backoff: float = 0.5  # base delay before a retry, doubled per attempt, full jitter
+    max_backoff: float = 8.0
+    hedge: bool = False  # fire a second request when the first one is slow
+    hedge_after: Optional[float] = None  # seconds; None uses the persona's observed p95 latency
+    hedge_min_samples: int = 20  # turns observed before the p95 is trusted
+
+
+class FastPathReplies(BaseModel):
+    """Templated replies for submissions handled without a model call ({items} is filled in)"""
+
+    evidence: str = "So, {items}. Das nehme ich zu den Akten. Was haben Sie noch?"
+    document: str = "Na gut. {items} ist hiermit ausgestellt und abgestempelt."
+
+
+class ActionReplies(BaseModel):
+    """Locally rendered notes for actions of a single-shot reply that the game state rejected"""
+
+    rejected_document: str = "Moment, {document} kann ich Ihnen so nicht ausstellen. {reason}"
+    wrong_department: str = "{document} stellt allerdings die Abteilung {department} aus."
+    invalid_evidence: str = "{form} kann ich als Nachweis für {evidence} leider nicht anerkennen."
+
+
 class PersonaConfig(BaseModel):
     """Raw persona config from YAML file - minimal required fields"""
 
@@ -29,11 +127,19 @@ class PersonaConfig(BaseModel):
     handled_documents: List[str]
     required_evidence: List[str]
     behavioral_rules: Optional[List[str]] = None
+    history: Optional[Dict[str, Any]] = None  # overrides for persona_defaults.history
+    retry: Optional[Dict[str, Any]] = None  # overrides for persona_defaults.retry
+    model: Optional[Dict[str, Any]] = None  # overrides for persona_defaults.model
 
 
 class PersonaDefaults(BaseModel):
     system_prompt_template: str
     behavioral_rules: List[str]
+    history: HistoryPolicy = Field(default_factory=HistoryPolicy)
+    retry: RetryPolicy = Field(default_factory=RetryPolicy)
+    model: ModelConfig = Field(default_factory=ModelConfig)
+    fast_path_replies: FastPathReplies = Field(default_factory=FastPathReplies)
+    action_replies: ActionReplies = Field(default_factory=ActionReplies)
 
 
 # overall game configuration
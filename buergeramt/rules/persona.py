@@ -1,6 +1,8 @@
 from typing import List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from buergeramt.rules.models import HistoryPolicy, ModelConfig, RetryPolicy
 
 
 class Persona(BaseModel):
@@ -15,3 +17,6 @@ class Persona(BaseModel):
     behavioral_rules: List[str]
     handled_documents: List[str]
     required_evidence: List[str]
+    history: HistoryPolicy = Field(default_factory=HistoryPolicy)
+    retry: RetryPolicy = Field(default_factory=RetryPolicy)
+    model: ModelConfig = Field(default_factory=ModelConfig)
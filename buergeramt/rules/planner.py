@@ -0,0 +1,101 @@
+"""
+Next-step planner, computed locally from the requirement graph.
+
+"Was muss ich als nächstes tun?" does not need a model turn: the graph knows what the
+final document needs, and the GameState's tracker knows what is still missing. plan()
+picks the next document (one that can be issued right now, preferably in the current
+department), the evidence it still lacks, where to get it and which documents are ready.
+The /hinweis command shows the plan to the player; brief() is a compact version for a
+bureaucrat's volatile context, so the model does not have to reason about dependencies.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class Plan:
+    goal: Optional[str]  # the final document; None means every document
+    next_document: Optional[str] = None  # None when the goal is collected
+    department: Optional[str] = None  # where next_document is issued
+    bureaucrat: Optional[str] = None  # who works there
+    missing_evidence: List[str] = field(default_factory=list)  # what next_document still lacks
+    ready: List[str] = field(default_factory=list)  # open documents that can be issued right now
+    remaining_documents: int = 0  # documents still to collect for the goal, next_document included
+    remaining_evidence: List[str] = field(default_factory=list)  # all evidence still needed for the goal
+
+    @property
+    def done(self) -> bool:
+        return self.next_document is None
+
+    def describe(self, game_state) -> List[str]:
+        """the plan for the player, in the words of the game"""
+        if self.done:
+            return ["Sie haben alles beisammen. Gehen Sie zum Schalter und holen Sie sich Ihren Bescheid ab."]
+        config = game_state.config
+        goal = self.goal or "alle Dokumente"
+        lines = [
+            f"Ziel: {goal} (noch {self.remaining_documents} Dokument(e) und "
+            f"{len(self.remaining_evidence)} Nachweis(e))."
+        ]
+        lines.append(f"Als Nächstes: {self.next_document} bei {self.bureaucrat} ({self.department}).")
+        if self.missing_evidence:
+            needed = [f"{ev} ({' oder '.join(config.evidence[ev].acceptable_forms)})" for ev in self.missing_evidence]
+            lines.append("Dafür fehlen noch: " + ", ".join(needed) + ".")
+        else:
+            lines.append("Alle Nachweise dafür liegen vor, Sie können es sich ausstellen lassen.")
+        if self.department != game_state.current_department:
+            lines.append(f"Gehen Sie dazu zu {self.bureaucrat} (/gehe_zu {self.bureaucrat}).")
+        others = [doc for doc in self.ready if doc != self.next_document]
+        if others:
+            lines.append("Ebenfalls ausstellbar: " + ", ".join(others) + ".")
+        return lines
+
+    def brief(self) -> str:
+        """one line for a bureaucrat's volatile context"""
+        if self.done:
+            return "Der Bürger hat alle nötigen Dokumente."
+        missing = ", ".join(self.missing_evidence) or "keine"
+        ready = ", ".join(self.ready) or "keine"
+        return (
+            f"Nächster Schritt des Bürgers: {self.next_document} (Abteilung {self.department}), "
+            f"fehlende Nachweise: {missing}. Jetzt ausstellbar: {ready}. "
+            f"Noch offen bis {self.goal or 'zum Ende'}: {self.remaining_documents} Dokument(e)."
+        )
+
+
+def plan(game_state) -> Plan:
+    """the minimal remaining plan towards the final document, from the current state"""
+    config = game_state.config
+    graph = config.graph
+    goal = config.final_document
+    needed = graph.prerequisites(goal) if goal else list(graph.order)
+    # in topological order, the first open document has all its prerequisite documents
+    open_documents = [doc for doc in needed if doc not in game_state.collected_documents]
+    remaining_evidence = [
+        ev for ev in (graph.evidence_needed(goal) if goal else graph.evidence_documents)
+        if ev not in game_state.evidence_provided
+    ]
+    result = Plan(goal=goal, remaining_documents=len(open_documents), remaining_evidence=remaining_evidence)
+    if not open_documents:
+        return result
+    ready = set(game_state.get_ready_documents())
+    result.ready = [doc for doc in open_documents if doc in ready]
+    here = [doc for doc in result.ready if config.documents[doc].department == game_state.current_department]
+    result.next_document = (here or result.ready or open_documents)[0]
+    result.department = config.documents[result.next_document].department
+    result.bureaucrat = next(
+        (persona.name for persona in config.personas.values() if persona.department == result.department),
+        result.department,
+    )
+    result.missing_evidence = [
+        req
+        for req in graph.requires[result.next_document]
+        if req in config.evidence and req not in game_state.evidence_provided
+    ]
+    return result
+
+
+def planner_hint(game_state) -> str:
+    """volatile context for a bureaucrat (Bureaucrat.volatile_context)"""
+    return plan(game_state).brief()
@@ -0,0 +1,84 @@
+"""
+Derived game state, kept up to date instead of recomputed.
+
+The ProgressTracker of a GameState counts, per document, the requirements that are still
+missing and keeps the set of documents that could be issued right now, the progress
+points and whether the final document (config.final_document) has been collected. Each
+add_document/add_evidence updates only the documents that depend on the new item, so
+the questions asked on every turn (progress, win condition, what is ready) cost O(1).
+"""
+
+from typing import Dict, Iterable, Set
+
+from buergeramt.rules.game_config import GameConfig
+
+
+class ProgressTracker:
+    def __init__(self, config: GameConfig, collected: Iterable[str] = (), evidence: Iterable[str] = ()):
+        self.config = config
+        self.weights = config.progress_weights
+        # requirement -> documents that need it (shared, read-only)
+        self._dependents = config.graph.dependents
+        # document -> requirements still missing
+        self._missing: Dict[str, Set[str]] = {doc_id: set(reqs) for doc_id, reqs in config.graph.requires.items()}
+        self.collected: Set[str] = set()
+        self.evidence: Set[str] = set()
+        # documents that are not collected yet and have all their requirements
+        self.ready: Set[str] = {doc_id for doc_id, missing in self._missing.items() if not missing}
+        self.points = 0
+        for name in evidence:
+            self.evidence_added(name)
+        for name in collected:
+            self.document_added(name)
+
+    def evidence_added(self, name: str) -> bool:
+        """record newly provided evidence; False if it was known already (e.g. another form)"""
+        if name in self.evidence or name not in self.config.evidence:
+            return False
+        self.evidence.add(name)
+        self.points += self.weights.points(name, is_document=False)
+        self._satisfy(name)
+        return True
+
+    def document_added(self, name: str) -> bool:
+        """record a newly collected document; False if it was collected already"""
+        if name in self.collected or name not in self.config.documents:
+            return False
+        self.collected.add(name)
+        self.ready.discard(name)
+        self.points += self.weights.points(name, is_document=True)
+        self._satisfy(name)
+        return True
+
+    def _satisfy(self, requirement: str):
+        for doc_id in self._dependents.get(requirement, ()):
+            missing = self._missing[doc_id]
+            missing.discard(requirement)
+            if not missing and doc_id not in self.collected:
+                self.ready.add(doc_id)
+
+    def missing(self, doc_id: str) -> Set[str]:
+        """requirements of the document that are not met yet (do not modify)"""
+        return self._missing[doc_id]
+
+    def remaining(self, doc_id: str) -> int:
+        return len(self._missing[doc_id])
+
+    def open_documents(self) -> Iterable[str]:
+        """documents not collected yet, in config order"""
+        return (doc_id for doc_id in self._missing if doc_id not in self.collected)
+
+    @property
+    def progress(self) -> int:
+        return min(100, self.points)
+
+    @property
+    def complete(self) -> bool:
+        """every configured document is collected"""
+        return len(self.collected) == len(self.config.documents)
+
+    @property
+    def final_collected(self) -> bool:
+        """the final document is collected; without one configured, every document"""
+        final = self.config.final_document
+        return final in self.collected if final else self.complete
@@ -0,0 +1,252 @@
+"""
+Game server: many players in one long-lived process.
+
+Two local interfaces on top of the SessionManager:
+
+- tcp (default): one session per connection; every line sent is an input, the game's output
+  comes back as plain text followed by the "> " prompt, like in the terminal. Works with nc.
+- http: a small JSON API where sessions outlive connections:
+  POST /sessions opens a session, POST /sessions/<id> with {"input": "..."} plays a turn or
+  slash command, DELETE /sessions/<id> closes it. Replies carry the session id, the output
+  lines, the state change events and game_over. With a snapshot database, idle sessions
+  are swapped out and resumed on their next request, also after a restart of the server.
+
+    python -m buergeramt.server --model offline --http
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from functools import partial
+from http import HTTPStatus
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from buergeramt.buergeramt_adventure import setup_api_key, setup_commands
+from buergeramt.characters.http_client import close_http_client
+from buergeramt.characters.model_backend import configured_models, requires_api_key
+from buergeramt.engine.sessions import SessionLimitError, SessionManager, headless_engine
+from buergeramt.engine.snapshots import SqliteSnapshotStore
+from buergeramt.rules.loader import get_config
+from buergeramt.rules.models import ServerConfig
+from buergeramt.utils.game_logger import get_logger
+
+PROMPT = "\n> "
+MAX_BODY = 64 * 1024
+
+
+async def handle_tcp(manager: SessionManager, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """one game per connection, line in, text out"""
+    try:
+        reply = await manager.create()
+    except SessionLimitError:
+        await _write_text(writer, "Alle Schalter sind besetzt. Bitte kommen Sie später wieder.", prompt=False)
+        writer.close()
+        return
+    session_id = reply.session_id
+    if session_id in manager:
+        # an idle player's connection is dropped together with the session
+        manager.get(session_id).on_evict.append(lambda session: _hang_up(writer))
+    try:
+        await _write_text(writer, reply.text(), prompt=not reply.game_over)
+        while not reply.game_over:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                reply = await manager.handle(session_id, line.decode("utf-8", errors="replace"))
+            except (KeyError, SessionLimitError):
+                break
+            await _write_text(writer, reply.text(), prompt=not reply.game_over)
+    except ConnectionError:
+        pass
+    finally:
+        manager.close(session_id)
+        writer.close()
+
+
+async def _write_text(writer: asyncio.StreamWriter, text: str, prompt: bool = True):
+    writer.write(f"{text}\n{PROMPT if prompt else ''}".encode("utf-8"))
+    await writer.drain()
+
+
+def _hang_up(writer: asyncio.StreamWriter):
+    if not writer.is_closing():
+        writer.write("\nIhre Sitzung wurde wegen Inaktivität beendet.\n".encode("utf-8"))
+        writer.close()
+
+
+async def handle_http(manager: SessionManager, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """HTTP/1.1 JSON API with keep-alive"""
+    try:
+        while True:
+            request = await _read_request(reader)
+            if request is None:
+                break
+            method, path, body, keep_alive = request
+            status, payload = await _route(manager, method, path, body)
+            _write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except ValueError:
+        _write_response(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request"}, keep_alive=False)
+    finally:
+        writer.close()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes, bool]]:
+    """(method, path, body, keep_alive) of the next request, None when the client is done"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, version = request_line.decode("latin-1").split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method, path, body, keep_alive
+
+
+async def _route(manager: SessionManager, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Optional[dict]]:
+    parts = [part for part in path.split("?")[0].split("/") if part]
+    if parts[:1] != ["sessions"] or len(parts) > 2:
+        return HTTPStatus.NOT_FOUND, {"error": "Not found"}
+    if len(parts) == 1:
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST to open a session"}
+        try:
+            reply = await manager.create()
+        except SessionLimitError as e:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}
+        # a session that could not start is not kept; its output says why
+        status = HTTPStatus.CREATED if reply.session_id in manager else HTTPStatus.INTERNAL_SERVER_ERROR
+        return status, reply.as_dict()
+    session_id = parts[1]
+    if method == "DELETE":
+        return (HTTPStatus.NO_CONTENT, None) if manager.close(session_id) else _unknown(session_id)
+    if method != "POST":
+        return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST to play or DELETE to close"}
+    try:
+        text = json.loads(body or b"{}").get("input")
+    except (json.JSONDecodeError, AttributeError):
+        text = None
+    if not isinstance(text, str):
+        return HTTPStatus.BAD_REQUEST, {"error": 'Expected a JSON object like {"input": "..."}'}
+    try:
+        reply = await manager.handle(session_id, text)
+    except KeyError:
+        return _unknown(session_id)
+    except SessionLimitError as e:
+        # the session is swapped out and there is no room to resume it right now
+        return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}
+    return HTTPStatus.OK, reply.as_dict()
+
+
+def _unknown(session_id: str) -> Tuple[HTTPStatus, dict]:
+    return HTTPStatus.NOT_FOUND, {"error": f"Unknown or expired session '{session_id}'"}
+
+
+def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Optional[dict], keep_alive: bool):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+    headers = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if payload is not None:
+        headers.append("Content-Type: application/json; charset=utf-8")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+
+
+async def start_server(manager: SessionManager, host: str, port: int, http: bool = False) -> asyncio.AbstractServer:
+    """listen for players; the caller serves (and closes) the returned server"""
+    handler = handle_http if http else handle_tcp
+    return await asyncio.start_server(partial(handler, manager), host, port)
+
+
+async def serve(manager: SessionManager, host: str, port: int, http: bool = False):
+    server = await start_server(manager, host, port, http)
+    eviction = asyncio.get_running_loop().create_task(manager.run_eviction())
+    address = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    protocol = "HTTP" if http else "TCP"
+    print(f"Finanzamt geöffnet ({protocol}) auf {address}, höchstens {manager.settings.max_sessions} Sitzungen")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        eviction.cancel()
+        manager.close_all()
+        if manager.store is not None:
+            manager.store.close()
+        await close_http_client()
+
+
+def main():
+    load_dotenv()
+    settings = get_config().server
+
+    parser = argparse.ArgumentParser(description="Bürgeramt Adventure als Server für viele Spieler")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--http", action="store_true", help="JSON über HTTP statt Textzeilen über TCP")
+    parser.add_argument("--model", help="Sprachmodell aller Beamten, z.B. 'offline'")
+    parser.add_argument("--max-sessions", type=int, default=settings.max_sessions)
+    parser.add_argument(
+        "--idle-timeout", type=float, default=settings.idle_timeout, help="Sekunden ohne Eingabe bis zum Ende"
+    )
+    parser.add_argument(
+        "--snapshot-db",
+        default=settings.snapshot_db,
+        metavar="DATEI",
+        help="SQLite-Datei, in die inaktive Sitzungen ausgelagert werden, statt sie zu beenden",
+    )
+    parser.add_argument("--fast-path", action="store_true", help="Eindeutige Nachweise lokal annehmen")
+    parser.add_argument("--single-shot", action="store_true", help="Eine Modellanfrage pro Zug")
+    parser.add_argument("--planner-hints", action="store_true", help="Den Beamten den nächsten Schritt mitgeben")
+    args = parser.parse_args()
+    models = [args.model] if args.model else configured_models(get_config())
+    if any(map(requires_api_key, models)) and not os.environ.get("OPENAI_API_KEY") and not setup_api_key():
+        return
+    settings = ServerConfig(
+        **{
+            **settings.model_dump(),
+            "max_sessions": args.max_sessions,
+            "idle_timeout": args.idle_timeout,
+            "snapshot_db": args.snapshot_db,
+        }
+    )
+    manager = SessionManager(
+        settings,
+        engine_factory=partial(
+            headless_engine,
+            model=args.model,
+            fast_path=args.fast_path,
+            single_shot=args.single_shot,
+            planner_hints=args.planner_hints,
+        ),
+        commands_factory=setup_commands,
+        store=SqliteSnapshotStore(settings.snapshot_db) if settings.snapshot_db else None,
+    )
+    get_logger().logger.info(f"Server starting with at most {settings.max_sessions} sessions")
+    try:
+        asyncio.run(serve(manager, args.host, args.port, http=args.http))
+    except KeyboardInterrupt:
+        print("\nServer beendet.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Throughput benchmark: bots play thousands of games against the offline model.
+
+Games are split into batches and played in a process pool (one engine per game, so the
+workers share nothing). The report covers win rate, turns to win, wall time per turn
+and game, and the state changes per game, the numbers to compare before and after an
+engine change.
+
+    python -m buergeramt.simulator --strategy optimal --games 2000 --workers 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from buergeramt.engine.bot import STRATEGIES, GameResult, play
+from buergeramt.utils.game_logger import get_logger
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _quantile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+@dataclass
+class SimulationReport:
+    strategy: str
+    games: int = 0
+    wins: int = 0
+    turns_to_win: List[int] = field(default_factory=list)
+    turn_times: List[float] = field(default_factory=list)
+    game_times: List[float] = field(default_factory=list)
+    transitions: Dict[str, int] = field(default_factory=dict)
+    wall_time: float = 0.0  # whole simulation, pool start included
+    workers: int = 1
+
+    def add(self, result: GameResult):
+        self.games += 1
+        if result.won:
+            self.wins += 1
+            self.turns_to_win.append(result.turns)
+        self.turn_times.extend(result.turn_times)
+        self.game_times.append(result.wall_time)
+        for kind, count in result.transitions.items():
+            self.transitions[kind] = self.transitions.get(kind, 0) + count
+
+    def as_dict(self) -> Dict[str, Any]:
+        def summary(values, scale=1.0):
+            return {
+                "mean": None if not values else _mean(values) * scale,
+                **{f"p{int(q * 100)}": None if not values else _quantile(values, q) * scale for q in QUANTILES},
+                "max": max(values) * scale if values else None,
+            }
+
+        return {
+            "strategy": self.strategy,
+            "games": self.games,
+            "wins": self.wins,
+            "win_rate": self.wins / self.games if self.games else 0.0,
+            "workers": self.workers,
+            "wall_time": self.wall_time,
+            "games_per_second": self.games / self.wall_time if self.wall_time else None,
+            "turns_per_second": len(self.turn_times) / self.wall_time if self.wall_time else None,
+            "turns_to_win": summary(self.turns_to_win),
+            "turn_time_ms": summary(self.turn_times, 1000),
+            "game_time_ms": summary(self.game_times, 1000),
+            "transitions_per_game": {
+                kind: count / self.games for kind, count in sorted(self.transitions.items()) if self.games
+            },
+        }
+
+    def format_report(self) -> str:
+        data = self.as_dict()
+
+        def row(label, stats, unit=""):
+            if stats["mean"] is None:
+                return f"{label:<18} -"
+            cells = [f"Ø {stats['mean']:.2f}{unit}"]
+            cells += [f"p{int(q * 100)} {stats[f'p{int(q * 100)}']:.2f}{unit}" for q in QUANTILES]
+            cells.append(f"max {stats['max']:.2f}{unit}")
+            return f"{label:<18} " + "  ".join(cells)
+
+        lines = [
+            f"Strategie {self.strategy}: {self.games} Spiele mit {self.workers} Prozess(en) "
+            f"in {self.wall_time:.2f}s",
+            f"{'Gewonnen':<18} {self.wins} ({data['win_rate']:.0%})",
+        ]
+        if data["games_per_second"] is not None:
+            lines.append(
+                f"{'Durchsatz':<18} {data['games_per_second']:.1f} Spiele/s, {data['turns_per_second']:.1f} Züge/s"
+            )
+        lines.append(row("Züge bis Sieg", data["turns_to_win"]))
+        lines.append(row("Zeit pro Zug", data["turn_time_ms"], "ms"))
+        lines.append(row("Zeit pro Spiel", data["game_time_ms"], "ms"))
+        transitions = data["transitions_per_game"]
+        if transitions:
+            lines.append(
+                f"{'Änderungen/Spiel':<18} " + "  ".join(f"{kind} {count:.2f}" for kind, count in transitions.items())
+            )
+        return "\n".join(lines)
+
+
+def _init_worker(log_level: int):
+    # the game log of thousands of games would measure the disk, not the engine
+    get_logger().logger.setLevel(log_level)
+
+
+def _play_batch(strategy: str, seeds: List[int], max_turns: int, options: Dict[str, Any]) -> List[GameResult]:
+    return [play(strategy, seed, max_turns, **options) for seed in seeds]
+
+
+def simulate(
+    strategy: str,
+    games: int,
+    workers: int = 1,
+    seed: int = 0,
+    max_turns: int = 200,
+    batch_size: int = 25,
+    log_level: int = logging.WARNING,
+    **options,
+) -> SimulationReport:
+    """play games with seeds seed .. seed + games - 1; workers > 1 plays them in a process pool
+
+    options are passed on to GameEngine (model defaults to 'offline')
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of: {', '.join(STRATEGIES)}")
+    seeds = list(range(seed, seed + games))
+    batches = [seeds[start : start + batch_size] for start in range(0, len(seeds), batch_size)]
+    report = SimulationReport(strategy=strategy, workers=workers)
+    started = time.perf_counter()
+    if workers <= 1:
+        previous = get_logger().logger.level
+        _init_worker(log_level)
+        try:
+            results = [_play_batch(strategy, batch, max_turns, options) for batch in batches]
+        finally:
+            get_logger().logger.setLevel(previous)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_level,)) as pool:
+            futures = [pool.submit(_play_batch, strategy, batch, max_turns, options) for batch in batches]
+            results = [future.result() for future in futures]
+    for batch in results:
+        for result in batch:
+            report.add(result)
+    report.wall_time = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bots spielen das Bürgeramt Adventure, zum Messen der Engine")
+    parser.add_argument("--strategy", choices=list(STRATEGIES), default="optimal")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Prozesse im Pool")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert der Zufallszahlen des ersten Spiels")
+    parser.add_argument("--max-turns", type=int, default=200, help="Züge, nach denen ein Spiel aufgegeben wird")
+    parser.add_argument("--batch-size", type=int, default=25, help="Spiele pro Auftrag an einen Prozess")
+    parser.add_argument("--model", default="offline", help="Sprachmodell aller Beamten (Standard: offline)")
+    parser.add_argument("--fast-path", action="store_true", help="Eindeutige Nachweise lokal annehmen")
+    parser.add_argument("--single-shot", action="store_true", help="Eine Modellanfrage pro Zug")
+    parser.add_argument("--planner-hints", action="store_true", help="Den Beamten den nächsten Schritt mitgeben")
+    parser.add_argument("--json", action="store_true", help="Bericht als JSON ausgeben")
+    args = parser.parse_args()
+    report = simulate(
+        args.strategy,
+        args.games,
+        workers=args.workers,
+        seed=args.seed,
+        max_turns=args.max_turns,
+        batch_size=args.batch_size,
+        model=args.model,
+        fast_path=args.fast_path,
+        single_shot=args.single_shot,
+        planner_hints=args.planner_hints,
+    )
+    if args.json:
+        json.dump(report.as_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        print(report.format_report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Helpers for driving coroutines from the synchronous game loop.
+"""
+
+import asyncio
+from typing import Awaitable, TypeVar
+
+T = TypeVar("T")
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop of the current thread, creating one if needed.
+
+    The loop is kept alive between calls (like pydantic_ai's run_sync does), so async
+    HTTP clients bound to it can be reused across turns.
+    """
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        loop = None
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine to completion from synchronous code"""
+    return get_event_loop().run_until_complete(coro)
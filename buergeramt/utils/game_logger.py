@@ -4,10 +4,24 @@ Game Logger module for capturing detailed game interactions, AI prompts, and sta
 
 import json
 import logging
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Optional, Union
 
+# id of the game session whose code is running; set by the session manager, so the lines of
+# many sessions in one process (python -m buergeramt.server) can be told apart
+current_session: ContextVar[Optional[str]] = ContextVar("current_session", default=None)
+
+
+class SessionFilter(logging.Filter):
+    """adds the session tag (empty outside of a session) to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        session = current_session.get()
+        record.session = f"[{session}] " if session else ""
+        return True
+
 
 class GameLogger:
     """
@@ -33,8 +47,9 @@ class GameLogger:
         file_handler.setLevel(logging.DEBUG)
 
         # Create formatter
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(session)s%(message)s")
         file_handler.setFormatter(formatter)
+        file_handler.addFilter(SessionFilter())
 
         # Add handlers to logger
         self.logger.addHandler(file_handler)
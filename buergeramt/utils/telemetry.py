@@ -0,0 +1,263 @@
+"""
+Per-call telemetry for bureaucrat model calls.
+
+Every call to a bureaucrat (introduction, reply, history summary) records its wall time,
+time to first token when streaming, token usage, model round trips and tool calls.
+Records are aggregated per persona and per session, shown by /statistik and exported
+in the Prometheus text format.
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Union
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+@dataclass
+class CallRecord:
+    """one call to a bureaucrat"""
+
+    persona: str
+    kind: str  # introduce, respond or summary
+    wall_time: float = 0.0
+    time_to_first_token: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    requests: int = 0  # model round trips
+    tool_calls: int = 0
+    cached: bool = False
+    failed: bool = False
+    retries: int = 0
+    hedged: bool = False
+    simple: bool = False  # answered by the cheap tier
+
+
+@dataclass
+class CallStats:
+    """aggregate of many CallRecords; keeps the latest samples for quantiles"""
+
+    max_samples: int = 1000
+    calls: int = 0
+    failures: int = 0
+    cached: int = 0
+    wall_time: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    requests: int = 0
+    tool_calls: int = 0
+    retries: int = 0
+    hedged: int = 0
+    simple: int = 0
+    first_tokens: int = 0  # streamed calls
+    first_token_time: float = 0.0
+    kinds: Dict[str, int] = field(default_factory=dict)
+    wall_times: Deque[float] = field(default_factory=deque)
+    first_token_times: Deque[float] = field(default_factory=deque)
+
+    def add(self, record: CallRecord):
+        self.calls += 1
+        self.failures += record.failed
+        self.cached += record.cached
+        self.wall_time += record.wall_time
+        self.input_tokens += record.input_tokens
+        self.output_tokens += record.output_tokens
+        self.requests += record.requests
+        self.tool_calls += record.tool_calls
+        self.retries += record.retries
+        self.hedged += record.hedged
+        self.simple += record.simple
+        self.kinds[record.kind] = self.kinds.get(record.kind, 0) + 1
+        self._sample(self.wall_times, record.wall_time)
+        if record.time_to_first_token is not None:
+            self.first_tokens += 1
+            self.first_token_time += record.time_to_first_token
+            self._sample(self.first_token_times, record.time_to_first_token)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """wall time quantile over the latest samples"""
+        return _quantile(self.wall_times, q)
+
+    def _sample(self, samples: Deque[float], value: float):
+        samples.append(value)
+        if len(samples) > self.max_samples:
+            samples.popleft()
+
+
+class CallTimer:
+    """measures one call; use as a context manager, failures are recorded too"""
+
+    def __init__(self, telemetry: Optional["Telemetry"], persona: str, kind: str):
+        self.telemetry = telemetry
+        self.record = CallRecord(persona=persona, kind=kind)
+        self._start = time.perf_counter()
+
+    def __enter__(self) -> "CallTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record.wall_time = time.perf_counter() - self._start
+        self.record.failed = exc_type is not None
+        if self.telemetry is not None:
+            self.telemetry.add(self.record)
+        return False
+
+    def first_token(self):
+        if self.record.time_to_first_token is None:
+            self.record.time_to_first_token = time.perf_counter() - self._start
+
+    def watch(self, on_text: Optional[Callable[[str], None]]) -> Optional[Callable[[str], None]]:
+        """wrap a streaming callback so the first chunk marks the time to first token"""
+        if on_text is None:
+            return None
+
+        def timed(chunk: str):
+            self.first_token()
+            on_text(chunk)
+
+        return timed
+
+    def add_run(self, result):
+        """add the usage of a pydantic_ai run result"""
+        usage = getattr(result, "usage", None)
+        if usage is None:
+            return
+        self.record.input_tokens += usage.input_tokens or 0
+        self.record.output_tokens += usage.output_tokens or 0
+        self.record.requests += usage.requests or 0
+        self.record.tool_calls += usage.tool_calls or 0
+
+
+class Telemetry:
+    """call records of one game session, aggregated per persona"""
+
+    def __init__(self, session_id: Optional[str] = None, export_path: Optional[Union[str, Path]] = None):
+        self.session_id = session_id or uuid.uuid4().hex[:8]
+        self.export_path = Path(export_path) if export_path else None
+        self.session = CallStats()
+        self.personas: Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+
+    def call(self, persona: str, kind: str) -> CallTimer:
+        return CallTimer(self, persona, kind)
+
+    def add(self, record: CallRecord):
+        with self._lock:
+            self.session.add(record)
+            self.personas.setdefault(record.persona, CallStats()).add(record)
+
+    def format_report(self) -> str:
+        """human readable table for /statistik"""
+        with self._lock:
+            rows = [("Gesamt", self.session)] + sorted(self.personas.items())
+            if not self.session.calls:
+                return "Noch keine Anfragen an die Beamten."
+            lines = [
+                f"{'Beamter':<16} {'Aufrufe':>7} {'Cache':>5} {'Fehler':>6} {'Ø Zeit':>7} {'p95':>7} "
+                f"{'Ø TTFT':>7} {'Tokens ein/aus':>15} {'Runden':>6} {'Tools':>5} {'Wdh.':>4}"
+            ]
+            for name, stats in rows:
+                ttft = stats.first_token_time / stats.first_tokens if stats.first_tokens else None
+                tokens = f"{stats.input_tokens}/{stats.output_tokens}"
+                lines.append(
+                    f"{name:<16} {stats.calls:>7} {stats.cached:>5} {stats.failures:>6} "
+                    f"{_seconds(stats.wall_time / stats.calls):>7} {_seconds(stats.quantile(0.95)):>7} "
+                    f"{_seconds(ttft):>7} {tokens:>15} {stats.requests:>6} {stats.tool_calls:>5} {stats.retries:>4}"
+                )
+        return "\n".join(lines)
+
+    def prometheus_text(self) -> str:
+        """all metrics in the Prometheus text exposition format"""
+        metrics: Dict[str, tuple] = {
+            "buergeramt_model_calls_total": ("counter", "Calls to bureaucrats", []),
+            "buergeramt_model_call_failures_total": ("counter", "Failed calls to bureaucrats", []),
+            "buergeramt_model_cached_calls_total": ("counter", "Calls answered from the response cache", []),
+            "buergeramt_model_call_seconds": ("summary", "Wall time per call", []),
+            "buergeramt_model_time_to_first_token_seconds": ("summary", "Time to first streamed token", []),
+            "buergeramt_model_input_tokens_total": ("counter", "Input tokens", []),
+            "buergeramt_model_output_tokens_total": ("counter", "Output tokens", []),
+            "buergeramt_model_requests_total": ("counter", "Model round trips", []),
+            "buergeramt_model_tool_calls_total": ("counter", "Tool calls", []),
+            "buergeramt_model_retries_total": ("counter", "Retried attempts", []),
+            "buergeramt_model_hedged_calls_total": ("counter", "Calls that sent a hedged request", []),
+            "buergeramt_model_simple_calls_total": ("counter", "Simple turns sent to the cheap tier", []),
+        }
+        with self._lock:
+            for persona, stats in sorted(self.personas.items()):
+                labels = f'session="{_escape(self.session_id)}",persona="{_escape(persona)}"'
+                for kind, count in sorted(stats.kinds.items()):
+                    metrics["buergeramt_model_calls_total"][2].append(f'{{{labels},kind="{kind}"}} {count}')
+                metrics["buergeramt_model_call_failures_total"][2].append(f"{{{labels}}} {stats.failures}")
+                metrics["buergeramt_model_cached_calls_total"][2].append(f"{{{labels}}} {stats.cached}")
+                metrics["buergeramt_model_input_tokens_total"][2].append(f"{{{labels}}} {stats.input_tokens}")
+                metrics["buergeramt_model_output_tokens_total"][2].append(f"{{{labels}}} {stats.output_tokens}")
+                metrics["buergeramt_model_requests_total"][2].append(f"{{{labels}}} {stats.requests}")
+                metrics["buergeramt_model_tool_calls_total"][2].append(f"{{{labels}}} {stats.tool_calls}")
+                metrics["buergeramt_model_retries_total"][2].append(f"{{{labels}}} {stats.retries}")
+                metrics["buergeramt_model_hedged_calls_total"][2].append(f"{{{labels}}} {stats.hedged}")
+                metrics["buergeramt_model_simple_calls_total"][2].append(f"{{{labels}}} {stats.simple}")
+                _summary(
+                    metrics["buergeramt_model_call_seconds"][2],
+                    labels,
+                    stats.wall_times,
+                    stats.wall_time,
+                    stats.calls,
+                )
+                _summary(
+                    metrics["buergeramt_model_time_to_first_token_seconds"][2],
+                    labels,
+                    stats.first_token_times,
+                    stats.first_token_time,
+                    stats.first_tokens,
+                )
+        return _render(metrics)
+
+    def export(self, path: Optional[Union[str, Path]] = None) -> Optional[Path]:
+        """write the Prometheus text to path (or export_path), atomically"""
+        path = Path(path) if path else self.export_path
+        if path is None:
+            return None
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.prometheus_text(), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+
+def _summary(samples: List[str], labels: str, values: Deque[float], total: float, count: int):
+    for q in QUANTILES:
+        value = _quantile(values, q)
+        if value is not None:
+            samples.append(f'{{{labels},quantile="{q}"}} {value:.6f}')
+    samples.append(f"_sum{{{labels}}} {total:.6f}")
+    samples.append(f"_count{{{labels}}} {count}")
+
+
+def _render(metrics: Dict[str, tuple]) -> str:
+    lines: List[str] = []
+    for name, (kind, help_text, samples) in metrics.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample in samples:
+            # summaries add _sum/_count samples, which carry their suffix in front of the labels
+            lines.append(f"{name}{sample}")
+    return "\n".join(lines) + "\n"
+
+
+def _quantile(values, q: float) -> Optional[float]:
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}s"
@@ -0,0 +1,38 @@
+from buergeramt.characters.agent_response import ActionResponse
+from buergeramt.rules.actions import AddDocumentAction, SwitchDepartmentAction, apply_actions
+from buergeramt.rules.game_state import GameState
+
+
+def _actions(*actions):
+    return ActionResponse.model_validate({"response_text": "", "actions": list(actions)}).actions
+
+
+def test_actions_are_validated_and_applied():
+    gs = GameState(current_department="Erstbearbeitung")
+    actions = _actions(
+        {"type": "switch_department", "department": "Fachprüfung"},
+        {"type": "add_evidence", "evidence_name": "valid_id", "evidence_form": "Personalausweis"},
+        {"type": "add_evidence", "evidence_name": "valid_id", "evidence_form": "Bibliotheksausweis"},
+        {"type": "frustration", "delta": 2},
+        {"type": "add_document", "document_name": "Schenkungsanmeldung"},
+        {"type": "add_document", "document_name": "Geburtstagsfreigabe"},
+    )
+    outcome = apply_actions(actions, gs)
+    assert gs.evidence_provided == {"valid_id": "Personalausweis"}
+    assert gs.frustration_level == 2
+    # the switch comes after the documents, which the old department had to issue
+    assert gs.current_department == "Fachprüfung"
+    assert isinstance(outcome.applied[-1], SwitchDepartmentAction)
+    rejected = [a for a in outcome.rejected if isinstance(a, AddDocumentAction)]
+    assert [a.document_name for a in rejected] == ["Schenkungsanmeldung", "Geburtstagsfreigabe"]
+    assert len(outcome.notes) == 3
+    assert "Bibliotheksausweis" in outcome.notes[0]
+    assert "Sie müssen zuerst" in outcome.notes[1]
+    assert "Abschlussstelle" in outcome.notes[2]
+
+
+def test_unknown_department_is_rejected_without_note():
+    gs = GameState(current_department="Erstbearbeitung")
+    outcome = apply_actions(_actions({"type": "switch_department", "department": "Kantine"}), gs)
+    assert gs.current_department == "Erstbearbeitung"
+    assert outcome.rejected and not outcome.notes
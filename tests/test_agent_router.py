@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from buergeramt.characters.history import ConversationHistory
+
+from buergeramt.engine import agent_router
+from buergeramt.engine.agent_router import AgentRouter, LazyBureaucrats
+from buergeramt.rules.game_state import GameState
+from buergeramt.utils.async_utils import run_sync
+
+
+class FakeBureaucrat:
+    def __init__(self, persona_id, persona):
+        self.persona_id = persona_id
+        self.name = persona.name
+        self.department = persona.department
+        self.response_cache = None
+
+        self.history = ConversationHistory()
+        self.introductions = 0
+
+    async def introduce_async(self, game_state):
+        self.introductions += 1
+        return f"Guten Tag, {self.name}."
+
+    async def generate_introduction_async(self, game_state):
+        return f"Vorbereitet: {self.name}.", ["intro message"]
+
+
+@pytest.fixture
+def built(monkeypatch):
+    built = []
+
+    def fake_build(persona_id, **options):
+        from buergeramt.rules.loader import get_config
+
+        built.append(persona_id)
+        return FakeBureaucrat(persona_id, get_config().personas[persona_id])
+
+    monkeypatch.setattr(agent_router, "build_bureaucrat", fake_build)
+    real_sleep = asyncio.sleep
+
+    async def no_walk(seconds):
+        await real_sleep(0)
+
+    monkeypatch.setattr(agent_router.asyncio, "sleep", no_walk)
+    return built
+
+
+def test_router_only_builds_starting_bureaucrat(built):
+    router = AgentRouter(GameState())
+    assert built == ["HerrSchmidt"]
+    assert router.game_state.current_department == "Erstbearbeitung"
+    assert set(router.get_bureaucrats()) == {"Erstbearbeitung", "Fachprüfung", "Abschlussstelle"}
+    assert "Frau Müller" in router.get_bureaucrat_names()
+    assert built == ["HerrSchmidt"]
+
+
+def test_router_builds_on_transition_and_switch(built):
+    router = AgentRouter(GameState())
+    router.transition_to_department("Fachprüfung")
+    assert built == ["HerrSchmidt", "FrauMueller"]
+    assert router.switch_agent("Herr Weber")
+    assert built == ["HerrSchmidt", "FrauMueller", "HerrWeber"]
+    # built bureaucrats are reused
+    router.transition_to_department("Erstbearbeitung")
+    assert len(built) == 3
+
+
+def test_prebuild_builds_each_persona_once(built):
+    router = AgentRouter(GameState(), response_cache="cache")
+    router.bureaucrats.prebuild(background=False)
+    assert sorted(built) == ["FrauMueller", "HerrSchmidt", "HerrWeber"]
+    assert all(b.response_cache == "cache" for b in router.bureaucrats.built().values())
+
+
+def test_lazy_bureaucrats_unknown_department():
+    lazy = LazyBureaucrats({"A": "a"}, lambda persona_id: persona_id.upper())
+    assert lazy["A"] == "A"
+    with pytest.raises(KeyError):
+        lazy["B"]
+    assert lazy.get("B") is None
+
+
+def test_transition_greets_with_prefetched_introduction(built):
+    router = AgentRouter(GameState())
+    printed = []
+    router.transition_to_department("Abschlussstelle", print_styled=lambda text, style: printed.append(text))
+    assert router.active_bureaucrat.department == "Abschlussstelle"
+    assert any("Guten Tag, Herr Weber." in text for text in printed)
+    assert router.active_bureaucrat.introductions == 1
+
+
+def test_switch_department_tool_starts_introduction(built):
+    router = AgentRouter(GameState())
+    # the tool changes the state first; the introduction starts right away
+    router.game_state.switch_department("Fachprüfung")
+    assert "Fachprüfung" in router._pending_introductions
+    printed = []
+    router.transition_to_department("Fachprüfung", print_styled=lambda text, style: printed.append(text))
+    assert router.active_bureaucrat.department == "Fachprüfung"
+    assert router.active_bureaucrat.introductions == 1
+    assert "Sie sind bereits in dieser Abteilung." not in "".join(printed)
+
+
+def test_unknown_department_keeps_player_in_place(built):
+    router = AgentRouter(GameState())
+    router.game_state.switch_department("Kantine")
+    router.transition_to_department("Kantine", print_styled=lambda text, style: None)
+    assert router.active_bureaucrat.department == "Erstbearbeitung"
+    assert router.game_state.current_department == "Erstbearbeitung"
+
+
+def test_introduction_pool_serves_first_visit(built):
+    from buergeramt.engine.introductions import IntroductionPool
+    from buergeramt.rules.loader import get_config
+
+    pool = IntroductionPool(size=2, factory=lambda pid: FakeBureaucrat(pid, get_config().personas[pid]))
+    run_sync(pool.refill("Fachprüfung"))
+    assert pool.available("Fachprüfung") == 2
+    router = AgentRouter(GameState(), introduction_pool=pool)
+    printed = []
+    router.transition_to_department("Fachprüfung", print_styled=lambda text, style: printed.append(text))
+    assert any("Vorbereitet: Frau Müller." in text for text in printed)
+    assert router.active_bureaucrat.introductions == 0
+    assert router.active_bureaucrat.history.messages == ["intro message"]
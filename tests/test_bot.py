@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from buergeramt.engine.bot import OptimalStrategy, make_strategy, play
+from buergeramt.rules.game_state import GameState
+from buergeramt.rules.loader import get_config
+from buergeramt.simulator import simulate
+
+
+@pytest.fixture(autouse=True)
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+def test_optimal_strategy_wins_in_planned_turns():
+    config = get_config()
+    result = play("optimal")
+    assert result.won
+    needed = config.graph.prerequisites(config.final_document)
+    assert result.transitions["document"] == len(needed)
+    assert result.transitions["evidence"] == len(config.graph.evidence_needed(config.final_document))
+    # per document one turn to ask for it and one for its evidence if it needs any, plus the walks
+    with_evidence = [doc for doc in needed if any(req in config.evidence for req in config.graph.requires[doc])]
+    assert result.turns == len(needed) + len(with_evidence) + result.transitions["department"]
+    assert len(result.turn_times) == result.turns
+    assert "frustration" not in result.transitions
+
+
+def test_optimal_strategy_walks_then_hands_over_evidence():
+    gs = GameState()
+    strategy = OptimalStrategy()
+    assert strategy.next_input(gs, random.Random(0)) == "Ich möchte zu Herr Schmidt."
+    gs.current_department = "Erstbearbeitung"
+    text = strategy.next_input(gs, random.Random(0))
+    assert "Personalausweis" in text and "handgeschriebene Widmung" in text
+
+
+def test_random_strategy_is_reproducible_and_stops():
+    first = play("random", seed=3, max_turns=8)
+    second = play("random", seed=3, max_turns=8)
+    assert first.turns == second.turns <= 8
+    assert first.transitions == second.transitions
+
+
+def test_adversarial_strategy_gets_frustrated_and_still_wins():
+    result = play("adversarial", seed=1)
+    assert result.won
+    assert result.frustration > 0 and result.transitions["frustration"] > 0
+    assert result.turns > play("optimal").turns
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        make_strategy("cheater")
+
+
+def test_simulate_in_process_and_pool():
+    report = simulate("optimal", games=2, workers=1)
+    assert report.games == report.wins == 2
+    config = get_config()
+    needed = config.graph.prerequisites(config.final_document)
+    assert report.as_dict()["transitions_per_game"]["document"] == len(needed)
+    assert "Züge bis Sieg" in report.format_report()
+
+    pooled = simulate("optimal", games=2, workers=2, batch_size=1)
+    assert pooled.wins == 2 and pooled.turns_to_win == report.turns_to_win
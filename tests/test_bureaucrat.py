@@ -8,6 +8,21 @@ from buergeramt.characters.bureaucrat import Bureaucrat
 class DummyGameState:
     def get_formatted_gamestate(self):
         return "dummy game state"
+
+    def snapshot(self):
+        return {}
+
+    def restore(self, snapshot, notify=False):
+        pass
+
+    def hold_events(self):
+        pass
+
+    def release_events(self):
+        pass
+
+    def discard_events(self):
+        pass
     # ...add any other methods needed for tests...
 
 @pytest.fixture
@@ -33,3 +48,241 @@ def test_respond_agentrunresult_missing_messages(dummy_bureaucrat, monkeypatch):
     response = dummy_bureaucrat.respond("ich habe ein geschenk bekommen", game_state)
     assert isinstance(response, str)
     assert response == "ok"
+
+
+def test_respond_async_uses_agent_run(dummy_bureaucrat):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    class DummyAgentRunResult:
+        def __init__(self):
+            self.output = type("Output", (), {"response_text": "async ok"})()
+
+        def all_messages(self):
+            return ["previous"]
+
+    dummy_bureaucrat.agent.run = AsyncMock(return_value=DummyAgentRunResult())
+    response = asyncio.run(dummy_bureaucrat.respond_async("hallo", DummyGameState()))
+    assert response == "async ok"
+    assert dummy_bureaucrat.agent.run.await_args.kwargs["message_history"] is None
+    # the next call continues the conversation
+    asyncio.run(dummy_bureaucrat.respond_async("noch etwas", DummyGameState()))
+    assert dummy_bureaucrat.agent.run.await_args.kwargs["message_history"] == ["previous"]
+
+
+def test_respond_async_wraps_errors(dummy_bureaucrat):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    dummy_bureaucrat.agent.run = AsyncMock(side_effect=ValueError("boom"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(dummy_bureaucrat.respond_async("hallo", DummyGameState()))
+
+
+def test_respond_streams_text_and_applies_tool_calls(monkeypatch):
+    import json
+
+    from pydantic_ai.messages import ToolReturnPart
+    from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+    from buergeramt.rules.game_state import GameState
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    bureaucrat = Bureaucrat("Test", "Beamter", "Erstbearbeitung", system_prompt="Test system prompt")
+    reply = "Na een juten Tag, Ihr Ausweis ist jut."
+
+    async def stream_function(messages, info):
+        if not any(isinstance(part, ToolReturnPart) for part in messages[-1].parts):
+            args = json.dumps({"evidence_name": "valid_id", "evidence_form": "Personalausweis"})
+            yield {0: DeltaToolCall(name="add_evidence", json_args=args)}
+            return
+        args = json.dumps({"response_text": reply})
+        for i in range(0, len(args), 7):
+            yield {1: DeltaToolCall(name=info.output_tools[0].name if i == 0 else None, json_args=args[i : i + 7])}
+
+    game_state = GameState()
+    chunks = []
+    with bureaucrat.agent.override(model=FunctionModel(stream_function=stream_function)):
+        response = bureaucrat.respond("Hier ist mein Personalausweis", game_state, on_text=chunks.append)
+    assert response == reply
+    assert len(chunks) > 1
+    assert "".join(chunks) == reply
+    assert game_state.evidence_provided == {"valid_id": "Personalausweis"}
+    assert bureaucrat.last_message is not None
+
+
+def _frustrating_model(fail_first_attempts, error, delays=()):
+    """FunctionModel whose turns call increase_frustration; the first attempts fail after the tool ran"""
+    import asyncio
+
+    from pydantic_ai.messages import ModelResponse, ToolCallPart, ToolReturnPart
+    from pydantic_ai.models.function import FunctionModel
+
+    calls = {"turns": 0}
+
+    async def function(messages, info):
+        if not any(isinstance(part, ToolReturnPart) for part in messages[-1].parts):
+            turn = calls["turns"]
+            calls["turns"] += 1
+            if turn < len(delays):
+                await asyncio.sleep(delays[turn])
+            return ModelResponse(parts=[ToolCallPart("increase_frustration", {"amount": 1})])
+        if calls["turns"] <= fail_first_attempts:
+            raise error
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response_text": "Nanana."})])
+
+    return FunctionModel(function), calls
+
+
+def test_failed_attempt_is_rolled_back_and_retried(monkeypatch):
+    from pydantic_ai.exceptions import ModelHTTPError
+
+    from buergeramt.rules.game_state import GameState
+    from buergeramt.rules.models import RetryPolicy
+    from buergeramt.utils.telemetry import Telemetry
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    bureaucrat = Bureaucrat(
+        "Test", "Beamter", "Erstbearbeitung", system_prompt="Test", retry_policy=RetryPolicy(backoff=0)
+    )
+    bureaucrat.telemetry = Telemetry()
+    model, calls = _frustrating_model(1, ModelHTTPError(503, "test"))
+    game_state = GameState()
+    with bureaucrat.agent.override(model=model):
+        assert bureaucrat.respond("Das ist doch lächerlich!", game_state) == "Nanana."
+    assert calls["turns"] == 2
+    # the failed attempt's tool call was rolled back
+    assert game_state.frustration_level == 1
+    assert bureaucrat.telemetry.session.retries == 1
+
+
+def test_permanent_failure_restores_state(monkeypatch):
+    from buergeramt.rules.game_state import GameState
+    from buergeramt.rules.models import RetryPolicy
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    bureaucrat = Bureaucrat(
+        "Test", "Beamter", "Erstbearbeitung", system_prompt="Test", retry_policy=RetryPolicy(backoff=0)
+    )
+    model, calls = _frustrating_model(5, ValueError("kaputt"))
+    game_state = GameState()
+    with bureaucrat.agent.override(model=model), pytest.raises(RuntimeError):
+        bureaucrat.respond("Das ist doch lächerlich!", game_state)
+    # not retryable: one attempt, nothing left behind
+    assert calls["turns"] == 1
+    assert game_state.frustration_level == 0
+    assert bureaucrat.history.messages == []
+
+
+def test_slow_request_is_hedged(monkeypatch):
+    from buergeramt.rules.game_state import GameState
+    from buergeramt.rules.models import RetryPolicy
+    from buergeramt.utils.telemetry import Telemetry
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    policy = RetryPolicy(hedge=True, hedge_after=0.05)
+    bureaucrat = Bureaucrat("Test", "Beamter", "Erstbearbeitung", system_prompt="Test", retry_policy=policy)
+    bureaucrat.telemetry = Telemetry()
+    model, calls = _frustrating_model(0, None, delays=(5.0,))
+    game_state = GameState()
+    with bureaucrat.agent.override(model=model):
+        assert bureaucrat.respond("Das ist doch lächerlich!", game_state) == "Nanana."
+    assert calls["turns"] == 2
+    # only the winning request's tool calls reach the game state
+    assert game_state.frustration_level == 1
+    assert bureaucrat.telemetry.session.hedged == 1
+
+
+def test_simple_turns_use_cheap_tier(monkeypatch):
+    from pydantic_ai.messages import ModelResponse, ToolCallPart
+    from pydantic_ai.models.function import FunctionModel
+
+    from buergeramt.rules.game_state import GameState
+    from buergeramt.rules.models import ModelConfig
+    from buergeramt.utils.telemetry import Telemetry
+
+    seen = []
+
+    def replying(tier):
+        def function(messages, info):
+            seen.append((tier, info.model_settings["max_tokens"]))
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response_text": tier})])
+
+        return FunctionModel(function)
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    config = ModelConfig(max_tokens=300, cheap_model="openai:gpt-4.1-nano", cheap_max_tokens=100)
+    bureaucrat = Bureaucrat("Test", "Beamter", "Erstbearbeitung", system_prompt="Test", model_config=config)
+    bureaucrat.telemetry = Telemetry()
+    bureaucrat.agent.model = replying("teuer")
+    bureaucrat._cheap_model = replying("billig")
+    game_state = GameState()
+    assert bureaucrat.respond("Guten Tag, hier ist mein Personalausweis", game_state) == "billig"
+    assert bureaucrat.respond("Was brauche ich für die Schenkungsanmeldung?", game_state) == "teuer"
+    assert seen == [("billig", 100), ("teuer", 300)]
+    assert bureaucrat.telemetry.session.simple == 1
+
+
+def _evidence_model(forms, answer_delays=(), fail_first_attempts=0):
+    """FunctionModel whose n-th turn hands over forms[n] as valid_id, then answers after answer_delays[n]"""
+    import asyncio
+
+    from pydantic_ai.exceptions import ModelHTTPError
+    from pydantic_ai.messages import ModelResponse, ToolCallPart, ToolReturnPart
+    from pydantic_ai.models.function import FunctionModel
+
+    calls = {"turns": 0}
+
+    async def function(messages, info):
+        if not any(isinstance(part, ToolReturnPart) for part in messages[-1].parts):
+            turn = calls["turns"]
+            calls["turns"] += 1
+            args = {"evidence_name": "valid_id", "evidence_form": forms[turn]}
+            return ModelResponse(parts=[ToolCallPart("add_evidence", args, tool_call_id=f"call-{turn}")])
+        turn = int(messages[-1].parts[0].tool_call_id.split("-")[1])
+        if turn < len(answer_delays):
+            await asyncio.sleep(answer_delays[turn])
+        if turn < fail_first_attempts:
+            raise ModelHTTPError(503, "test")
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response_text": "Soso."})])
+
+    return FunctionModel(function), calls
+
+
+def test_losing_hedge_emits_no_events(monkeypatch):
+    from buergeramt.engine.output import MemorySink
+    from buergeramt.rules.game_state import GameState
+    from buergeramt.rules.models import RetryPolicy
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    policy = RetryPolicy(hedge=True, hedge_after=0.05)
+    bureaucrat = Bureaucrat("Test", "Beamter", "Erstbearbeitung", system_prompt="Test", retry_policy=policy)
+    # the first request has handed over its Reisepass when the hedged one overtakes it
+    model, calls = _evidence_model(["Reisepass", "Personalausweis"], answer_delays=(5.0,))
+    game_state = GameState()
+    sink = MemorySink()
+    game_state.set_output(sink)
+    with bureaucrat.agent.override(model=model):
+        assert bureaucrat.respond("Hier ist mein Ausweis", game_state) == "Soso."
+    assert calls["turns"] == 2
+    assert game_state.evidence_provided == {"valid_id": "Personalausweis"}
+    assert [(event["kind"], event["form"]) for event in sink.events] == [("evidence_added", "Personalausweis")]
+
+
+def test_retried_attempt_emits_events_once(monkeypatch):
+    from buergeramt.engine.output import MemorySink
+    from buergeramt.rules.game_state import GameState
+    from buergeramt.rules.models import RetryPolicy
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    bureaucrat = Bureaucrat(
+        "Test", "Beamter", "Erstbearbeitung", system_prompt="Test", retry_policy=RetryPolicy(backoff=0)
+    )
+    model, calls = _evidence_model(["Personalausweis", "Personalausweis"], fail_first_attempts=1)
+    game_state = GameState()
+    sink = MemorySink()
+    game_state.set_output(sink)
+    with bureaucrat.agent.override(model=model):
+        assert bureaucrat.respond("Hier ist mein Personalausweis", game_state) == "Soso."
+    assert calls["turns"] == 2
+    assert [event["kind"] for event in sink.events] == ["evidence_added"]
@@ -0,0 +1,66 @@
+import pytest
+
+from buergeramt.characters.cassette import Cassette, open_cassette
+from buergeramt.characters.persona_factory import build_bureaucrat
+from buergeramt.rules.game_state import GameState
+
+TURNS = [
+    "Hier ist mein Reisepass",
+    "Das ist doch lächerlich!",
+    "Hier ist eine handgeschriebene Widmung",
+    "Ich reiche die Schenkungsanmeldung ein",
+]
+
+
+@pytest.fixture
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+def play(bureaucrat, stream=False):
+    gs = GameState()
+    replies = [bureaucrat.introduce(gs)]
+    for turn in TURNS:
+        on_text = (lambda chunk: None) if stream else None
+        replies.append(bureaucrat.respond(turn, gs, on_text=on_text))
+    return gs, replies
+
+
+def snapshot(gs):
+    return gs.collected_documents, gs.evidence_provided, gs.frustration_level, gs.current_department
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_replay_reproduces_session(tmp_path, no_api_key, stream):
+    path = tmp_path / "session.jsonl"
+    recorder = Cassette.record(path)
+    recorded_state, recorded_replies = play(build_bureaucrat("HerrSchmidt", model="offline", cassette=recorder), stream)
+    assert recorder.recorded > len(TURNS)
+
+    player = Cassette.replay(path)
+    # the replayed model never reaches the named model, so no API key is needed
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="openai:gpt-4o-mini", cassette=player)
+    replayed_state, replayed_replies = play(bureaucrat, stream)
+    assert replayed_replies == recorded_replies
+    assert snapshot(replayed_state) == snapshot(recorded_state)
+    assert "Schenkungsanmeldung" in replayed_state.collected_documents
+    assert player.remaining() == 0
+
+
+def test_replay_miss_is_reported(tmp_path, no_api_key):
+    path = tmp_path / "session.jsonl"
+    play(build_bureaucrat("HerrSchmidt", model="offline", cassette=Cassette.record(path)))
+    bureaucrat = build_bureaucrat("HerrSchmidt", cassette=Cassette.replay(path))
+    bureaucrat.introduce(GameState())
+    with pytest.raises(RuntimeError) as excinfo:
+        bureaucrat.respond("Etwas ganz anderes", GameState())
+    assert "No recorded response" in str(excinfo.value)
+
+
+def test_open_cassette_options(tmp_path):
+    assert open_cassette() is None
+    with pytest.raises(ValueError):
+        open_cassette(record=str(tmp_path / "a"), replay=str(tmp_path / "b"))
+    with pytest.raises(OSError):
+        open_cassette(replay=str(tmp_path / "missing.jsonl"))
@@ -31,3 +31,30 @@ def test_persona_templates_and_formatting():
             required_evidence=required_evidence,
         )
         assert isinstance(formatted, str)
+
+
+def test_persona_model_overrides_merge_with_defaults():
+    from buergeramt.rules.loader import create_persona_from_config
+    from buergeramt.rules.models import ModelConfig, PersonaConfig, PersonaDefaults
+
+    defaults = PersonaDefaults(
+        system_prompt_template="{name}",
+        behavioral_rules=[],
+        model=ModelConfig(name="openai:gpt-4o-mini", max_tokens=300, timeout=20),
+    )
+    persona_config = PersonaConfig(
+        name="Test",
+        role="Beamter",
+        department="Erstbearbeitung",
+        personality=[],
+        handled_documents=[],
+        required_evidence=[],
+        behavioral_rules=[],
+        system_prompt_template="{name}",
+        model={"max_tokens": 120, "temperature": 0.2},
+    )
+    persona = create_persona_from_config("Test", persona_config, defaults)
+    assert persona.model.name == "openai:gpt-4o-mini"
+    assert persona.model.settings() == {"max_tokens": 120, "temperature": 0.2, "timeout": 20}
+    # every configured persona gets the defaults' output cap
+    assert all(p.model.max_tokens for p in get_config().personas.values())
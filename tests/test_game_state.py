@@ -151,23 +151,8 @@ def test_get_formatted_gamestate_json():
 def test_win_by_forced_procedure_and_progress():
     config = get_config()
     gs = GameState()
-    doc_graph = {doc_id: set(doc.requirements) for doc_id, doc in config.documents.items()}
-    visited = set()
-    order = []
-
-    def visit(doc_id):
-        if doc_id in visited:
-            return
-        for req in doc_graph[doc_id]:
-            if req in config.documents:
-                visit(req)
-        order.append(doc_id)
-        visited.add(doc_id)
-
-    for doc_id in config.documents:
-        visit(doc_id)
     # add all except final doc
-    for doc_id in order:
+    for doc_id in config.graph.order:
         if doc_id == config.final_document:
             continue
         doc = config.documents[doc_id]
@@ -191,3 +176,126 @@ def test_win_by_forced_procedure_and_progress():
     for doc_id in config.documents:
         assert doc_id in gs.collected_documents
     assert gs.progress <= 100
+
+
+def test_snapshot_restore_and_fork():
+    gs = GameState()
+    gs.current_department = "Erstbearbeitung"
+    moves = []
+    gs.on_department_change(moves.append)
+    snapshot = gs.snapshot()
+    gs.add_evidence("valid_id", "Personalausweis")
+    gs.increase_frustration(2)
+    gs.switch_department("Fachprüfung")
+    gs.restore(snapshot)
+    assert gs.evidence_provided == {} and gs.frustration_level == 0
+    assert gs.current_department == "Erstbearbeitung"
+
+    scratch = gs.fork()
+    scratch.add_evidence("valid_id", "Reisepass")
+    scratch.switch_department("Abschlussstelle")
+    assert gs.evidence_provided == {}
+    assert moves == ["Fachprüfung"]
+    gs.restore(scratch.snapshot(), notify=True)
+    assert gs.evidence_provided == {"valid_id": "Reisepass"}
+    assert moves == ["Fachprüfung", "Abschlussstelle"]
+
+
+
+def test_held_events_nest():
+    from buergeramt.engine.output import MemorySink
+
+    gs = GameState()
+    sink = MemorySink()
+    gs.set_output(sink)
+    gs.hold_events()
+    gs.hold_events()
+    gs.add_evidence("valid_id", "Personalausweis")
+    gs.discard_events()
+    gs.hold_events()
+    gs.add_evidence("gift_description", "handgeschriebene Widmung")
+    gs.release_events()
+    assert sink.events == []
+    gs.release_events()
+    assert [event["kind"] for event in sink.events] == ["evidence_added"]
+    assert sink.events[0]["evidence"] == "gift_description"
+
+def test_batched_tools_return_one_result_per_item():
+    config = get_config()
+    gs = GameState()
+    items = [
+        {"evidence_name": ev_id, "evidence_form": ev.acceptable_forms[0]} for ev_id, ev in config.evidence.items()
+    ]
+    results = gs.add_evidences(items + [{"evidence_name": "valid_id", "evidence_form": "Bibliotheksausweis"}])
+    assert [r["accepted"] for r in results] == [True] * len(items) + [False]
+    assert set(gs.evidence_provided) == set(config.evidence)
+
+    final = config.final_document
+    prerequisites = [doc for doc in config.documents[final].requirements if doc in config.documents]
+    # the final document comes first, its prerequisites later in the same batch
+    results = gs.add_documents([final, *prerequisites, "notarealdoc"])
+    assert [r["document_name"] for r in results] == [final, *prerequisites, "notarealdoc"]
+    assert [r["added"] for r in results] == [True] * (len(prerequisites) + 1) + [False]
+    assert "nicht bekannt" in results[-1]["message"]
+
+
+def test_derived_state_follows_every_change():
+    config = get_config()
+    gs = GameState()
+    assert gs.get_ready_documents() == []
+    assert gs.remaining_requirements("Schenkungsanmeldung") == 2
+    gs.add_evidence("valid_id", "Personalausweis")
+    gs.add_evidence("valid_id", "Reisepass")
+    assert gs.remaining_requirements("Schenkungsanmeldung") == 1
+    assert gs.update_progress() == 10
+    gs.add_evidence("gift_description", "handgeschriebene Widmung")
+    assert gs.get_ready_documents() == ["Schenkungsanmeldung"]
+    assert gs.get_missing_evidence()["ErlaubnisZurFreude"] == config.documents["ErlaubnisZurFreude"].requirements
+    gs.add_document("Schenkungsanmeldung")
+    assert gs.get_ready_documents() == []
+    assert "Schenkungsanmeldung" not in gs.get_missing_evidence()
+    assert gs.remaining_requirements("ErlaubnisZurFreude") == 3
+    assert gs.update_progress() == 40
+
+    # restoring a snapshot recounts from the restored collections
+    snapshot = gs.snapshot()
+    gs.restore({**snapshot, "collected_documents": {}})
+    assert gs.get_ready_documents() == ["Schenkungsanmeldung"]
+    gs.restore(snapshot)
+    assert gs.remaining_requirements("ErlaubnisZurFreude") == 3
+
+
+def test_progress_weights_and_final_document_come_from_config():
+    config = get_config()
+    weights = config.progress_weights.model_copy(update={"evidence": 5, "overrides": {"valid_id": 50}})
+    gs = GameState(config=config.model_copy(update={"progress_weights": weights}))
+    gs.add_evidence("valid_id", "Personalausweis")
+    gs.add_evidence("gift_description", "handgeschriebene Widmung")
+    assert gs.update_progress() == 55
+
+    final = config.final_document
+    items = [{"evidence_name": ev_id, "evidence_form": ev.acceptable_forms[0]} for ev_id, ev in config.evidence.items()]
+    gs.add_evidences(items)
+    others = [doc for doc in config.documents if doc != final]
+    gs.add_documents(others)
+    assert not gs.final_document_collected and not gs.all_documents_collected
+    assert gs.get_ready_documents() == [final]
+    gs.add_document(final)
+    assert gs.final_document_collected and gs.all_documents_collected
+    assert gs.update_progress() == 100
+
+
+def test_engine_wins_with_configured_final_document():
+    from buergeramt.engine.game_engine import GameEngine
+    from buergeramt.engine.output import MemorySink
+
+    config = get_config()
+    engine = GameEngine(use_ai_characters=False, output=MemorySink())
+    gs = engine.game_state
+    gs.add_evidences(
+        [{"evidence_name": ev_id, "evidence_form": ev.acceptable_forms[0]} for ev_id, ev in config.evidence.items()]
+    )
+    gs.add_documents([doc for doc in config.documents if doc != config.final_document])
+    assert not engine.check_win_condition()
+    gs.add_document(config.final_document)
+    assert engine.check_win_condition()
@@ -0,0 +1,70 @@
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+from buergeramt.characters.history import SUMMARY_PREFIX, ConversationHistory, estimate_tokens, split_turns
+from buergeramt.rules.loader import get_config
+from buergeramt.rules.models import HistoryPolicy
+
+
+def make_messages(turns: int, reply_len: int = 10):
+    messages = []
+    for i in range(turns):
+        parts = [UserPromptPart(content=f"Frage {i}")]
+        if i == 0:
+            parts.insert(0, SystemPromptPart(content="Sie sind Herr Schmidt."))
+        messages.append(ModelRequest(parts=parts))
+        messages.append(ModelResponse(parts=[TextPart(content=f"Antwort {i} " + "x" * reply_len)]))
+    return messages
+
+
+def test_history_without_policy_is_unbounded():
+    history = ConversationHistory()
+    assert history.for_request() is None
+    history.record(make_messages(20))
+    assert history.compact() is False
+    assert len(history.for_request()) == 40
+
+
+def test_compact_keeps_last_turns_and_system_prompt():
+    history = ConversationHistory(HistoryPolicy(max_turns=3, token_budget=None))
+    history.record(make_messages(8))
+    assert history.compact() is True
+    turns = split_turns(history.messages)
+    assert len(turns) == 3
+    first_parts = history.messages[0].parts
+    assert first_parts[0].content == "Sie sind Herr Schmidt."
+    assert any(isinstance(p, SystemPromptPart) and p.content.startswith(SUMMARY_PREFIX) for p in first_parts)
+    assert "Frage 0" in history.summary and "Frage 4" in history.summary
+    assert "Frage 5" not in history.summary
+    # compacting again only replaces the summary part, it does not stack them
+    history.record(history.messages + make_messages(2)[0:1] + make_messages(2)[1:2])
+    history.compact()
+    summaries = [p for p in history.messages[0].parts if isinstance(p, SystemPromptPart)]
+    assert len(summaries) == 2
+
+
+def test_token_budget_is_enforced_on_request():
+    history = ConversationHistory(HistoryPolicy(max_turns=10, token_budget=200))
+    history.record(make_messages(6, reply_len=400))
+    messages = history.for_request()
+    assert estimate_tokens(messages) <= 200 or len(split_turns(messages)) == 1
+    assert len(split_turns(messages)) < 6
+
+
+def test_compact_async_with_custom_summarizer():
+    import asyncio
+
+    history = ConversationHistory(HistoryPolicy(max_turns=2, token_budget=None))
+    history.record(make_messages(5))
+
+    async def summarizer(previous, turns):
+        return f"{len(turns)} Runden zusammengefasst"
+
+    assert asyncio.run(history.compact_async(summarizer)) is True
+    assert history.summary == "3 Runden zusammengefasst"
+    assert len(split_turns(history.messages)) == 2
+
+
+def test_persona_history_policy_from_config():
+    config = get_config()
+    for persona in config.personas.values():
+        assert persona.history.max_turns == config.persona_defaults.history.max_turns
@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx2
+
+from buergeramt.characters.http_client import create_http_client, get_http_client, warm_up
+from buergeramt.characters.persona_factory import build_bureaucrat
+from buergeramt.rules.models import HttpClientConfig
+
+
+def test_bureaucrats_share_one_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    schmidt = build_bureaucrat("HerrSchmidt", model="openai:gpt-4o-mini")
+    mueller = build_bureaucrat("FrauMueller", model="openai:gpt-4o-mini")
+    assert schmidt.http_client is mueller.http_client is get_http_client()
+    # the provider's SDK client sends its requests through the shared pool
+    assert schmidt.agent.model.client._client is get_http_client()
+    assert mueller.agent.model.client._client is get_http_client()
+
+
+def test_client_uses_configured_pool(monkeypatch):
+    import importlib.util
+
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    client = create_http_client(HttpClientConfig(http2=True, max_connections=3, keepalive_expiry=30))
+    pool = client._transport._pool
+    assert (pool._max_connections, pool._keepalive_expiry) == (3, 30)
+    # without h2 the client falls back to HTTP/1.1
+    assert not pool._http2
+    asyncio.run(client.aclose())
+
+
+def test_warm_up():
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, str(request.url)))
+        return httpx2.Response(404)
+
+    client = httpx2.AsyncClient(transport=httpx2.MockTransport(handler))
+    # any response counts, the connection is open either way
+    assert asyncio.run(warm_up(client, "https://api.example.test/v1"))
+    assert seen == [("HEAD", "https://api.example.test/v1")]
+
+    def unreachable(request):
+        raise httpx2.ConnectError("no route to host", request=request)
+
+    client = httpx2.AsyncClient(transport=httpx2.MockTransport(unreachable))
+    assert not asyncio.run(warm_up(client, "https://api.example.test/v1"))
@@ -0,0 +1,71 @@
+from buergeramt.rules.game_state import GameState
+from buergeramt.rules.intents import IntentMatcher, apply_submission, normalize
+from buergeramt.rules.loader import get_config
+from buergeramt.rules.models import FastPathReplies
+
+
+def test_normalize_folds_umlauts_and_punctuation():
+    assert normalize("Tortenstück auf Serviette!") == "tortenstueck auf serviette"
+
+
+def test_match_evidence_forms():
+    matcher = IntentMatcher(get_config())
+    intent = matcher.match("Hier ist mein Reisepass und eine handgeschriebene Widmung.")
+    assert ("valid_id", "Reisepass") in intent.evidence
+    assert ("gift_description", "handgeschriebene Widmung") in intent.evidence
+    assert intent.is_pure_submission
+
+
+def test_match_with_extra_content_is_not_pure():
+    matcher = IntentMatcher(get_config())
+    intent = matcher.match("Mein Personalausweis, aber wo finde ich Frau Müller?")
+    assert intent.evidence == [("valid_id", "Personalausweis")]
+    assert not intent.is_pure_submission
+    assert not matcher.match("Guten Tag").matched
+
+
+def test_apply_submission_pure_evidence_gets_templated_reply():
+    gs = GameState()
+    intent = IntentMatcher(gs.config).match("Hier ist mein Personalausweis")
+    outcome = apply_submission(intent, gs, FastPathReplies())
+    assert gs.evidence_provided == {"valid_id": "Personalausweis"}
+    assert outcome.reply is not None and "Personalausweis" in outcome.reply
+
+
+def test_apply_submission_rejected_document_is_left_to_the_model():
+    gs = GameState()
+    gs.current_department = gs.config.documents["Schenkungsanmeldung"].department
+    intent = IntentMatcher(gs.config).match("Ich möchte eine Schenkungsanmeldung")
+    outcome = apply_submission(intent, gs, FastPathReplies())
+    assert outcome.reply is None
+    assert outcome.rejected_documents and outcome.rejected_documents[0][0] == "Schenkungsanmeldung"
+    assert "Schenkungsanmeldung abgelehnt" in outcome.annotate("Ich möchte eine Schenkungsanmeldung")
+    assert "Schenkungsanmeldung" not in gs.collected_documents
+
+
+def test_documents_of_other_departments_are_not_issued():
+    gs = GameState()
+    gs.current_department = "Fachprüfung"
+    gs.add_evidence("valid_id", "Personalausweis")
+    gs.add_evidence("gift_description", "handgeschriebene Widmung")
+    outcome = apply_submission(IntentMatcher(gs.config).match("Schenkungsanmeldung bitte"), gs, FastPathReplies())
+    assert not outcome.applied
+    assert "Schenkungsanmeldung" not in gs.collected_documents
+
+
+def test_questions_about_evidence_apply_nothing():
+    gs = GameState()
+    intent = IntentMatcher(gs.config).match("Brauche ich einen Reisepass?")
+    assert intent.evidence == [("valid_id", "Reisepass")] and not intent.is_submission
+    outcome = apply_submission(intent, gs, FastPathReplies())
+    assert not outcome.applied and outcome.reply is None
+    assert gs.evidence_provided == {}
+
+
+def test_negated_evidence_applies_nothing():
+    gs = GameState()
+    for text in ("Ich habe keinen Reisepass", "Den Personalausweis habe ich nicht dabei"):
+        intent = IntentMatcher(gs.config).match(text)
+        assert intent.is_negated and not intent.is_pure_submission
+        assert not apply_submission(intent, gs, FastPathReplies()).applied
+    assert gs.evidence_provided == {}
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from buergeramt.characters.model_backend import is_offline, requires_api_key
+from buergeramt.characters.persona_factory import build_bureaucrat
+from buergeramt.engine import agent_router, game_engine
+from buergeramt.engine.game_engine import GameEngine
+from buergeramt.rules.game_state import GameState
+
+
+@pytest.fixture
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    # load_dotenv must not be needed for the offline backend
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+@pytest.fixture
+def no_delays(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_walk(seconds):
+        await real_sleep(0)
+
+    monkeypatch.setattr(agent_router.asyncio, "sleep", no_walk)
+    monkeypatch.setattr(game_engine.time, "sleep", lambda seconds: None)
+
+
+def test_model_names():
+    assert requires_api_key(None)
+    assert not requires_api_key("offline")
+    assert is_offline("offline") and not is_offline("openai:gpt-4o-mini")
+
+
+def test_offline_bureaucrat_applies_evidence_and_documents(no_api_key):
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="offline")
+    gs = GameState()
+    gs.current_department = "Erstbearbeitung"
+    intro = bureaucrat.introduce(gs)
+    assert "Herr Schmidt" in intro
+    reply = bureaucrat.respond("Hier sind mein Personalausweis und eine handgeschriebene Widmung", gs)
+    assert "Personalausweis" in reply
+    assert gs.evidence_provided == {"valid_id": "Personalausweis", "gift_description": "handgeschriebene Widmung"}
+    bureaucrat.respond("Ich reiche die Schenkungsanmeldung ein", gs)
+    assert "Schenkungsanmeldung" in gs.collected_documents
+    # same input, same reply
+    again = build_bureaucrat("HerrSchmidt", model="offline")
+    assert again.introduce(GameState()) == intro
+
+
+def test_offline_bureaucrat_rejects_missing_requirements(no_api_key):
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="offline")
+    gs = GameState()
+    reply = bureaucrat.respond("Ich möchte die ErlaubnisZurFreude", gs)
+    assert "ErlaubnisZurFreude" not in gs.collected_documents
+    assert "vorlegen" in reply
+
+
+
+def test_offline_bureaucrat_ignores_questions_and_negations(no_api_key):
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="offline")
+    gs = GameState()
+    gs.current_department = "Erstbearbeitung"
+    bureaucrat.respond("Brauche ich einen Reisepass?", gs)
+    bureaucrat.respond("Ich habe keinen Reisepass", gs)
+    assert gs.evidence_provided == {}
+    bureaucrat.respond("Hier ist mein Reisepass", gs)
+    assert gs.evidence_provided == {"valid_id": "Reisepass"}
+
+def test_offline_engine_switches_department(no_api_key, no_delays):
+    engine = GameEngine(model="offline")
+    assert not engine.game_over
+    engine.process_input("Ich möchte zu Herrn Weber")
+    assert engine.game_state.current_department == "Abschlussstelle"
+    assert engine.agent_router.get_active_bureaucrat().name == "Herr Weber"
+
+
+def test_greeting_is_prepared_during_welcome_screen(no_api_key, no_delays, capsys):
+    engine = GameEngine(model="offline")
+    bureaucrat = engine.agent_router.get_active_bureaucrat()
+    introduce_async = bureaucrat.introduce_async
+    printed_before_greeting = []
+
+    async def introduce(game_state):
+        printed_before_greeting.append(capsys.readouterr().out)
+        return await introduce_async(game_state)
+
+    bureaucrat.introduce_async = introduce
+    capsys.readouterr()
+    engine.start_game()
+    # the model call started before any of the welcome screen was printed
+    assert printed_before_greeting == [""]
+    out = capsys.readouterr().out
+    assert out.index("WILLKOMMEN") < out.index("Sie betreten das Finanzamt")
+    assert bureaucrat.history.messages
+    # the other bureaucrats are only built ahead of time with prebuild_agents
+    assert list(engine.agent_router.bureaucrats.built()) == [bureaucrat.department]
+
+
+def test_offline_streaming(no_api_key):
+    bureaucrat = build_bureaucrat("FrauMueller", model="offline")
+    chunks = []
+    reply = bureaucrat.respond("Hier ist ein Selfie mit Geschenk", GameState(), on_text=chunks.append)
+    assert "".join(chunks) == reply
+
+
+def test_explicit_model_turns_off_cheap_tier(no_api_key):
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="offline")
+    assert bureaucrat.model_name == "offline"
+    assert bureaucrat.cheap_model_name is None
+    assert bureaucrat.model_config.max_tokens == 300
+
+
+def test_several_items_take_one_tool_step(no_api_key):
+    from buergeramt.utils.telemetry import Telemetry
+
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="offline")
+    bureaucrat.telemetry = Telemetry()
+    gs = GameState()
+    reply = bureaucrat.respond("Hier sind mein Personalausweis und die handgeschriebene Widmung", gs)
+    assert gs.evidence_provided == {"valid_id": "Personalausweis", "gift_description": "handgeschriebene Widmung"}
+    assert "Personalausweis" in reply
+    # one request for the batched tool call, one for the answer
+    assert bureaucrat.telemetry.session.requests == 2
+    assert bureaucrat.telemetry.session.tool_calls == 1
+
+
+def test_single_shot_turn_takes_one_request(no_api_key, no_delays, capsys):
+    from buergeramt.utils.telemetry import Telemetry
+
+    engine = GameEngine(model="offline", single_shot=True, telemetry=Telemetry())
+    assert engine.agent_router.get_active_bureaucrat().agent._function_toolset.tools == {}
+    engine.process_input("Hier sind mein Personalausweis und die handgeschriebene Widmung")
+    assert engine.game_state.evidence_provided == {
+        "valid_id": "Personalausweis",
+        "gift_description": "handgeschriebene Widmung",
+    }
+    assert engine.telemetry.session.requests == 1
+    # the model cannot see the rejection, the engine renders it
+    capsys.readouterr()
+    engine.process_input("Ich reiche die Schenkungsanmeldung und die ErlaubnisZurFreude ein")
+    assert list(engine.game_state.collected_documents) == ["Schenkungsanmeldung"]
+    assert "ErlaubnisZurFreude kann ich Ihnen so nicht ausstellen" in capsys.readouterr().out
+    assert engine.telemetry.session.requests == 2
+
+
+def test_headless_pacing_never_sleeps(no_api_key, monkeypatch):
+    import time
+
+    real_sleep = asyncio.sleep
+    slept = []
+
+    async def recorded(seconds):
+        slept.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", recorded)
+    monkeypatch.setattr(time, "sleep", slept.append)
+    engine = GameEngine(model="offline", pacing="headless")
+    engine.start_game()
+    engine.process_input("Ich möchte zu Herrn Weber")
+    assert engine.game_state.current_department == "Abschlussstelle"
+    assert not any(slept)
@@ -0,0 +1,74 @@
+import io
+import json
+
+from buergeramt.engine.output import COLORS, AnsiSink, JsonSink, MemorySink, PlainSink, make_sink
+
+
+def test_ansi_sink_styles_and_streams():
+    stream = io.StringIO()
+    sink = AnsiSink(stream)
+    sink.line("Willkommen", "title")
+    sink.line("Normal")
+    sink.chunk("Guten ")
+    sink.chunk("Tag")
+    sink.end_stream("Guten Tag")
+    assert stream.getvalue() == (
+        f"{COLORS['magenta']}{COLORS['bold']}Willkommen{COLORS['reset']}\n"
+        "Normal\n"
+        f"{COLORS['cyan']}{COLORS['bold']}Guten Tag{COLORS['reset']}\n"
+    )
+
+
+def test_buffered_sinks_write_once_per_flush():
+    plain, events = io.StringIO(), io.StringIO()
+    for sink, stream in ((PlainSink(plain), plain), (JsonSink(events), events)):
+        sink.line("Hallo", "bureaucrat")
+        sink.event("evidence_added", "Evidence added", evidence="valid_id")
+        assert stream.getvalue() == ""
+        sink.flush()
+    assert plain.getvalue() == "Hallo\nEvidence added\n"
+    records = [json.loads(line) for line in events.getvalue().splitlines()]
+    assert records == [
+        {"type": "line", "style": "bureaucrat", "text": "Hallo"},
+        {"type": "event", "kind": "evidence_added", "text": "Evidence added", "evidence": "valid_id"},
+    ]
+    assert isinstance(make_sink("json"), JsonSink)
+
+
+def test_engine_and_game_state_write_to_sink(monkeypatch, capsys):
+    from buergeramt.characters import bureaucrat
+    from buergeramt.engine.game_engine import GameEngine
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(bureaucrat, "load_dotenv", lambda: None)
+    sink = MemorySink()
+    engine = GameEngine(model="offline", pacing="headless", output=sink)
+    engine.start_game()
+    engine.process_input("Hier ist mein Personalausweis")
+    assert ("title", "=== WILLKOMMEN ZUM SCHENKUNGSSTEUERABENTEUER ===") in sink.lines
+    assert sink.events == [
+        {
+            "kind": "evidence_added",
+            "text": "Evidence 'valid_id' with form 'Personalausweis' added to evidence provided.",
+            "evidence": "valid_id",
+            "form": "Personalausweis",
+        }
+    ]
+    assert capsys.readouterr().out == ""
+
+
+def test_streamed_reply_is_finished_before_state_events(monkeypatch):
+    from buergeramt.characters import bureaucrat
+    from buergeramt.engine.game_engine import GameEngine
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(bureaucrat, "load_dotenv", lambda: None)
+    stream = io.StringIO()
+    engine = GameEngine(model="offline", pacing="headless", output=AnsiSink(stream), stream=True)
+    engine.start_game()
+    stream.seek(0)
+    stream.truncate()
+    engine.process_input("Hier ist mein Personalausweis")
+    reply, event = stream.getvalue().splitlines()[:2]
+    assert reply.startswith(f"{COLORS['cyan']}{COLORS['bold']}") and reply.endswith(COLORS["reset"])
+    assert event == "Evidence 'valid_id' with form 'Personalausweis' added to evidence provided."
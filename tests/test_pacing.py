@@ -0,0 +1,51 @@
+from typing import List
+
+import pytest
+
+from buergeramt.engine.pacing import PRESETS, PacingPolicy, resolve_pacing
+
+
+def test_resolve_pacing():
+    assert resolve_pacing(None) == PRESETS["interactive"]
+    assert resolve_pacing("headless").scene_delay == 0
+    assert not resolve_pacing("headless").clear_screen
+    custom = PacingPolicy(line_delay=0.0, scene_delay=0.5)
+    assert resolve_pacing(custom) is custom
+    with pytest.raises(ValueError):
+        resolve_pacing("gemütlich")
+
+
+class RecordingPacing(PacingPolicy):
+    """interactive delays, but pauses are only recorded; blocking ones fail the test"""
+
+    awaited: List[float] = []
+
+    def pause(self, seconds: float):
+        if seconds > 0:
+            raise AssertionError(f"blocking pause of {seconds}s on the event loop")
+
+    async def pause_async(self, seconds: float):
+        self.awaited.append(seconds)
+
+
+def test_async_turn_and_walk_never_block_the_event_loop(monkeypatch):
+    import asyncio
+
+    from buergeramt.engine.game_engine import GameEngine
+    from buergeramt.engine.output import MemorySink
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+    pacing = RecordingPacing()
+    engine = GameEngine(model="offline", pacing=pacing, output=MemorySink())
+
+    async def play():
+        await engine.start_game_async()
+        await engine.process_input_async("Hier ist mein Personalausweis")
+        # the reply, the departure, the walk and the next bureaucrat's greeting
+        await engine.process_input_async("Ich möchte zu Herrn Weber")
+        await engine.switch_agent_async("Herr Weber")
+
+    asyncio.run(play())
+    assert engine.game_state.current_department == "Abschlussstelle"
+    assert pacing.awaited.count(pacing.line_delay) > 5
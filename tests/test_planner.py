@@ -0,0 +1,93 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from buergeramt.buergeramt_adventure import setup_commands
+from buergeramt.characters.prompt_compiler import VOLATILE_HEADER
+from buergeramt.engine.output import MemorySink
+from buergeramt.engine.sessions import SessionManager, headless_engine
+from buergeramt.rules.game_state import GameState
+from buergeramt.rules.loader import get_config
+from buergeramt.rules.planner import plan, planner_hint
+
+
+@pytest.fixture(autouse=True)
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+def provide(gs, *evidence):
+    config = get_config()
+    for name in evidence:
+        gs.add_evidence(name, config.evidence[name].acceptable_forms[0])
+
+
+def test_plan_starts_with_first_issuable_document():
+    config = get_config()
+    gs = GameState()
+    result = plan(gs)
+    assert result.goal == config.final_document
+    assert result.next_document == "Schenkungsanmeldung"
+    assert result.bureaucrat == "Herr Schmidt"
+    assert result.missing_evidence == ["valid_id", "gift_description"]
+    assert result.remaining_documents == len(config.graph.prerequisites(config.final_document))
+    assert set(result.remaining_evidence) == set(config.graph.evidence_needed(config.final_document))
+
+
+def test_plan_prefers_ready_document_in_current_department():
+    gs = GameState()
+    provide(gs, "gift_photo", "sentimental_context")
+    gs.current_department = "Fachprüfung"
+    result = plan(gs)
+    assert result.next_document == "Geschenkwertermittlung"
+    assert result.missing_evidence == []
+    assert "Geschenkwertermittlung" in result.ready
+    lines = plan(gs).describe(gs)
+    assert not any("/gehe_zu" in line for line in lines)
+
+
+def test_plan_sends_player_to_other_department():
+    gs = GameState()
+    gs.current_department = "Abschlussstelle"
+    lines = plan(gs).describe(gs)
+    assert any("/gehe_zu Herr Schmidt" in line for line in lines)
+
+
+def test_plan_done_after_final_document():
+    config = get_config()
+    gs = GameState()
+    for doc_id in config.graph.prerequisites(config.final_document):
+        provide(gs, *(req for req in config.graph.requires[doc_id] if req in config.evidence))
+        gs.current_department = config.documents[doc_id].department
+        assert plan(gs).next_document == doc_id
+        gs.add_document(doc_id)
+        assert doc_id in gs.collected_documents
+    result = plan(gs)
+    assert result.done and result.remaining_documents == 0 and result.remaining_evidence == []
+    assert "alle nötigen Dokumente" in planner_hint(gs)
+
+
+def test_hinweis_command_in_session():
+    async def play():
+        manager = SessionManager(
+            engine_factory=partial(headless_engine, model="offline"), commands_factory=setup_commands
+        )
+        created = await manager.create()
+        reply = await manager.handle(created.session_id, "/hinweis")
+        assert "Als Nächstes: Schenkungsanmeldung bei Herr Schmidt" in reply.text()
+        assert "valid_id" in reply.text()
+
+    asyncio.run(play())
+
+
+def test_planner_hints_reach_the_model_query():
+    engine = headless_engine(MemorySink(), model="offline", planner_hints=True)
+    bureaucrat = engine.agent_router.get_active_bureaucrat()
+    query = bureaucrat._model_query("Guten Tag", engine.game_state)
+    assert query.startswith("Guten Tag" + VOLATILE_HEADER)
+    assert "Schenkungsanmeldung" in query
+
+    plain = headless_engine(MemorySink(), model="offline")
+    assert plain.agent_router.get_active_bureaucrat()._model_query("Guten Tag", plain.game_state) == "Guten Tag"
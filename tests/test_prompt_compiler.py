@@ -0,0 +1,66 @@
+import pytest
+
+from buergeramt.characters.persona_factory import build_bureaucrat
+from buergeramt.characters.prompt_compiler import (
+    TOOL_INSTRUCTIONS,
+    VOLATILE_HEADER,
+    PromptCompiler,
+    with_volatile,
+)
+from buergeramt.rules.game_state import GameState
+from buergeramt.rules.loader import get_config, load_config
+
+
+@pytest.fixture
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+def test_prompts_compiled_once_per_config_version():
+    compiler = PromptCompiler()
+    config = get_config()
+    first = compiler.compile("HerrSchmidt", config)
+    assert compiler.compile("HerrSchmidt", config) is first
+    assert TOOL_INSTRUCTIONS in first.text
+    assert first.tokens == len(first.text) // 4
+    assert first.config_version == config.version
+    # an equal config has the same version and prompt
+    reloaded = load_config()
+    assert reloaded.version == config.version
+    assert compiler.compile("HerrSchmidt", reloaded) is first
+    changed = reloaded.model_copy(update={"final_document": "Schenkungsanmeldung"})
+    other = compiler.compile("HerrSchmidt", changed)
+    assert other is not first and other.sha256 != first.sha256
+    with pytest.raises(KeyError):
+        compiler.compile("Unbekannt", config)
+
+
+def test_report_lists_every_persona():
+    report = PromptCompiler().report()
+    for persona_id in get_config().personas:
+        assert persona_id in report
+
+
+def test_volatile_context_goes_last_and_is_not_kept(no_api_key):
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="offline")
+    # the bureaucrat's system prompt is the shared compiled text
+    assert bureaucrat.system_prompt == build_bureaucrat("HerrSchmidt", model="offline").system_prompt
+    bureaucrat.volatile_context = lambda game_state: f"Nachweise: {len(game_state.evidence_provided)}"
+    gs = GameState()
+    bureaucrat.respond("Hier ist mein Reisepass", gs)
+    bureaucrat.respond("Und eine handgeschriebene Widmung", gs)
+    assert len(gs.evidence_provided) == 2
+    sent = [
+        part.content
+        for message in bureaucrat.last_message.all_messages()
+        for part in message.parts
+        if part.part_kind == "user-prompt"
+    ]
+    assert sent[-1] == with_volatile("Und eine handgeschriebene Widmung", "Nachweise: 1")
+    # the history keeps the conversation, not the stale context
+    assert all(
+        VOLATILE_HEADER not in str(getattr(part, "content", ""))
+        for message in bureaucrat.history.messages
+        for part in message.parts
+    )
@@ -0,0 +1,63 @@
+import pytest
+
+from buergeramt.rules.loader import get_config
+from buergeramt.rules.models import Document, Evidence
+from buergeramt.rules.requirement_graph import RequirementGraph, RequirementGraphError
+
+
+def doc(doc_id, *requirements, department="A"):
+    return Document(id=doc_id, description="", requirements=list(requirements), department=department, code="X")
+
+
+EVIDENCE = {ev: Evidence(id=ev, description="", acceptable_forms=["Form"]) for ev in ("id", "photo", "spare")}
+
+
+def test_config_graph():
+    config = get_config()
+    graph = config.graph
+    assert graph is get_config().graph
+    assert graph.order[-1] == config.final_document
+    assert graph.prerequisites("Schenkungsanmeldung") == ["Schenkungsanmeldung"]
+    assert set(graph.prerequisites(config.final_document)) == set(config.documents)
+    assert graph.evidence_documents["valid_id"] == ("Schenkungsanmeldung",)
+    assert graph.dependents["Geburtstagsfreigabe"] == (config.final_document,)
+    assert graph.documents_of("Fachprüfung") == ("Freundschaftsverifikation", "Geschenkwertermittlung")
+    assert graph.documents_of("Keller") == ()
+    assert set(graph.evidence_needed(config.final_document)) == set(config.evidence)
+    assert not graph.unreachable and not graph.unused
+    # a copy with other documents compiles its own graph
+    changed = config.model_copy(update={"final_document": "Schenkungsanmeldung"})
+    assert changed.graph is not graph and "ErlaubnisZurFreude" in changed.graph.unused
+
+
+def test_order_and_lookups():
+    documents = {
+        "Final": doc("Final", "B", "A", "id"),
+        "B": doc("B", "A", "photo", "photo"),
+        "A": doc("A", "id", department="B"),
+        "Side": doc("Side", "spare", department="Nobody"),
+    }
+    graph = RequirementGraph.compile(documents, EVIDENCE, ["A", "B"], "Final")
+    assert graph.order == ("A", "Side", "B", "Final")
+    assert graph.requires["B"] == ("A", "photo")
+    assert graph.evidence_documents == {"id": ("Final", "A"), "photo": ("B",), "spare": ("Side",)}
+    assert graph.department_documents["A"] == ("Final", "B")
+    assert graph.unreachable == {"Side"} and graph.unused == {"Side", "spare"}
+    assert graph.prerequisites("Final") == ["A", "B", "Final"]
+
+
+def test_invalid_graphs_are_rejected():
+    cycle = {"A": doc("A", "C"), "B": doc("B", "A"), "C": doc("C", "B"), "D": doc("D", "A")}
+    with pytest.raises(RequirementGraphError, match="cycle: A -> C -> B -> A"):
+        RequirementGraph.compile(cycle, EVIDENCE, ["A"])
+    with pytest.raises(RequirementGraphError, match="'nothing', which is not defined"):
+        RequirementGraph.compile({"A": doc("A", "nothing")}, EVIDENCE, ["A"])
+    with pytest.raises(RequirementGraphError, match="cannot be issued"):
+        RequirementGraph.compile({"A": doc("A", "id", department="B")}, EVIDENCE, ["A"], "A")
+
+
+def test_compile_is_linear_in_a_long_chain():
+    documents = {f"D{i}": doc(f"D{i}", *([f"D{i - 1}"] if i else ["id"])) for i in range(20000)}
+    graph = RequirementGraph.compile(documents, EVIDENCE, ["A"], "D19999")
+    assert graph.order[0] == "D0" and graph.order[-1] == "D19999"
+    assert len(graph.prerequisites("D19999")) == 20000
@@ -0,0 +1,77 @@
+import json
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+from buergeramt.characters.bureaucrat import Bureaucrat
+from buergeramt.characters.response_cache import ResponseCache, make_key, normalize_input
+from buergeramt.rules.game_state import GameState
+
+
+def scripted_model(calls):
+    """model that submits a Personalausweis and then answers"""
+
+    def respond(messages, info):
+        calls.append(messages)
+        if not any(isinstance(p, ToolReturnPart) for p in messages[-1].parts):
+            args = {"evidence_name": "valid_id", "evidence_form": "Personalausweis"}
+            return ModelResponse(parts=[ToolCallPart("add_evidence", args)])
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"response_text": "Jut, Ausweis."})])
+
+    return FunctionModel(respond)
+
+
+def make_bureaucrat(monkeypatch, cache):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    bureaucrat = Bureaucrat("Herr Schmidt", "Oberamtsrat", "Erstbearbeitung", system_prompt="Test system prompt")
+    bureaucrat.response_cache = cache
+    return bureaucrat
+
+
+def test_normalize_input_and_key():
+    assert normalize_input("  Hier ist mein  PERSONALAUSWEIS! ") == "hier ist mein personalausweis"
+    gs = GameState()
+    key = make_key("prompt", "Hier ist mein Personalausweis", gs)
+    assert key == make_key("prompt", "hier ist mein personalausweis.", gs)
+    assert key != make_key("other prompt", "Hier ist mein Personalausweis", gs)
+    gs.add_evidence("valid_id", "Personalausweis")
+    assert key != make_key("prompt", "Hier ist mein Personalausweis", gs)
+
+
+def test_cache_hit_replays_tool_calls(monkeypatch):
+    cache = ResponseCache()
+    calls = []
+    first = make_bureaucrat(monkeypatch, cache)
+    with first.agent.override(model=scripted_model(calls)):
+        assert first.respond("Hier ist mein Personalausweis", GameState()) == "Jut, Ausweis."
+    assert len(calls) == 2
+    assert len(cache) == 1
+
+    # a new session with the same persona and state is served from the cache
+    second = make_bureaucrat(monkeypatch, cache)
+    game_state = GameState()
+    with second.agent.override(model=scripted_model(calls)):
+        assert second.respond("hier ist mein Personalausweis!", game_state) == "Jut, Ausweis."
+    assert len(calls) == 2
+    assert cache.hits == 1
+    assert game_state.evidence_provided == {"valid_id": "Personalausweis"}
+    # the cached turn becomes part of the conversation, starting with the system prompt
+    assert second.history.messages[0].parts[0].content == "Test system prompt"
+
+
+def test_lru_eviction_and_disk_tier(tmp_path, monkeypatch):
+    cache = ResponseCache(max_entries=1, disk_dir=tmp_path)
+    bureaucrat = make_bureaucrat(monkeypatch, cache)
+    calls = []
+    with bureaucrat.agent.override(model=scripted_model(calls)):
+        bureaucrat.respond("Hier ist mein Personalausweis", GameState())
+        bureaucrat.respond("Noch eine Frage", GameState())
+    assert len(cache) == 1
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+    # the evicted entry is still found on disk
+    reloaded = ResponseCache(disk_dir=tmp_path)
+    entry = reloaded.get(make_key("Test system prompt", "Hier ist mein Personalausweis", GameState()))
+    assert entry is not None
+    assert entry.tool_calls[0].tool_name == "add_evidence"
+    assert json.loads(entry.messages)
@@ -0,0 +1,118 @@
+import asyncio
+from functools import partial
+
+import httpx2
+import pytest
+
+from buergeramt.buergeramt_adventure import setup_commands
+from buergeramt.engine.sessions import SessionLimitError, SessionManager, headless_engine
+from buergeramt.rules.models import ServerConfig
+from buergeramt.server import start_server
+
+
+@pytest.fixture(autouse=True)
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_manager(clock=None, **settings) -> SessionManager:
+    return SessionManager(
+        ServerConfig(**settings),
+        engine_factory=partial(headless_engine, model="offline"),
+        commands_factory=setup_commands,
+        clock=clock or Clock(),
+    )
+
+
+def test_sessions_are_isolated():
+    async def play():
+        manager = make_manager()
+        first, second = await asyncio.gather(manager.create(), manager.create())
+        assert "WILLKOMMEN" in first.text() and first.session_id != second.session_id
+        reply = await manager.handle(first.session_id, "Hier ist mein Personalausweis")
+        assert [event["kind"] for event in reply.events] == ["evidence_added"]
+        status = await manager.handle(second.session_id, "/status")
+        assert status.lines == [("normal", "\nFortschritt: [░░░░░░░░░░░░░░░░░░░░] 0%  Frustration: ")]
+        assert "valid_id" in manager.get(first.session_id).engine.game_state.evidence_provided
+        assert not manager.get(second.session_id).engine.game_state.evidence_provided
+        unknown = await manager.handle(second.session_id, "/sta")
+        assert unknown.text() == "Unbekannter Befehl. Meinten Sie: /status, /statistik?"
+        walk = await manager.handle(second.session_id, "/gehe_zu Frau Müller")
+        assert walk.lines[-1] == ("normal", "Sie sprechen jetzt mit Frau Müller.")
+        assert manager.get(second.session_id).engine.game_state.current_department == "Fachprüfung"
+        quit = await manager.handle(second.session_id, "/beenden")
+        assert quit.game_over and second.session_id not in manager
+        with pytest.raises(KeyError):
+            await manager.handle(second.session_id, "Hallo")
+
+    asyncio.run(play())
+
+
+def test_session_cap_and_idle_eviction():
+    async def play():
+        clock = Clock()
+        manager = make_manager(clock, max_sessions=2, idle_timeout=60)
+        evicted = []
+        first = await manager.create()
+        manager.get(first.session_id).on_evict.append(lambda session: evicted.append(session.id))
+        clock.now = 30
+        second = await manager.create()
+        with pytest.raises(SessionLimitError):
+            await manager.create()
+        clock.now = 70
+        # the first session has been idle for 70s and makes room for the new one
+        third = await manager.create()
+        assert evicted == [first.session_id]
+        assert set(manager.sessions) == {second.session_id, third.session_id}
+        clock.now = 95
+        await manager.handle(second.session_id, "Guten Tag")
+        clock.now = 140
+        assert manager.evict_idle() == [third.session_id]
+
+    asyncio.run(play())
+
+
+def test_http_api():
+    async def play():
+        manager = make_manager()
+        server = await start_server(manager, "127.0.0.1", 0, http=True)
+        port = server.sockets[0].getsockname()[1]
+        async with server, httpx2.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            opened = await client.post("/sessions")
+            assert opened.status_code == 201
+            session_id = opened.json()["session"]
+            turn = await client.post(f"/sessions/{session_id}", json={"input": "Hier ist mein Personalausweis"})
+            assert turn.status_code == 200
+            assert turn.json()["events"][0]["evidence"] == "valid_id"
+            assert (await client.post(f"/sessions/{session_id}", json={"text": "?"})).status_code == 400
+            assert (await client.delete(f"/sessions/{session_id}")).status_code == 204
+            assert (await client.post(f"/sessions/{session_id}", json={"input": "Hallo"})).status_code == 404
+
+    asyncio.run(play())
+
+
+def test_tcp_session_per_connection():
+    async def play():
+        manager = make_manager()
+        server = await start_server(manager, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            greeting = await reader.readuntil(b"\n> ")
+            assert "WILLKOMMEN" in greeting.decode()
+            assert len(manager) == 1
+            writer.write("/beenden\n".encode())
+            assert (await reader.read()).decode().strip() == "Spiel wird beendet."
+            writer.close()
+            assert len(manager) == 0
+
+    asyncio.run(play())
@@ -0,0 +1,116 @@
+import asyncio
+import sqlite3
+import zlib
+from functools import partial
+
+import pytest
+
+from buergeramt.buergeramt_adventure import setup_commands
+from buergeramt.engine.output import MemorySink
+from buergeramt.engine.sessions import SessionManager, headless_engine
+from buergeramt.engine.snapshots import (
+    FileSnapshotStore,
+    SessionSnapshot,
+    SnapshotError,
+    SqliteSnapshotStore,
+)
+from buergeramt.rules.models import ServerConfig
+
+
+@pytest.fixture(autouse=True)
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+def new_engine():
+    return headless_engine(MemorySink(), model="offline")
+
+
+def played_engine():
+    engine = new_engine()
+    engine.start_game()
+    engine.process_input("Hier ist mein Personalausweis")
+    engine.switch_agent("Frau Müller")
+    engine.process_input("Guten Tag")
+    return engine
+
+
+def test_snapshot_round_trip(tmp_path):
+    engine = played_engine()
+    store = FileSnapshotStore(tmp_path)
+    store.save("montag", SessionSnapshot.capture(engine))
+    assert store.keys() == ["montag"]
+
+    resumed = new_engine()
+    store.load("montag").restore(resumed)
+    assert resumed.game_state.snapshot() == engine.game_state.snapshot()
+    assert resumed.agent_router.active_bureaucrat.department == "Fachprüfung"
+    for department in ("Erstbearbeitung", "Fachprüfung"):
+        original = engine.agent_router.bureaucrats[department].history.messages
+        assert resumed.agent_router.bureaucrats[department].history.messages == original
+    assert resumed.process_input("Hier ist mein Tagebucheintrag")
+    assert store.delete("montag") and store.load("montag") is None
+    with pytest.raises(ValueError):
+        store.save("../elsewhere", SessionSnapshot.capture(engine))
+
+
+def test_blob_is_versioned():
+    blob = SessionSnapshot(config_version="x", state={}, version=99).to_blob()
+    with pytest.raises(SnapshotError, match="version 99"):
+        SessionSnapshot.from_blob(blob)
+    with pytest.raises(SnapshotError):
+        SessionSnapshot.from_blob(zlib.compress(b"{}"))
+
+
+def test_sqlite_store_uses_wal(tmp_path):
+    path = tmp_path / "sessions.db"
+    store = SqliteSnapshotStore(path)
+    snapshot = SessionSnapshot.capture(played_engine())
+    store.save("a", snapshot)
+    store.save("a", snapshot)
+    assert store.keys() == ["a"]
+    assert store.load("a") == snapshot
+    with sqlite3.connect(path) as db:
+        assert db.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert store.delete("a") and not store.delete("a")
+    store.close()
+
+
+def test_idle_sessions_are_swapped_out_and_resumed(tmp_path):
+    async def play():
+        now = [0.0]
+        manager = SessionManager(
+            ServerConfig(idle_timeout=60),
+            engine_factory=partial(headless_engine, model="offline"),
+            commands_factory=setup_commands,
+            clock=lambda: now[0],
+            store=SqliteSnapshotStore(tmp_path / "sessions.db"),
+        )
+        session_id = (await manager.create()).session_id
+        await manager.handle(session_id, "Hier ist mein Personalausweis")
+        saved = await manager.handle(session_id, "/speichern")
+        assert saved.text() == f"Spielstand '{session_id}' gespeichert."
+        await manager.handle(session_id, "Hier ist mein Tagebucheintrag")
+        now[0] = 100
+        assert manager.evict_idle() == [session_id]
+        assert session_id not in manager and manager.store.keys() == [session_id]
+
+        status = await manager.handle(session_id, "/status")
+        assert "Fortschritt" in status.text()
+        state = manager.get(session_id).engine.game_state
+        assert set(state.evidence_provided) == {"valid_id", "sentimental_context"}
+        # the swap wrote over the checkpoint of /speichern; save again and go back to it
+        await manager.handle(session_id, "/speichern")
+        await manager.handle(session_id, "Hier ist ein Selfie mit Geschenk")
+        assert "gift_photo" in state.evidence_provided
+        loaded = await manager.handle(session_id, "/laden")
+        assert loaded.text().endswith("geladen. Sie sind wieder bei Herr Schmidt (Erstbearbeitung).")
+        assert set(state.evidence_provided) == {"valid_id", "sentimental_context"}
+
+        assert manager.close(session_id)
+        assert manager.store.keys() == []
+        with pytest.raises(KeyError):
+            await manager.handle(session_id, "Hallo")
+
+    asyncio.run(play())
@@ -0,0 +1,55 @@
+import pytest
+
+from buergeramt.characters.persona_factory import build_bureaucrat
+from buergeramt.rules.game_state import GameState
+from buergeramt.utils.telemetry import CallRecord, Telemetry
+
+
+@pytest.fixture
+def no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("buergeramt.characters.bureaucrat.load_dotenv", lambda: None)
+
+
+def test_aggregates_per_persona_and_session():
+    telemetry = Telemetry(session_id="s1")
+    telemetry.add(
+        CallRecord("Herr Schmidt", "respond", wall_time=1.0, input_tokens=100, output_tokens=10, tool_calls=2)
+    )
+    telemetry.add(CallRecord("Herr Schmidt", "respond", wall_time=3.0, time_to_first_token=0.5, requests=2))
+    telemetry.add(CallRecord("Frau Müller", "introduce", wall_time=2.0, cached=True))
+    assert telemetry.session.calls == 3
+    assert telemetry.session.wall_time == 6.0
+    schmidt = telemetry.personas["Herr Schmidt"]
+    assert (schmidt.calls, schmidt.input_tokens, schmidt.tool_calls, schmidt.requests) == (2, 100, 2, 2)
+    assert schmidt.quantile(0.95) == 3.0
+    assert telemetry.personas["Frau Müller"].cached == 1
+    report = telemetry.format_report()
+    assert "Gesamt" in report and "Frau Müller" in report
+
+
+def test_prometheus_export(tmp_path):
+    telemetry = Telemetry(session_id="s1", export_path=tmp_path / "metrics.prom")
+    telemetry.add(CallRecord('Herr "X"', "respond", wall_time=0.25, time_to_first_token=0.1, output_tokens=7))
+    text = telemetry.export().read_text(encoding="utf-8")
+    assert "# TYPE buergeramt_model_call_seconds summary" in text
+    assert 'buergeramt_model_calls_total{session="s1",persona="Herr \\"X\\"",kind="respond"} 1' in text
+    assert 'buergeramt_model_call_seconds_count{session="s1",persona="Herr \\"X\\""} 1' in text
+    assert 'buergeramt_model_time_to_first_token_seconds_sum{session="s1",persona="Herr \\"X\\""} 0.100000' in text
+    assert 'buergeramt_model_output_tokens_total{session="s1",persona="Herr \\"X\\""} 7' in text
+
+
+def test_bureaucrat_calls_are_recorded(no_api_key):
+    telemetry = Telemetry()
+    bureaucrat = build_bureaucrat("HerrSchmidt", model="offline")
+    bureaucrat.telemetry = telemetry
+    gs = GameState()
+    bureaucrat.introduce(gs)
+    bureaucrat.respond("Hier ist mein Reisepass", gs)
+    bureaucrat.respond("Hier ist eine handgeschriebene Widmung", gs, on_text=lambda chunk: None)
+    stats = telemetry.personas["Herr Schmidt"]
+    assert stats.kinds == {"introduce": 1, "respond": 2}
+    assert stats.tool_calls == 2
+    assert stats.requests == 5
+    assert stats.input_tokens > 0 and stats.output_tokens > 0
+    assert stats.first_tokens == 1